@@ -0,0 +1,263 @@
+"""
+Versão ASGI da API (Starlette), com as otimizações em um pool de processos.
+
+    uv sync --extra asgi
+    uv run uvicorn --factory api_asgi:criar_app --port 5000
+
+Mesmas rotas e respostas de api.py. O event loop só valida a entrada e
+formata a saída; o solver roda em `utils.processos.PoolOtimizacao`, então
+várias otimizações usam vários núcleos. Sem vaga no pool a resposta é 429
+(com Retry-After), e se o cliente desconecta a otimização é cancelada.
+
+Variáveis: TRABALHADORES_OTIMIZACAO (nº de CPUs) e FILA_OTIMIZACAO (igual ao
+nº de trabalhadores), além das de api.py.
+"""
+
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from utils.coalescencia import VooUnicoAsync
+from utils.metricas import REGISTRO, TIPO_CONTEUDO
+from utils.modelo import carregar_modelo
+from utils.processos import FilaCheia, OtimizacaoCancelada, PoolOtimizacao
+from utils.registro import configurar_logs, contexto_requisicao
+from utils.servico import (
+    EM_ANDAMENTO,
+    LATENCIA,
+    OTIMIZACOES_ATIVAS,
+    OTIMIZACOES_COALESCIDAS,
+    REQUISICOES,
+    ErroRequisicao,
+    bares_proximos,
+    chave_otimizacao,
+    coordenadas_bar,
+    formatar_resposta,
+    listar_bares,
+    preparar_otimizacao,
+    registrar_execucao,
+)
+
+configurar_logs()
+logger = logging.getLogger("api")
+
+OTIMIZACOES_REJEITADAS = REGISTRO.contador(
+    "otimizador_rejeicoes_total",
+    "Otimizações recusadas (pool cheio) ou canceladas (cliente desconectou)",
+    ("motivo",),
+)
+
+# pool da app em execução (um por processo servidor)
+pool_atual = None
+REGISTRO.medidor(
+    "otimizador_pool_pendentes",
+    "Otimizações em execução ou na fila do pool de processos",
+    funcao=lambda: pool_atual.pendentes if pool_atual is not None else 0,
+)
+
+
+class MiddlewareRequisicao:
+    """Id da requisição (X-Request-ID), latência e contagem por rota.
+
+    ASGI puro em vez de BaseHTTPMiddleware, que atrapalha a detecção de
+    desconexão do cliente dentro das rotas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cabecalhos = dict(scope["headers"])
+        id_recebido = cabecalhos.get(b"x-request-id", b"").decode() or None
+        inicio = time.perf_counter()
+        status = 500
+        EM_ANDAMENTO.inc()
+
+        with contexto_requisicao(id_recebido) as id_requisicao:
+
+            async def enviar(mensagem):
+                nonlocal status
+                if mensagem["type"] == "http.response.start":
+                    status = mensagem["status"]
+                    mensagem["headers"] = [
+                        *mensagem.get("headers", []),
+                        (b"x-request-id", id_requisicao.encode()),
+                    ]
+                await send(mensagem)
+
+            try:
+                await self.app(scope, receive, enviar)
+            finally:
+                EM_ANDAMENTO.dec()
+                # usa o padrão da rota (ex.: /api/bar-coordinates/{bar_name})
+                rota = scope.get("route")
+                rota = rota.path if rota is not None else "desconhecida"
+                LATENCIA.observar(
+                    time.perf_counter() - inicio, rota=rota, metodo=scope["method"]
+                )
+                REQUISICOES.inc(rota=rota, metodo=scope["method"], status=status)
+
+
+async def readiness_check(request):
+    modelo = request.app.state.modelo
+    if modelo is None or not modelo.pronto:
+        return JSONResponse({"status": "carregando"}, status_code=503)
+    return JSONResponse({"status": "pronto", **modelo.resumo()})
+
+
+async def metrics(request):
+    return Response(REGISTRO.exportar(), media_type=TIPO_CONTEUDO)
+
+
+async def health_check(request):
+    modelo = request.app.state.modelo
+    return JSONResponse(
+        {
+            "status": "ok",
+            "message": "API de Otimização de Rotas está funcionando",
+            "total_bares": len(modelo.bares) if modelo is not None else 0,
+        }
+    )
+
+
+async def get_bars(request):
+    return JSONResponse(listar_bares(request.app.state.modelo))
+
+
+async def get_bars_near(request):
+    try:
+        return JSONResponse(
+            bares_proximos(request.app.state.modelo, request.query_params)
+        )
+    except ErroRequisicao as e:
+        return JSONResponse({"error": str(e)}, e.status)
+
+
+async def optimize_route(request):
+    """Mesmo contrato de api.optimize_route, com o solver no pool de processos."""
+    if request.method == "OPTIONS":
+        return JSONResponse({"status": "ok"})
+
+    modelo = request.app.state.modelo
+    pool = request.app.state.pool
+    try:
+        logger.debug("Requisição de otimização recebida")
+        parametros = preparar_otimizacao(modelo, await request.json())
+
+        async def otimizar_no_pool(desconectado):
+            OTIMIZACOES_ATIVAS.inc()
+            try:
+                resultado = await pool.executar(parametros, desconectado=desconectado)
+            finally:
+                OTIMIZACOES_ATIVAS.dec()
+            registrar_execucao(resultado)
+            return resultado
+
+        # requisições idênticas simultâneas esperam a mesma execução; ela só
+        # é cancelada quando todos os clientes desconectaram
+        resultado, compartilhado = await request.app.state.voo_unico.executar(
+            chave_otimizacao(parametros),
+            otimizar_no_pool,
+            desconectado=request.is_disconnected,
+        )
+        if compartilhado:
+            OTIMIZACOES_COALESCIDAS.inc()
+
+        return JSONResponse(formatar_resposta(modelo, parametros, resultado))
+
+    except ErroRequisicao as e:
+        return JSONResponse({"error": str(e), "success": False}, e.status)
+    except FilaCheia:
+        OTIMIZACOES_REJEITADAS.inc(motivo="fila_cheia")
+        logger.warning("Pool de otimização cheio", extra={"pendentes": pool.pendentes})
+        return JSONResponse(
+            {"error": "Servidor ocupado, tente novamente", "success": False},
+            429,
+            headers={"Retry-After": "1"},
+        )
+    except OtimizacaoCancelada:
+        OTIMIZACOES_REJEITADAS.inc(motivo="cancelada")
+        logger.info("Otimização cancelada: cliente desconectou")
+        # ninguém vai ler; 499 só aparece nas métricas e nos logs
+        return JSONResponse({"error": "Cancelada", "success": False}, 499)
+    except Exception as e:
+        logger.exception("Erro ao otimizar rota")
+        return JSONResponse({"error": str(e), "success": False}, 500)
+
+
+async def get_bar_coordinates(request):
+    try:
+        return JSONResponse(
+            coordenadas_bar(request.app.state.modelo, request.path_params["bar_name"])
+        )
+    except ErroRequisicao as e:
+        return JSONResponse({"error": str(e)}, e.status)
+
+
+def criar_app(modelo=None, trabalhadores=None, fila=None):
+    """App factory para `uvicorn --factory api_asgi:criar_app`."""
+    if modelo is None:
+        modelo = carregar_modelo(
+            os.environ.get("CAMINHO_BARES", "data/bares.csv"),
+            os.environ.get("CAMINHO_MATRIZES", "data/distancias.pkl"),
+            os.environ.get("CAMINHO_TEMPOS_HORARIO", "data/tempos_por_horario.npy"),
+            os.environ.get("PRECISAO_MATRIZES", "float64"),
+            os.environ.get("CAMINHO_GRAFO", "data/grafo_esparso.npz"),
+        ).aquecer()
+    if trabalhadores is None and "TRABALHADORES_OTIMIZACAO" in os.environ:
+        trabalhadores = int(os.environ["TRABALHADORES_OTIMIZACAO"])
+    if fila is None and "FILA_OTIMIZACAO" in os.environ:
+        fila = int(os.environ["FILA_OTIMIZACAO"])
+
+    @asynccontextmanager
+    async def ciclo_de_vida(app):
+        global pool_atual
+        pool = pool_atual = PoolOtimizacao(modelo, trabalhadores, fila)
+        app.state.pool = pool
+        logger.info(
+            "Pool de otimização iniciado",
+            extra={"trabalhadores": pool.trabalhadores, "fila": pool.fila},
+        )
+        try:
+            yield
+        finally:
+            pool.encerrar()
+
+    app = Starlette(
+        routes=[
+            Route("/api/ready", readiness_check, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+            Route("/api/health", health_check, methods=["GET"]),
+            Route("/api/bars", get_bars, methods=["GET"]),
+            Route("/api/bars/near", get_bars_near, methods=["GET"]),
+            Route("/api/optimize-route", optimize_route, methods=["POST", "OPTIONS"]),
+            Route(
+                "/api/bar-coordinates/{bar_name}", get_bar_coordinates, methods=["GET"]
+            ),
+        ],
+        middleware=[
+            Middleware(
+                CORSMiddleware,
+                allow_origins=["http://localhost:5173", "http://localhost:3000"],
+                allow_methods=["GET", "POST", "OPTIONS"],
+                allow_headers=["Content-Type", "X-Request-ID"],
+                expose_headers=["X-Request-ID"],
+            ),
+            Middleware(MiddlewareRequisicao),
+        ],
+        lifespan=ciclo_de_vida,
+    )
+    app.state.modelo = modelo
+    app.state.voo_unico = VooUnicoAsync()
+    logger.info("Modelo carregado", extra=modelo.resumo())
+    return app
@@ -0,0 +1,322 @@
+"""
+Benchmarks dos caminhos críticos do otimizador.
+
+Mede avaliar_rota, geração/avaliação de vizinhos 2-opt, tabu_search completo,
+ACO, Kruskal/Bellmore-Nemhauser (e as versões NumPy da AGM/Christofides) e o
+endpoint /api/optimize-route via cliente de teste do Flask, em instâncias
+sintéticas de 25/124/500/2000 bares.
+
+Os resultados são gravados em JSON (benchmarks/resultados/) junto com o
+commit e a máquina, para comparar execuções no mesmo computador.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark
+    python -m benchmarks.benchmark --tamanhos 25 124 --repeticoes 3
+    python -m benchmarks.benchmark --comparar antes.json depois.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from tests.aco import ACO
+from tests.bellmore_nemhauser import bellmore_nemhauser
+from tests.kruskal import kruskal
+from utils.agm import prim_denso
+from utils.avalia_rota import avaliar_rota
+from utils.christofides import christofides_caminho
+from utils.dados import normalizar_bares
+from utils.gerador_instancias import gerar_instancia
+from utils.grafo_esparso import GrafoEsparso
+from utils.restricoes import Restricoes
+from utils.tabu_search import (
+    avaliar_movimento_parcial,
+    gerar_vizinhos_2opt,
+    tabu_search,
+)
+from utils.tempos_dependentes import TemposPorHorario
+
+TAMANHOS_PADRAO = [25, 124, 500, 2000]
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+
+# perfil horário ilustrativo (madrugada livre, picos às 8h e às 18h)
+FATORES_HORARIOS = [0.8] * 6 + [1.0, 1.3, 1.5, 1.2, 1.0, 1.0, 1.1, 1.0]
+FATORES_HORARIOS += [1.0, 1.1, 1.3, 1.6, 1.7, 1.4, 1.1, 1.0, 0.9, 0.85]
+
+HORA_INICIAL = datetime(2025, 11, 25, 16, 0)
+HORA_FINAL = datetime(2025, 11, 26, 23, 0)
+TEMPO_VISITA = timedelta(hours=1)
+
+
+def instancia_sintetica(n, semente=0):
+    """Instância do gerador com o df já normalizado como na API."""
+    df, distancias, tempos = gerar_instancia(n, semente)
+    return normalizar_bares(df), distancias, tempos
+
+
+def medir(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes e retorna os tempos em segundos."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def _bench_avaliar_rota(df, distancias, tempos):
+    rota = list(range(len(df)))
+    return lambda: avaliar_rota(
+        rota, tempos, df, HORA_INICIAL, HORA_FINAL, TEMPO_VISITA, 1.0, 25.0
+    )
+
+
+def _bench_vizinhos_2opt(df, distancias, tempos):
+    rota = list(range(len(df)))
+    return lambda: gerar_vizinhos_2opt(rota)
+
+
+def _bench_delta_2opt(df, distancias, tempos):
+    rota = list(range(len(df)))
+    n = len(rota)
+
+    def executar():
+        for i in range(n - 1):
+            for j in range(i + 2, n):
+                avaliar_movimento_parcial(rota, i, j, tempos)
+
+    return executar
+
+
+def _bench_delta_2opt_horario(df, distancias, tempos):
+    rota = list(range(len(df)))
+    tensor = TemposPorHorario.de_fatores(tempos, FATORES_HORARIOS)
+    return lambda: tensor.deltas_2opt(rota, HORA_INICIAL, TEMPO_VISITA)
+
+
+def _bench_tabu_search_horario(df, distancias, tempos):
+    tensor = TemposPorHorario.de_fatores(tempos, FATORES_HORARIOS)
+    return _bench_tabu_search(df, distancias, tensor)
+
+
+def _tempos_esparsos(df, distancias, tempos, k=20):
+    from utils.modelo import Modelo
+
+    grafo = GrafoEsparso.de_densa(distancias, tempos, k)
+    return Modelo(df, None, None, grafo=grafo).tempos
+
+
+def _bench_delta_2opt_esparso(df, distancias, tempos):
+    rota = list(range(len(df)))
+    esparsos = _tempos_esparsos(df, distancias, tempos)
+    return lambda: esparsos.deltas_2opt(rota)
+
+
+def _bench_tabu_search_esparso(df, distancias, tempos):
+    return _bench_tabu_search(df, distancias, _tempos_esparsos(df, distancias, tempos))
+
+
+def _bench_tabu_search_restricoes(df, distancias, tempos):
+    # um bar fixo a cada 10 posições: a vizinhança encolhe
+    n = len(df)
+    restricoes = Restricoes({k: (k, k) for k in range(5, n, 10)})
+    return _bench_tabu_search(df, distancias, tempos, restricoes)
+
+
+def _bench_tabu_search(df, distancias, tempos, restricoes=None):
+    rota = list(range(len(df)))
+    return lambda: tabu_search(
+        rota,
+        tempos,
+        df,
+        HORA_INICIAL,
+        HORA_FINAL,
+        TEMPO_VISITA,
+        alpha=1.0,
+        beta=25.0,
+        tabu_tam=10,
+        max_iter=10,
+        max_iter_sem_melhoria=10,
+        verbose=False,
+        restricoes=restricoes,
+    )
+
+
+def _bench_aco(df, distancias, tempos):
+    return lambda: ACO(
+        distancias, num_formigas=5, num_iteracoes=3, verbose=False
+    ).executar(0)
+
+
+def _bench_kruskal(df, distancias, tempos):
+    return lambda: kruskal(distancias)
+
+
+def _bench_bellmore_nemhauser(df, distancias, tempos):
+    return lambda: bellmore_nemhauser(distancias)
+
+
+def _bench_prim_denso(df, distancias, tempos):
+    return lambda: prim_denso(distancias)
+
+
+def _bench_christofides(df, distancias, tempos):
+    return lambda: christofides_caminho(tempos, 0)
+
+
+def _bench_api_optimize_route(df, distancias, tempos):
+    import api
+    from utils.modelo import Modelo
+
+    cliente = api.criar_app(Modelo(df, distancias, tempos).aquecer()).test_client()
+    amanha = (date.today() + timedelta(days=1)).isoformat()
+    payload = {
+        "startDate": amanha,
+        "endDate": amanha,
+        "startTime": "16:00",
+        "endTime": "23:00",
+        "startPoint": df["Nome do Buteco"].iloc[0],
+    }
+
+    def executar():
+        resposta = cliente.post("/api/optimize-route", json=payload)
+        if resposta.status_code != 200:
+            raise RuntimeError(resposta.get_json())
+
+    return executar
+
+
+# (nome, fábrica, maior tamanho viável) — gerar_vizinhos_2opt materializa
+# O(n²) rotas de tamanho n, então tamanhos grandes não cabem em memória
+BENCHMARKS = [
+    ("avaliar_rota", _bench_avaliar_rota, None),
+    ("gerar_vizinhos_2opt", _bench_vizinhos_2opt, 124),
+    ("delta_2opt", _bench_delta_2opt, 500),
+    ("delta_2opt_horario", _bench_delta_2opt_horario, 500),
+    ("delta_2opt_esparso", _bench_delta_2opt_esparso, None),
+    ("tabu_search", _bench_tabu_search, 124),
+    ("tabu_search_horario", _bench_tabu_search_horario, 124),
+    ("tabu_search_esparso", _bench_tabu_search_esparso, 124),
+    ("tabu_search_restricoes", _bench_tabu_search_restricoes, 124),
+    ("aco", _bench_aco, 124),
+    ("kruskal", _bench_kruskal, None),
+    ("bellmore_nemhauser", _bench_bellmore_nemhauser, None),
+    ("prim_denso", _bench_prim_denso, None),
+    ("christofides_caminho", _bench_christofides, None),
+    ("api_optimize_route", _bench_api_optimize_route, 124),
+]
+
+
+def _commit_atual():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return "desconhecido"
+
+
+def executar_benchmarks(tamanhos, repeticoes=3, filtro=None, semente=0):
+    resultados = []
+    for n in tamanhos:
+        df, distancias, tempos = instancia_sintetica(n, semente)
+        for nome, fabrica, maximo in BENCHMARKS:
+            if filtro and not any(f in nome for f in filtro):
+                continue
+            if maximo is not None and n > maximo:
+                continue
+            funcao = fabrica(df, distancias, tempos)
+            medidas = medir(funcao, repeticoes)
+            resultado = {
+                "benchmark": nome,
+                "n": n,
+                "repeticoes": repeticoes,
+                "min_s": min(medidas),
+                "mediana_s": statistics.median(medidas),
+                "media_s": statistics.fmean(medidas),
+            }
+            resultados.append(resultado)
+            print(
+                f"{nome:24s} n={n:5d}  min={resultado['min_s'] * 1000:10.2f} ms  "
+                f"mediana={resultado['mediana_s'] * 1000:10.2f} ms"
+            )
+    return {
+        "commit": _commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "maquina": {
+            "plataforma": platform.platform(),
+            "processador": platform.processor() or platform.machine(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+        "semente": semente,
+        "resultados": resultados,
+    }
+
+
+def salvar_resultados(relatorio, caminho=None):
+    if caminho is None:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        carimbo = datetime.now().strftime("%Y%m%d-%H%M%S")
+        caminho = os.path.join(
+            DIRETORIO_RESULTADOS, f"{carimbo}_{relatorio['commit']}.json"
+        )
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    return caminho
+
+
+def comparar(caminho_antes, caminho_depois):
+    """Imprime a razão depois/antes da mediana de cada benchmark em comum."""
+    with open(caminho_antes, encoding="utf-8") as f:
+        antes = json.load(f)
+    with open(caminho_depois, encoding="utf-8") as f:
+        depois = json.load(f)
+
+    indice = {(r["benchmark"], r["n"]): r for r in antes["resultados"]}
+    print(f"{antes['commit']} → {depois['commit']}")
+    for r in depois["resultados"]:
+        base = indice.get((r["benchmark"], r["n"]))
+        if base is None:
+            continue
+        razao = (
+            r["mediana_s"] / base["mediana_s"] if base["mediana_s"] else float("inf")
+        )
+        marca = "⚠️" if razao > 1.10 else "  "
+        print(
+            f"{marca} {r['benchmark']:24s} n={r['n']:5d}  "
+            f"{base['mediana_s'] * 1000:10.2f} ms → {r['mediana_s'] * 1000:10.2f} ms"
+            f"  ({razao:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument(
+        "--filtro", nargs="+", help="executa apenas benchmarks com esses nomes"
+    )
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    parser.add_argument(
+        "--comparar", nargs=2, metavar=("ANTES", "DEPOIS"), help="compara dois JSON"
+    )
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+    else:
+        relatorio = executar_benchmarks(
+            args.tamanhos, args.repeticoes, args.filtro, args.semente
+        )
+        print(f"\n💾 Resultados salvos em {salvar_resultados(relatorio, args.saida)}")
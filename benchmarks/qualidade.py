@@ -0,0 +1,264 @@
+"""
+Regressão de qualidade das soluções.
+
+Roda cada solver em instâncias fixas (os 124 bares reais e instâncias
+sintéticas com semente fixa, incluindo instâncias pequenas resolvidas de forma
+exata por força bruta) e registra custo real (reavaliado com avaliar_rota),
+gap para o ótimo/limite inferior, tempo e curva de tempo-até-alvo a partir do
+`historico` do tabu search.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.qualidade                       # imprime e salva JSON
+    python -m benchmarks.qualidade --atualizar-referencia
+    python -m benchmarks.qualidade --verificar           # falha se piorar
+
+A verificação compara com benchmarks/qualidade_referencia.json: qualquer
+otimização de desempenho em tabu_search/avaliar_rota não pode piorar o custo
+além da tolerância.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from tests.aco import ACO
+from utils.avalia_rota import CacheHorarios, avaliar_rota
+from utils.dados import carregar_bares, carregar_matrizes, normalizar_bares
+from utils.gerador_instancias import gerar_instancia
+from utils.limites import calcular_gap, custo_constante, limite_inferior_custo
+from utils.programacao_dinamica import TAMANHO_MAXIMO_PADRAO, resolver_exato
+from utils.tabu_search import gerar_solucao_inicial, tabu_search
+
+CAMINHO_REFERENCIA = os.path.join(
+    os.path.dirname(__file__), "qualidade_referencia.json"
+)
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+
+# terça-feira, mesma janela usada pela API por padrão
+HORA_INICIAL = datetime(2025, 11, 25, 16, 0)
+HORA_FINAL = datetime(2025, 11, 25, 23, 0)
+TEMPO_VISITA = timedelta(hours=1)
+ALPHA, BETA = 1.0, 25.0
+
+# (nome, n, semente); n=None usa os dados reais
+INSTANCIAS = [
+    ("exata_7_s1", 7, 1),
+    ("exata_8_s2", 8, 2),
+    ("exata_8_s3", 8, 3),
+    ("sintetica_30_s4", 30, 4),
+    ("sintetica_60_s5", 60, 5),
+    ("real_124", None, None),
+]
+LIMITE_FORCA_BRUTA = 9
+ALVOS_TTT = [0.05, 0.01, 0.0]  # fração acima da referência
+
+
+def carregar_instancia(n, semente):
+    if n is None:
+        df = carregar_bares("data/bares.csv")
+        distancias, tempos = carregar_matrizes("data/distancias.pkl")
+        return df, np.asarray(distancias, float), np.asarray(tempos, float)
+    df, distancias, tempos = gerar_instancia(n, semente)
+    return normalizar_bares(df), distancias, tempos
+
+
+def custo_real(rota, tempos, df, cache=None):
+    return avaliar_rota(
+        rota, tempos, df, HORA_INICIAL, HORA_FINAL, TEMPO_VISITA, ALPHA, BETA, cache
+    )
+
+
+def forca_bruta(rota_inicial, tempos, df):
+    """Ótimo exato com o primeiro bar fixo (apenas para instâncias pequenas)."""
+    cache = CacheHorarios(df)
+    inicio, resto = rota_inicial[0], rota_inicial[1:]
+    melhor, melhor_custo = None, float("inf")
+    for perm in itertools.permutations(resto):
+        rota = [inicio, *perm]
+        custo = custo_real(rota, tempos, df, cache)
+        if custo < melhor_custo:
+            melhor, melhor_custo = rota, custo
+    return melhor, melhor_custo
+
+
+def solver_tabu(rota_inicial, tempos, distancias, df):
+    rota, _, historico = tabu_search(
+        rota_inicial,
+        tempos,
+        df,
+        HORA_INICIAL,
+        HORA_FINAL,
+        TEMPO_VISITA,
+        alpha=ALPHA,
+        beta=BETA,
+        tabu_tam=10,
+        max_iter=100,
+        max_iter_sem_melhoria=30,
+        verbose=False,
+    )
+    return rota, historico
+
+
+def solver_solucao_inicial(rota_inicial, tempos, distancias, df):
+    rota, _, _ = gerar_solucao_inicial(
+        rota_inicial, tempos, df, HORA_INICIAL, HORA_FINAL, TEMPO_VISITA, ALPHA, BETA
+    )
+    return rota, None
+
+
+def solver_aco(rota_inicial, tempos, distancias, df):
+    random.seed(0)
+    aco = ACO(tempos, num_formigas=10, num_iteracoes=20, verbose=False)
+    rota, _, _ = aco.executar(cidade_inicial=rota_inicial[0])
+    return rota, None
+
+
+def solver_exato(rota_inicial, tempos, distancias, df):
+    if len(rota_inicial) > TAMANHO_MAXIMO_PADRAO:
+        return None, None
+    rota, _, _ = resolver_exato(
+        rota_inicial, tempos, df, HORA_INICIAL, HORA_FINAL, TEMPO_VISITA, ALPHA, BETA
+    )
+    return rota, None
+
+
+SOLVERS = {
+    "tabu_search": solver_tabu,
+    "exato": solver_exato,
+    "solucao_inicial": solver_solucao_inicial,
+    "aco": solver_aco,
+}
+
+
+def tempo_ate_alvo(historico, referencia):
+    """Primeiro instante em que o melhor custo do histórico atinge cada alvo.
+
+    Usa o melhor custo real de cada iteração (`distancia_melhor`, confirmado
+    com `avaliar_rota`), não a estimativa incremental pelo delta.
+    """
+    if not historico or not historico.get("tempo"):
+        return None
+    melhores = np.asarray(historico["distancia_melhor"])
+    resultado = {}
+    for alvo in ALVOS_TTT:
+        limite = referencia + alvo * abs(referencia)
+        atingiu = np.flatnonzero(melhores <= limite + 1e-9)
+        resultado[f"{alvo:.2f}"] = (
+            float(historico["tempo"][atingiu[0]]) if len(atingiu) else None
+        )
+    return resultado
+
+
+def executar(instancias=INSTANCIAS, solvers=SOLVERS):
+    resultados = []
+    for nome, n, semente in instancias:
+        df, distancias, tempos = carregar_instancia(n, semente)
+        rota_inicial = list(range(len(df)))
+
+        referencia, origem_referencia = None, None
+        if len(df) <= LIMITE_FORCA_BRUTA:
+            _, referencia = forca_bruta(rota_inicial, tempos, df)
+            origem_referencia = "forca_bruta"
+        limite = limite_inferior_custo(
+            rota_inicial, tempos, df, TEMPO_VISITA, ALPHA, BETA, HORA_INICIAL
+        )
+        constante = custo_constante(rota_inicial, df, TEMPO_VISITA, ALPHA, BETA)
+
+        for nome_solver, solver in solvers.items():
+            inicio = time.perf_counter()
+            rota, historico = solver(rota_inicial, tempos, distancias, df)
+            duracao = time.perf_counter() - inicio
+            if rota is None:  # solver não se aplica ao tamanho da instância
+                continue
+
+            custo = custo_real(rota, tempos, df)
+            registro = {
+                "instancia": nome,
+                "n": len(df),
+                "solver": nome_solver,
+                "custo": custo,
+                "tempo_s": duracao,
+                "limite_inferior": limite,
+                "gap_limite": calcular_gap(custo, limite, constante),
+                "referencia": referencia,
+                "origem_referencia": origem_referencia,
+                "gap_referencia": calcular_gap(custo, referencia, constante)
+                if referencia is not None
+                else None,
+                "inicio_fixo": rota[0] == rota_inicial[0],
+            }
+            if historico is not None:
+                registro["iteracoes"] = len(historico["iteracao"])
+                registro["tempo_ate_alvo"] = tempo_ate_alvo(
+                    historico, referencia if referencia is not None else custo
+                )
+            resultados.append(registro)
+
+            gap = registro["gap_referencia"]
+            print(
+                f"{nome:18s} {nome_solver:16s} custo={custo:12.2f}  "
+                f"tempo={duracao * 1000:9.1f} ms  "
+                + (f"gap_ótimo={gap:.2%}" if gap is not None else "")
+            )
+    return resultados
+
+
+def verificar(resultados, referencia, tolerancia):
+    """Lista de regressões: custo pior que a referência além da tolerância."""
+    indice = {(r["instancia"], r["solver"]): r for r in referencia["resultados"]}
+    regressoes = []
+    for r in resultados:
+        base = indice.get((r["instancia"], r["solver"]))
+        if base is None:
+            continue
+        if r["custo"] > base["custo"] + tolerancia * max(abs(base["custo"]), 1.0):
+            regressoes.append((r, base))
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regressão de qualidade dos solvers")
+    parser.add_argument("--verificar", action="store_true")
+    parser.add_argument("--atualizar-referencia", action="store_true")
+    parser.add_argument(
+        "--tolerancia", type=float, default=0.005, help="piora relativa aceita"
+    )
+    args = parser.parse_args()
+
+    resultados = executar()
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "resultados": resultados,
+    }
+
+    if args.atualizar_referencia:
+        with open(CAMINHO_REFERENCIA, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Referência atualizada em {CAMINHO_REFERENCIA}")
+    else:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        carimbo = datetime.now().strftime("%Y%m%d-%H%M%S")
+        caminho = os.path.join(DIRETORIO_RESULTADOS, f"qualidade_{carimbo}.json")
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados salvos em {caminho}")
+
+    if args.verificar:
+        with open(CAMINHO_REFERENCIA, encoding="utf-8") as f:
+            referencia = json.load(f)
+        regressoes = verificar(resultados, referencia, args.tolerancia)
+        for atual, base in regressoes:
+            print(
+                f"❌ {atual['instancia']} / {atual['solver']}: "
+                f"{base['custo']:.2f} → {atual['custo']:.2f}"
+            )
+        if regressoes:
+            sys.exit(1)
+        print("✅ Nenhuma regressão de qualidade")
@@ -0,0 +1,45 @@
+"""
+Configuração do gunicorn para produção: `uv run gunicorn -c gunicorn.conf.py`.
+
+O app é carregado no mestre (`preload_app`) e os workers herdam o modelo já
+aquecido via fork; `gc.freeze()` move esses objetos para a geração permanente
+para que o coletor de lixo dos workers não suje as páginas compartilhadas.
+A thread que escreve os logs não sobrevive ao fork; `utils/registro.py`
+sobe uma nova em cada worker (`os.register_at_fork`).
+"""
+
+import gc
+import os
+
+wsgi_app = "api:criar_app()"
+preload_app = True
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+# otimização é CPU-bound: poucas threads por worker, só para não travar
+# /api/health e /metrics atrás de uma requisição longa
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "2"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = None  # a API já registra cada requisição
+
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # cada worker tem o próprio registro de métricas e /metrics cai em um
+    # deles por vez: o rótulo separa as séries para somar no Prometheus
+    from utils.metricas import REGISTRO
+
+    REGISTRO.rotulos_fixos = {"worker": str(os.getpid())}
+
+    # pool dos dias do clusterByDay (TRABALHADORES_DIAS > 1): sobe agora,
+    # não na primeira requisição
+    from utils.decomposicao import pool_dias
+    from utils.servico import TRABALHADORES_DIAS
+
+    pool_dias(TRABALHADORES_DIAS)
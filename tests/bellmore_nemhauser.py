@@ -15,6 +15,7 @@ Este é um limite superior garantido para o TSP.
 """
 
 from tests.kruskal import kruskal
+from utils.christofides import hierholzer
 
 
 def construir_grafo_adjacencia(arestas_agm, n):
@@ -48,29 +49,16 @@ def encontrar_circuito_euleriano(grafo_euleriano, inicio=0):
     Returns:
         list: Circuito euleriano (sequência de vértices)
     """
-    # Criar cópia do grafo para não modificar o original
-    from copy import deepcopy
-
-    grafo = deepcopy(grafo_euleriano)
-
-    # Pilha para o algoritmo de Hierholzer
-    pilha = [inicio]
-    circuito = []
-
-    while pilha:
-        v = pilha[-1]
-
-        if grafo[v]:
-            # Se tem arestas não visitadas, escolhe uma
-            u = grafo[v].pop()
-            # Remove aresta reversa
-            grafo[u].remove(v)
-            pilha.append(u)
-        else:
-            # Se não tem arestas, adiciona ao circuito
-            circuito.append(pilha.pop())
-
-    return circuito[::-1]  # Reverter para ordem correta
+    # Converter a lista de adjacência em lista de arestas: cada aresta aparece
+    # nas listas dos dois extremos, então basta pegar o lado com v < u.
+    # O grafo original não é modificado e não é preciso copiá-lo.
+    arestas = [
+        (v, u) for v, vizinhos in grafo_euleriano.items() for u in vizinhos if v < u
+    ]
+    n = max(grafo_euleriano) + 1 if grafo_euleriano else 0
+
+    # Hierholzer sobre arrays de adjacência (aresta reversa removida em O(1))
+    return hierholzer(arestas, n, inicio)
 
 
 def remover_vertices_repetidos(circuito_euleriano):
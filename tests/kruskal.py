@@ -5,71 +5,19 @@ Este módulo implementa o algoritmo de Kruskal para encontrar a Árvore Geradora
 de um grafo representado por uma matriz de distâncias. A AGM conecta todos os vértices
 com o menor custo total possível, sem formar ciclos.
 
-O algoritmo utiliza a estrutura Union-Find (Disjoint Set) para detectar ciclos eficientemente.
+A ordenação das arestas e o Union-Find (Disjoint Set) que detecta ciclos ficam em
+`utils.agm`, que extrai o triângulo superior com NumPy em vez de montar listas de tuplas.
 """
 
+try:
+    from utils.agm import kruskal_numpy
+except ImportError:
+    # rodando como script (python tests/kruskal.py): a raiz não está no path
+    import os
+    import sys
 
-class UnionFind:
-    """
-    Estrutura de dados Union-Find (Disjoint Set)
-
-    Utilizada para rastrear conjuntos disjuntos e detectar ciclos no grafo.
-    Implementa otimizações de compressão de caminho e união por rank.
-    """
-
-    def __init__(self, n):
-        """
-        Inicializa a estrutura Union-Find
-
-        Args:
-            n (int): Número de elementos (vértices)
-        """
-        self.parent = list(range(n))  # Cada elemento é seu próprio pai inicialmente
-        self.rank = [0] * n  # Rank para otimização de união
-
-    def find(self, x):
-        """
-        Encontra o representante (raiz) do conjunto de x
-        Implementa compressão de caminho para otimização
-
-        Args:
-            x (int): Elemento a ser buscado
-
-        Returns:
-            int: Representante do conjunto
-        """
-        if self.parent[x] != x:
-            self.parent[x] = self.find(self.parent[x])  # Compressão de caminho
-        return self.parent[x]
-
-    def union(self, x, y):
-        """
-        Une os conjuntos que contêm x e y
-        Implementa união por rank para manter a árvore balanceada
-
-        Args:
-            x (int): Primeiro elemento
-            y (int): Segundo elemento
-
-        Returns:
-            bool: True se os conjuntos foram unidos, False se já estavam no mesmo conjunto
-        """
-        root_x = self.find(x)
-        root_y = self.find(y)
-
-        if root_x == root_y:
-            return False  # Já estão no mesmo conjunto (formaria ciclo)
-
-        # União por rank: anexa a árvore menor à maior
-        if self.rank[root_x] < self.rank[root_y]:
-            self.parent[root_x] = root_y
-        elif self.rank[root_x] > self.rank[root_y]:
-            self.parent[root_y] = root_x
-        else:
-            self.parent[root_y] = root_x
-            self.rank[root_x] += 1
-
-        return True
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.agm import kruskal_numpy
 
 
 def kruskal(matriz_distancias):
@@ -92,35 +40,12 @@ def kruskal(matriz_distancias):
             - arestas_agm: Lista de tuplas (vertice_i, vertice_j, peso)
             - custo_total: Soma total dos pesos das arestas na AGM
     """
-    n = len(matriz_distancias)
+    # Passos 1 a 4 vetorizados: triângulo superior + argsort + Union-Find
+    arestas, pesos, custo_total = kruskal_numpy(matriz_distancias)
 
-    # Passo 1: Criar lista de arestas
-    # Formato: (peso, vertice_i, vertice_j)
-    arestas = []
-    for i in range(n):
-        for j in range(i + 1, n):  # Apenas metade da matriz (grafo não-direcionado)
-            if i != j:
-                peso = matriz_distancias[i][j]
-                arestas.append((peso, i, j))
-
-    # Passo 2: Ordenar arestas por peso (crescente)
-    arestas.sort()
-
-    # Passo 3: Inicializar Union-Find e resultado
-    uf = UnionFind(n)
-    arestas_agm = []
-    custo_total = 0.0
-
-    # Passo 4: Processar arestas em ordem crescente de peso
-    for peso, i, j in arestas:
-        # Se adicionar esta aresta não formar ciclo
-        if uf.union(i, j):
-            arestas_agm.append((i, j, peso))
-            custo_total += peso
-
-            # AGM completa tem exatamente (n-1) arestas
-            if len(arestas_agm) == n - 1:
-                break
+    arestas_agm = [
+        (i, j, peso) for (i, j), peso in zip(arestas.tolist(), pesos.tolist())
+    ]
 
     return arestas_agm, custo_total
 
@@ -0,0 +1,133 @@
+"""
+Árvore Geradora Mínima (AGM) vetorizada com NumPy.
+
+Duas variantes sobre a matriz densa de distâncias/tempos:
+ - kruskal_numpy: arestas do triângulo superior ordenadas com argsort e
+   Union-Find iterativo baseado em arrays (sem recursão);
+ - prim_denso: Prim O(n²) com atualização vetorizada das chaves, a melhor
+   opção para grafos completos como o dos bares.
+
+Ambas retornam (arestas, pesos, custo_total), com `arestas` no formato
+array (n-1, 2) de índices e `pesos` array (n-1,).
+"""
+
+import numpy as np
+
+
+class UnionFindArray:
+    """Union-Find iterativo com compressão de caminho e união por rank."""
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.rank = [0] * n
+
+    def find(self, x):
+        parent = self.parent
+        raiz = x
+        while parent[raiz] != raiz:
+            raiz = parent[raiz]
+        # compressão de caminho
+        while parent[x] != raiz:
+            parent[x], x = raiz, parent[x]
+        return raiz
+
+    def union(self, x, y):
+        rx = self.find(x)
+        ry = self.find(y)
+        if rx == ry:
+            return False
+        if self.rank[rx] < self.rank[ry]:
+            rx, ry = ry, rx
+        self.parent[ry] = rx
+        if self.rank[rx] == self.rank[ry]:
+            self.rank[rx] += 1
+        return True
+
+
+def _como_matriz(matriz):
+    m = np.asarray(matriz, dtype=np.float64)
+    if m.ndim != 2 or m.shape[0] != m.shape[1]:
+        raise ValueError(f"Matriz deve ser quadrada, recebido shape {m.shape}")
+    return m
+
+
+def _agm_vazia():
+    return np.empty((0, 2), dtype=np.intp), np.empty(0, dtype=np.float64), 0.0
+
+
+def kruskal_numpy(matriz):
+    """Kruskal sobre o triângulo superior da matriz (grafo não-direcionado).
+
+    A ordenação das n(n-1)/2 arestas é feita em NumPy; o laço Python percorre
+    apenas o prefixo ordenado necessário até obter n-1 arestas.
+    """
+    m = _como_matriz(matriz)
+    n = len(m)
+    if n < 2:
+        return _agm_vazia()
+
+    origens, destinos = np.triu_indices(n, k=1)
+    pesos = m[origens, destinos]
+    ordem = np.argsort(pesos, kind="stable")
+
+    uf = UnionFindArray(n)
+    escolhidas = []
+    # processa em blocos para não converter todas as arestas em objetos Python
+    bloco = max(4 * n, 1024)
+    for inicio in range(0, len(ordem), bloco):
+        idx = ordem[inicio : inicio + bloco]
+        for e, i, j in zip(idx.tolist(), origens[idx].tolist(), destinos[idx].tolist()):
+            if uf.union(i, j):
+                escolhidas.append(e)
+                if len(escolhidas) == n - 1:
+                    break
+        if len(escolhidas) == n - 1:
+            break
+
+    escolhidas = np.asarray(escolhidas, dtype=np.intp)
+    arestas = np.column_stack((origens[escolhidas], destinos[escolhidas]))
+    pesos_agm = pesos[escolhidas]
+    return arestas, pesos_agm, float(pesos_agm.sum())
+
+
+def prim_denso(matriz, raiz=0):
+    """Prim O(n²) para grafos completos, com atualização vetorizada das chaves."""
+    m = _como_matriz(matriz)
+    n = len(m)
+    if n < 2:
+        return _agm_vazia()
+
+    na_arvore = np.zeros(n, dtype=bool)
+    chave = np.full(n, np.inf)
+    pai = np.full(n, -1, dtype=np.intp)
+
+    na_arvore[raiz] = True
+    chave[:] = m[raiz]
+    pai[:] = raiz
+    chave[raiz] = np.inf
+
+    arestas = np.empty((n - 1, 2), dtype=np.intp)
+    pesos = np.empty(n - 1, dtype=np.float64)
+    for k in range(n - 1):
+        v = int(np.argmin(chave))
+        arestas[k] = (pai[v], v)
+        pesos[k] = chave[v]
+        na_arvore[v] = True
+        chave[v] = np.inf
+
+        # relaxa as chaves dos vértices fora da árvore usando a linha de v
+        linha = m[v]
+        melhora = (~na_arvore) & (linha < chave)
+        chave[melhora] = linha[melhora]
+        pai[melhora] = v
+
+    return arestas, pesos, float(pesos.sum())
+
+
+def arvore_geradora_minima(matriz, metodo="prim"):
+    """Atalho para escolher a implementação da AGM ("prim" ou "kruskal")."""
+    if metodo == "prim":
+        return prim_denso(matriz)
+    if metodo == "kruskal":
+        return kruskal_numpy(matriz)
+    raise ValueError(f"Método de AGM desconhecido: {metodo}")
@@ -0,0 +1,207 @@
+"""
+Construção no estilo Christofides a partir da AGM.
+
+Evolução da heurística de Bellmore-Nemhauser (tests/bellmore_nemhauser.py):
+em vez de duplicar todas as arestas da AGM, apenas os vértices de grau ímpar
+são emparelhados (emparelhamento de custo mínimo exato para poucos vértices,
+guloso para o restante). O circuito/caminho euleriano é obtido com Hierholzer
+sobre arrays de adjacência, sem deepcopy do grafo nem `list.remove`.
+
+ - christofides: circuito fechado, rotacionado para começar em `inicio`;
+ - christofides_caminho: caminho aberto com o bar inicial fixo (variante de
+   Hoogeveen), que é o formato de rota usado pelo tabu search.
+"""
+
+import numpy as np
+
+try:
+    from .agm import prim_denso
+except Exception:
+    from agm import prim_denso
+
+
+def _matriz_simetrica(matriz):
+    m = np.asarray(matriz, dtype=np.float64)
+    return (m + m.T) / 2.0
+
+
+def vertices_grau_impar(arestas, n):
+    """Retorna array com os vértices de grau ímpar no (multi)grafo."""
+    graus = np.bincount(np.asarray(arestas, dtype=np.intp).ravel(), minlength=n)
+    return np.flatnonzero(graus % 2 == 1)
+
+
+def _emparelhamento_guloso(m, vertices):
+    k = len(vertices)
+    if k < 2:
+        return []
+    a, b = np.triu_indices(k, k=1)
+    ordem = np.argsort(m[vertices[a], vertices[b]], kind="stable")
+    livre = np.ones(k, dtype=bool)
+    pares = []
+    for p, q in zip(a[ordem].tolist(), b[ordem].tolist()):
+        if livre[p] and livre[q]:
+            livre[p] = livre[q] = False
+            pares.append((int(vertices[p]), int(vertices[q])))
+            if len(pares) == k // 2:
+                break
+    return pares
+
+
+def _emparelhamento_exato(m, vertices):
+    """DP sobre subconjuntos (O(2^k · k)); aceita k ímpar deixando um livre."""
+    k = len(vertices)
+    impar = k % 2 == 1
+    if impar:
+        # vértice fictício com custo zero: quem casar com ele fica livre
+        k += 1
+    sub = np.zeros((k, k))
+    real = len(vertices)
+    sub[:real, :real] = m[np.ix_(vertices, vertices)]
+
+    total = 1 << k
+    dp = np.full(total, np.inf)
+    escolha = np.full(total, -1, dtype=np.int64)
+    dp[0] = 0.0
+    for mask in range(total):
+        if dp[mask] == np.inf:
+            continue
+        # menor vértice ainda livre é sempre emparelhado primeiro
+        livres = ~mask & (total - 1)
+        if livres == 0:
+            continue
+        i = (livres & -livres).bit_length() - 1
+        for j in range(i + 1, k):
+            if livres >> j & 1:
+                novo = mask | (1 << i) | (1 << j)
+                custo = dp[mask] + sub[i, j]
+                if custo < dp[novo]:
+                    dp[novo] = custo
+                    escolha[novo] = i * k + j
+
+    pares = []
+    mask = total - 1
+    while mask:
+        i, j = divmod(int(escolha[mask]), k)
+        if i < real and j < real:
+            pares.append((int(vertices[i]), int(vertices[j])))
+        mask &= ~((1 << i) | (1 << j))
+    return pares
+
+
+def emparelhamento_minimo(matriz, vertices, exato_ate=12):
+    """Emparelha `vertices` com custo mínimo (exato até `exato_ate` vértices).
+
+    Com quantidade ímpar, exatamente um vértice fica sem par.
+    """
+    m = np.asarray(matriz, dtype=np.float64)
+    vertices = np.asarray(vertices, dtype=np.intp)
+    if len(vertices) <= exato_ate:
+        return _emparelhamento_exato(m, vertices)
+    return _emparelhamento_guloso(m, vertices)
+
+
+def hierholzer(arestas, n, inicio=0):
+    """Circuito (ou caminho) euleriano a partir de `inicio`.
+
+    `arestas` é um array (m, 2) de um multigrafo conexo. A adjacência é montada
+    em formato CSR (vizinho, id da aresta) e cada aresta é marcada como usada
+    por id, de modo que remover a aresta reversa é O(1).
+    """
+    arestas = np.asarray(arestas, dtype=np.intp).reshape(-1, 2)
+    m = len(arestas)
+    if m == 0:
+        return [inicio]
+
+    origem = np.concatenate((arestas[:, 0], arestas[:, 1]))
+    destino = np.concatenate((arestas[:, 1], arestas[:, 0]))
+    ids = np.concatenate((np.arange(m), np.arange(m)))
+    ordem = np.argsort(origem, kind="stable")
+    vizinhos = destino[ordem].tolist()
+    id_aresta = ids[ordem].tolist()
+    ponteiro = np.searchsorted(origem[ordem], np.arange(n + 1)).tolist()
+    fim = ponteiro[1:]
+
+    usada = [False] * m
+    pilha = [inicio]
+    caminho = []
+    while pilha:
+        v = pilha[-1]
+        p = ponteiro[v]
+        while p < fim[v] and usada[id_aresta[p]]:
+            p += 1
+        ponteiro[v] = p
+        if p < fim[v]:
+            usada[id_aresta[p]] = True
+            ponteiro[v] = p + 1
+            pilha.append(vizinhos[p])
+        else:
+            caminho.append(pilha.pop())
+
+    return caminho[::-1]
+
+
+def aplicar_atalhos(sequencia):
+    """Remove repetições mantendo a primeira ocorrência de cada vértice."""
+    seq = np.asarray(sequencia, dtype=np.intp)
+    _, primeira = np.unique(seq, return_index=True)
+    return seq[np.sort(primeira)].tolist()
+
+
+def custo_caminho(rota, matriz, fechado=False):
+    m = np.asarray(matriz, dtype=np.float64)
+    rota = np.asarray(rota, dtype=np.intp)
+    if len(rota) < 2:
+        return 0.0
+    custo = float(m[rota[:-1], rota[1:]].sum())
+    if fechado:
+        custo += float(m[rota[-1], rota[0]])
+    return custo
+
+
+def christofides(matriz, inicio=0, exato_ate=12):
+    """Circuito hamiltoniano pela construção de Christofides.
+
+    Returns:
+        tuple: (rota começando em `inicio`, custo do circuito fechado)
+    """
+    m = _matriz_simetrica(matriz)
+    n = len(m)
+    if n <= 1:
+        return list(range(n)), 0.0
+
+    arestas_agm, _, _ = prim_denso(m, raiz=inicio)
+    impares = vertices_grau_impar(arestas_agm, n)
+    pares = emparelhamento_minimo(m, impares, exato_ate=exato_ate)
+    multigrafo = np.vstack(
+        (arestas_agm, np.asarray(pares, dtype=np.intp).reshape(-1, 2))
+    )
+
+    rota = aplicar_atalhos(hierholzer(multigrafo, n, inicio))
+    return rota, custo_caminho(rota, matriz, fechado=True)
+
+
+def christofides_caminho(matriz, inicio=0, exato_ate=12):
+    """Caminho hamiltoniano aberto começando obrigatoriamente em `inicio`.
+
+    Emparelha os vértices ímpares da AGM com a paridade de `inicio` invertida;
+    o vértice que sobra sem par vira o outro extremo do caminho euleriano.
+
+    Returns:
+        tuple: (rota começando em `inicio`, custo do caminho aberto)
+    """
+    m = _matriz_simetrica(matriz)
+    n = len(m)
+    if n <= 1:
+        return list(range(n)), 0.0
+
+    arestas_agm, _, _ = prim_denso(m, raiz=inicio)
+    impares = set(vertices_grau_impar(arestas_agm, n).tolist())
+    impares ^= {inicio}
+    pares = emparelhamento_minimo(m, sorted(impares), exato_ate=exato_ate)
+    multigrafo = np.vstack(
+        (arestas_agm, np.asarray(pares, dtype=np.intp).reshape(-1, 2))
+    )
+
+    rota = aplicar_atalhos(hierholzer(multigrafo, n, inicio))
+    return rota, custo_caminho(rota, matriz)
@@ -0,0 +1,102 @@
+"""
+Coalescência de chamadas idênticas em andamento ("single-flight").
+
+Quando várias requisições iguais chegam juntas (ex.: um link compartilhado
+durante o evento), só a primeira roda o solver; as outras esperam a mesma
+execução e recebem o mesmo resultado (ou a mesma exceção). Não é um cache:
+assim que a execução termina a chave sai do mapa e a próxima requisição roda
+de novo.
+
+ - `VooUnico`: para servidores com threads (Flask/gunicorn gthread);
+ - `VooUnicoAsync`: para o event loop da API ASGI. Cada interessado informa
+   como detectar a própria desconexão, e a execução compartilhada só é
+   cancelada quando todos desconectaram.
+
+`executar` retorna `(resultado, compartilhado)`, com `compartilhado=True`
+para quem pegou carona na execução de outro.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class VooUnico:
+    """Single-flight entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_voo = {}
+
+    def executar(self, chave, funcao, *args, **kwargs):
+        with self._lock:
+            futuro = self._em_voo.get(chave)
+            lider = futuro is None
+            if lider:
+                futuro = self._em_voo[chave] = Future()
+
+        if not lider:
+            return futuro.result(), True
+
+        try:
+            resultado = funcao(*args, **kwargs)
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado, False
+        finally:
+            with self._lock:
+                del self._em_voo[chave]
+
+    @property
+    def em_voo(self):
+        return len(self._em_voo)
+
+
+async def _nunca_desconecta():
+    return False
+
+
+class _Voo:
+    def __init__(self):
+        self.tarefa = None
+        self.verificadores = []
+
+    async def todos_desconectados(self):
+        for desconectado in self.verificadores:
+            if not await desconectado():
+                return False
+        return bool(self.verificadores)
+
+
+class VooUnicoAsync:
+    """Single-flight no event loop.
+
+    `funcao` é uma corrotina chamada como `funcao(desconectado)`, em que
+    `desconectado` só retorna True quando todos os interessados saíram.
+    """
+
+    def __init__(self):
+        self._em_voo = {}
+
+    async def executar(self, chave, funcao, desconectado=None):
+        voo = self._em_voo.get(chave)
+        compartilhado = voo is not None
+        if voo is None:
+            voo = self._em_voo[chave] = _Voo()
+            voo.tarefa = asyncio.ensure_future(funcao(voo.todos_desconectados))
+            voo.tarefa.add_done_callback(lambda _: self._liberar(chave, voo))
+        voo.verificadores.append(desconectado or _nunca_desconecta)
+
+        # shield: cancelar quem espera não cancela a execução dos outros
+        return await asyncio.shield(voo.tarefa), compartilhado
+
+    def _liberar(self, chave, voo):
+        if self._em_voo.get(chave) is voo:
+            del self._em_voo[chave]
+
+    @property
+    def em_voo(self):
+        return len(self._em_voo)
@@ -0,0 +1,158 @@
+"""
+Heurísticas construtivas para caminhos abertos com bar inicial fixo.
+
+Todas recebem uma matriz densa (tipicamente a submatriz de `tempos` restrita
+aos bares candidatos) e o índice local do bar inicial, e retornam a rota como
+lista de índices locais começando em `inicio`.
+"""
+
+import numpy as np
+
+try:
+    from .agm import prim_denso
+    from .christofides import aplicar_atalhos, hierholzer
+except Exception:
+    from agm import prim_denso
+    from christofides import aplicar_atalhos, hierholzer
+
+
+def vizinho_mais_proximo_lote(matriz, inicios=None, tamanho_bloco=None):
+    """Vizinho mais próximo a partir de vários inícios ao mesmo tempo.
+
+    Cada passo é um argmin mascarado sobre as linhas da matriz, feito de uma
+    vez para todas as rotas do bloco. Os inícios são processados em blocos para
+    limitar a memória a `tamanho_bloco` × n por passo.
+
+    Returns:
+        tuple: (rotas, custos) — array (k, n) de índices e array (k,) com o
+        custo do caminho aberto de cada rota
+    """
+    m = np.asarray(matriz, dtype=np.float64)
+    n = len(m)
+    if inicios is None:
+        inicios = np.arange(n)
+    inicios = np.atleast_1d(np.asarray(inicios, dtype=np.intp))
+    k = len(inicios)
+    if tamanho_bloco is None:
+        tamanho_bloco = max(1, min(k, 4_000_000 // max(n, 1)))
+
+    rotas = np.empty((k, n), dtype=np.intp)
+    custos = np.zeros(k, dtype=np.float64)
+    for b in range(0, k, tamanho_bloco):
+        atual = inicios[b : b + tamanho_bloco].copy()
+        linhas = np.arange(len(atual))
+        visitado = np.zeros((len(atual), n), dtype=bool)
+        visitado[linhas, atual] = True
+        rotas[b : b + len(atual), 0] = atual
+        for passo in range(1, n):
+            dist = np.where(visitado, np.inf, m[atual])
+            proximo = np.argmin(dist, axis=1)
+            custos[b : b + len(atual)] += dist[linhas, proximo]
+            visitado[linhas, proximo] = True
+            rotas[b : b + len(atual), passo] = proximo
+            atual = proximo
+    return rotas, custos
+
+
+def melhor_vizinho_mais_proximo(matriz, inicio=0):
+    """Melhor rota de vizinho mais próximo entre todos os inícios, ancorada.
+
+    Cada rota construída a partir de um início qualquer é tratada como ciclo e
+    rotacionada para começar em `inicio`; fica a de menor custo de caminho.
+    """
+    m = np.asarray(matriz, dtype=np.float64)
+    n = len(m)
+    if n <= 2:
+        return [inicio] + [v for v in range(n) if v != inicio]
+    rotas, _ = vizinho_mais_proximo_lote(m)
+    deslocamento = np.argmax(rotas == inicio, axis=1)
+    ordem = (deslocamento[:, None] + np.arange(n)[None, :]) % n
+    rotas = np.take_along_axis(rotas, ordem, axis=1)
+    custos = m[rotas[:, :-1], rotas[:, 1:]].sum(axis=1)
+    return rotas[int(np.argmin(custos))].tolist()
+
+
+def atalho_agm(matriz, inicio=0):
+    """Percorre a AGM enraizada em `inicio` (árvore duplicada + atalhos)."""
+    m = np.asarray(matriz, dtype=np.float64)
+    n = len(m)
+    if n <= 1:
+        return list(range(n))
+    arestas, _, _ = prim_denso(m, raiz=inicio)
+    duplicadas = np.vstack((arestas, arestas))
+    return aplicar_atalhos(hierholzer(duplicadas, n, inicio))
+
+
+def insercao_mais_barata(matriz, inicio=0):
+    """Inserção mais barata a partir de `inicio`, mantendo o caminho aberto.
+
+    Para cada bar fora do caminho guarda-se o custo da melhor posição de
+    inserção (entre dois bares consecutivos ou no final). Após cada inserção só
+    as duas arestas novas são comparadas, em bloco, contra esse custo; bares cuja
+    melhor posição foi desfeita são recalculados contra o caminho inteiro.
+    """
+    m = np.asarray(matriz, dtype=np.float64)
+    n = len(m)
+    if n <= 1:
+        return list(range(n))
+
+    prox = np.full(n, -1, dtype=np.intp)  # -1 marca o fim do caminho
+    fora = np.ones(n, dtype=bool)
+    fora[inicio] = False
+    ultimo = inicio
+
+    # inserir w depois de `a` custa m[a, w] + m[w, prox[a]] - m[a, prox[a]]
+    custo = m[inicio].copy()
+    apos = np.full(n, inicio, dtype=np.intp)
+    custo[inicio] = np.inf
+
+    for _ in range(n - 1):
+        v = int(np.argmin(custo))
+        a = int(apos[v])
+        b = int(prox[a])
+        prox[v] = b
+        prox[a] = v
+        fora[v] = False
+        custo[v] = np.inf
+        if b == -1:
+            ultimo = v
+
+        # bares cuja melhor posição era a aresta (a, b), que deixou de existir
+        afetados = np.flatnonzero(fora & (apos == a))
+        if len(afetados):
+            caminho = [inicio]
+            while prox[caminho[-1]] != -1:
+                caminho.append(int(prox[caminho[-1]]))
+            caminho = np.asarray(caminho, dtype=np.intp)
+            seguintes = prox[caminho]
+            meio = caminho[:-1]
+            custos = (
+                m[np.ix_(meio, afetados)]
+                + m[np.ix_(afetados, seguintes[:-1])].T
+                - m[meio, seguintes[:-1]][:, None]
+            )
+            custos = np.vstack((custos, m[ultimo, afetados][None, :]))
+            melhor = np.argmin(custos, axis=0)
+            custo[afetados] = custos[melhor, np.arange(len(afetados))]
+            apos[afetados] = caminho[melhor]
+
+        # novas arestas (a, v) e (v, b) — ou v como novo final
+        livres = np.flatnonzero(fora)
+        if not len(livres):
+            continue
+        novo = m[a, livres] + m[livres, v] - m[a, v]
+        melhora = novo < custo[livres]
+        custo[livres[melhora]] = novo[melhora]
+        apos[livres[melhora]] = a
+        if b == -1:
+            novo = m[v, livres]
+        else:
+            novo = m[v, livres] + m[livres, b] - m[v, b]
+        melhora = novo < custo[livres]
+        custo[livres[melhora]] = novo[melhora]
+        apos[livres[melhora]] = v
+
+    rota = [inicio]
+    while prox[rota[-1]] != -1:
+        rota.append(int(prox[rota[-1]]))
+    return rota
@@ -0,0 +1,710 @@
+"""
+Construção paralela e retomável das matrizes de distância/tempo entre bares.
+
+Substitui o laço par a par de `google_api.obter_matriz_distancia` (uma
+chamada por par, ~7.600 para 124 bares, e nada salvo até o fim):
+
+ - a matriz é dividida em blocos origens × destinos do tamanho máximo aceito
+   pelo provedor (Google: 100 elementos por chamada, então blocos 10 × 10);
+ - com `simetrica=True` (padrão, como no script original) só os blocos do
+   triângulo superior são consultados e espelhados;
+ - os blocos rodam em um pool de threads, com limite de chamadas por segundo
+   e novas tentativas com backoff exponencial;
+ - cada bloco concluído é anexado a um checkpoint JSONL; rodar de novo com as
+   mesmas coordenadas retoma de onde parou.
+
+Provedores implementam `consultar(origens, destinos)` e retornam
+`(distancias_km, tempos_min)` como listas de listas, com None nos pares sem
+rota. `ProvedorHaversine` e `ProvedorOSRM` (resposta salva do `/table` do
+OSRM) funcionam offline, para testes e para rodar sem chave da API.
+
+Com `--vizinhos K`, em vez das matrizes densas é construído o grafo esparso
+(utils/grafo_esparso.py) com só os K bares mais próximos de cada um: O(n·K)
+pares consultados, com o mesmo pool e checkpoint.
+
+    python -m utils.construtor_matriz --provedor haversine --saida /tmp/m.pkl
+    python -m utils.construtor_matriz --provedor haversine --vizinhos 20 \\
+        --saida /tmp/grafo.npz
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+try:
+    from .dados import (
+        carregar_bares,
+        carregar_manifesto,
+        carregar_matrizes,
+        converter_coordenada,
+        ids_bares,
+        salvar_matrizes,
+    )
+    from .grafo_esparso import ARESTAS_CALIBRACAO, GrafoEsparso
+    from .indice_espacial import IndiceEspacial
+except Exception:
+    from dados import (
+        carregar_bares,
+        carregar_manifesto,
+        carregar_matrizes,
+        converter_coordenada,
+        ids_bares,
+        salvar_matrizes,
+    )
+    from grafo_esparso import ARESTAS_CALIBRACAO, GrafoEsparso
+    from indice_espacial import IndiceEspacial
+
+logger = logging.getLogger("construtor_matriz")
+
+RAIO_TERRA_KM = 6371.0088
+
+
+def coordenadas_bares(df):
+    """Lista de (lat, lng) em graus decimais, na ordem do DataFrame."""
+    coordenadas = []
+    sem_coordenada = []
+    for _, bar in df.iterrows():
+        lat = converter_coordenada(bar.get("Latitude"), None, tipo="lat")
+        lng = converter_coordenada(bar.get("Longitude"), None, tipo="lng")
+        if lat is None or lng is None:
+            sem_coordenada.append(bar["Nome do Buteco"])
+        coordenadas.append((lat, lng))
+    if sem_coordenada:
+        raise ValueError(f"Bares sem coordenadas válidas: {sem_coordenada}")
+    return coordenadas
+
+
+class ProvedorHaversine:
+    """Distância em linha reta × fator de desvio, a uma velocidade média fixa.
+
+    Substituto offline do Google: mesma ordem de grandeza, sem rede e
+    determinístico.
+    """
+
+    max_origens = 1000
+    max_destinos = 1000
+    max_elementos = 1_000_000
+
+    def __init__(self, velocidade_kmh=25.0, fator_desvio=1.3):
+        self.velocidade_kmh = velocidade_kmh
+        self.fator_desvio = fator_desvio
+
+    def consultar(self, origens, destinos):
+        o = np.radians(np.asarray(origens, dtype=np.float64))
+        d = np.radians(np.asarray(destinos, dtype=np.float64))
+        dlat = d[None, :, 0] - o[:, None, 0]
+        dlng = d[None, :, 1] - o[:, None, 1]
+        a = (
+            np.sin(dlat / 2) ** 2
+            + np.cos(o[:, None, 0]) * np.cos(d[None, :, 0]) * np.sin(dlng / 2) ** 2
+        )
+        km = 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(a)) * self.fator_desvio
+        minutos = km / self.velocidade_kmh * 60
+        return km.round(3).tolist(), minutos.tolist()
+
+
+class ProvedorOSRM:
+    """Lê uma resposta salva do serviço `/table` do OSRM.
+
+    O arquivo deve ter `sources`/`destinations` (com `location` = [lng, lat]),
+    `durations` (segundos) e `distances` (metros), como retornado por
+    `/table/v1/driving/...?annotations=duration,distance`.
+    """
+
+    max_origens = 1000
+    max_destinos = 1000
+    max_elementos = 1_000_000
+
+    def __init__(self, caminho, casas=5):
+        with open(caminho, encoding="utf-8") as f:
+            tabela = json.load(f)
+        self.casas = casas
+        self._origens = self._indexar(tabela["sources"])
+        self._destinos = self._indexar(tabela["destinations"])
+        self._duracoes = tabela["durations"]
+        self._distancias = tabela["distances"]
+
+    def _chave(self, lat, lng):
+        return round(lat, self.casas), round(lng, self.casas)
+
+    def _indexar(self, pontos):
+        return {
+            self._chave(p["location"][1], p["location"][0]): i
+            for i, p in enumerate(pontos)
+        }
+
+    def consultar(self, origens, destinos):
+        distancias, tempos = [], []
+        for lat_o, lng_o in origens:
+            i = self._origens.get(self._chave(lat_o, lng_o))
+            linha_d, linha_t = [], []
+            for lat_d, lng_d in destinos:
+                j = self._destinos.get(self._chave(lat_d, lng_d))
+                if i is None or j is None or self._duracoes[i][j] is None:
+                    linha_d.append(None)
+                    linha_t.append(None)
+                else:
+                    linha_d.append(self._distancias[i][j] / 1000)
+                    linha_t.append(self._duracoes[i][j] / 60)
+            distancias.append(linha_d)
+            tempos.append(linha_t)
+        return distancias, tempos
+
+
+class ProvedorGoogle:
+    """Distance Matrix API do Google (dependência opcional `googlemaps`)."""
+
+    max_origens = 25
+    max_destinos = 25
+    max_elementos = 100
+
+    def __init__(self, api_key, modo="driving"):
+        import googlemaps
+
+        self.cliente = googlemaps.Client(key=api_key)
+        self.modo = modo
+
+    def consultar(self, origens, destinos):
+        res = self.cliente.distance_matrix(
+            origins=origens, destinations=destinos, mode=self.modo
+        )
+        if res["status"] != "OK":
+            raise RuntimeError(f"Erro na API: {res['status']}")
+
+        distancias, tempos = [], []
+        for linha in res["rows"]:
+            linha_d, linha_t = [], []
+            for elemento in linha["elements"]:
+                if (
+                    elemento["status"] != "OK"
+                    or "distance" not in elemento
+                    or "duration" not in elemento
+                ):
+                    linha_d.append(None)
+                    linha_t.append(None)
+                    continue
+                linha_d.append(elemento["distance"]["value"] / 1000)
+                linha_t.append(elemento["duration"]["value"] / 60)
+            distancias.append(linha_d)
+            tempos.append(linha_t)
+        return distancias, tempos
+
+
+class LimitadorTaxa:
+    """Espaça as chamadas para no máximo `por_segundo` (entre threads)."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+
+def tamanho_bloco(provedor):
+    """Maior bloco quadrado que respeita os limites do provedor."""
+    lado = min(
+        provedor.max_origens,
+        provedor.max_destinos,
+        math.isqrt(provedor.max_elementos),
+    )
+    return max(1, lado)
+
+
+def _fatiar(indices, lado):
+    return [tuple(indices[k : k + lado]) for k in range(0, len(indices), lado)]
+
+
+def dividir_blocos(n, lado, simetrica=True, linhas=None):
+    """Blocos (índices das origens, índices dos destinos).
+
+    Sem `linhas`, cobre a matriz toda (simétrica: só o triângulo superior);
+    com `linhas`, só as linhas e colunas desses bares (atualização
+    incremental).
+    """
+    colunas = _fatiar(list(range(n)), lado)
+    if linhas is None:
+        return [
+            (origens, destinos)
+            for a, origens in enumerate(colunas)
+            for b, destinos in enumerate(colunas)
+            if not simetrica or b >= a
+        ]
+    blocos = [
+        (origens, destinos)
+        for origens in _fatiar(sorted(linhas), lado)
+        for destinos in colunas
+    ]
+    if not simetrica:
+        # colunas dos novos bares a partir das origens já existentes
+        novos = set(linhas)
+        antigos = [i for i in range(n) if i not in novos]
+        blocos += [
+            (origens, destinos)
+            for origens in _fatiar(antigos, lado)
+            for destinos in _fatiar(sorted(linhas), lado)
+        ]
+    return blocos
+
+
+def _impressao(coordenadas, lado, simetrica, linhas, vizinhos=None):
+    partes = [coordenadas, lado, simetrica, linhas]
+    if vizinhos is not None:
+        partes.append({"vizinhos": vizinhos})
+    dados = json.dumps(partes)
+    return hashlib.sha256(dados.encode()).hexdigest()[:16]
+
+
+def _sem_nan(matriz):
+    return [
+        [None if v is None or math.isnan(v) else v for v in linha] for linha in matriz
+    ]
+
+
+class Checkpoint:
+    """Blocos concluídos em JSONL (uma linha por bloco, anexada e sincronizada).
+
+    A primeira linha guarda a impressão das coordenadas e do tamanho de
+    bloco; se não bater, o arquivo é recomeçado. Uma última linha truncada
+    (queda no meio da escrita) é ignorada.
+    """
+
+    def __init__(self, caminho, impressao):
+        self.caminho = caminho
+        self.impressao = impressao
+        self._lock = threading.Lock()
+
+    def carregar(self):
+        if not self.caminho or not os.path.exists(self.caminho):
+            return []
+        blocos = []
+        with open(self.caminho, "rb") as f:
+            linhas = f.read().split(b"\n")
+        # sem "\n" final, a última linha ficou pela metade
+        incompleta = linhas.pop()
+        if not linhas or json.loads(linhas[0]).get("impressao") != self.impressao:
+            logger.warning(
+                "Checkpoint de outra entrada, recomeçando",
+                extra={"caminho": self.caminho},
+            )
+            return []
+        for linha in linhas[1:]:
+            blocos.append(json.loads(linha))
+        if incompleta:
+            # descarta o resto para as próximas linhas serem anexadas inteiras
+            with open(self.caminho, "r+b") as f:
+                f.truncate(sum(len(linha) + 1 for linha in linhas))
+        return blocos
+
+    def iniciar(self, retomando):
+        if not self.caminho or retomando:
+            return
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        with open(self.caminho, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"impressao": self.impressao}) + "\n")
+
+    def salvar(self, linhas, colunas, distancias, tempos):
+        if not self.caminho:
+            return
+        registro = {
+            "linhas": list(linhas),
+            "colunas": list(colunas),
+            "distancias": _sem_nan(distancias),
+            "tempos": _sem_nan(tempos),
+        }
+        with self._lock, open(self.caminho, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _preencher(distancias, tempos, linhas, colunas, bloco_d, bloco_t, simetrica):
+    d = np.array(bloco_d, dtype=np.float64)
+    t = np.array(bloco_t, dtype=np.float64)
+    distancias[np.ix_(linhas, colunas)] = d
+    tempos[np.ix_(linhas, colunas)] = t
+    if simetrica:
+        distancias[np.ix_(colunas, linhas)] = d.T
+        tempos[np.ix_(colunas, linhas)] = t.T
+
+
+def _executar_blocos(
+    coordenadas,
+    provedor,
+    blocos,
+    checkpoint,
+    concluir,
+    trabalhadores,
+    por_segundo,
+    tentativas,
+    espera_inicial,
+    contexto,
+):
+    """Consulta no pool os `blocos` que ainda não estão no checkpoint.
+
+    `concluir(linhas, colunas, distancias, tempos)` recebe cada bloco
+    (retomado do checkpoint ou consultado agora), sempre na thread que chamou.
+    Retorna os blocos que falharam após todas as tentativas.
+    """
+    concluidos = set()
+    salvos = checkpoint.carregar()
+    for registro in salvos:
+        linhas, colunas = tuple(registro["linhas"]), tuple(registro["colunas"])
+        concluir(linhas, colunas, registro["distancias"], registro["tempos"])
+        concluidos.add((linhas, colunas))
+    checkpoint.iniciar(retomando=bool(salvos))
+
+    pendentes = [b for b in blocos if b not in concluidos]
+    logger.info(
+        "Construindo matrizes",
+        extra={
+            **contexto,
+            "blocos": len(blocos),
+            "retomados": len(blocos) - len(pendentes),
+        },
+    )
+
+    limitador = LimitadorTaxa(por_segundo)
+
+    def consultar_bloco(bloco):
+        origens = [coordenadas[i] for i in bloco[0]]
+        destinos = [coordenadas[j] for j in bloco[1]]
+        for tentativa in range(tentativas):
+            limitador.aguardar()
+            try:
+                return provedor.consultar(origens, destinos)
+            except Exception:
+                if tentativa == tentativas - 1:
+                    raise
+                espera = espera_inicial * 2**tentativa
+                logger.warning(
+                    "Falha no bloco, tentando de novo",
+                    extra={"bloco": bloco, "tentativa": tentativa + 1},
+                    exc_info=True,
+                )
+                time.sleep(espera)
+
+    falhas = []
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        futuros = {executor.submit(consultar_bloco, b): b for b in pendentes}
+        for k, futuro in enumerate(as_completed(futuros), 1):
+            linhas, colunas = bloco = futuros[futuro]
+            try:
+                bloco_d, bloco_t = futuro.result()
+            except Exception:
+                logger.exception("Bloco sem resposta", extra={"bloco": bloco})
+                falhas.append(bloco)
+                continue
+            concluir(linhas, colunas, bloco_d, bloco_t)
+            checkpoint.salvar(linhas, colunas, bloco_d, bloco_t)
+            if k % 50 == 0 or k == len(pendentes):
+                logger.info(
+                    "Progresso", extra={"concluidos": k, "pendentes": len(pendentes)}
+                )
+    return falhas
+
+
+def construir_matrizes(
+    coordenadas,
+    provedor,
+    caminho_checkpoint=None,
+    trabalhadores=8,
+    por_segundo=10.0,
+    tentativas=4,
+    espera_inicial=1.0,
+    simetrica=True,
+    linhas=None,
+):
+    """Constrói (distancias_km, tempos_min) como arrays n × n.
+
+    Com `linhas`, consulta só as linhas/colunas desses índices (o resto fica
+    NaN, para ser completado com a matriz anterior). Pares sem rota ficam
+    NaN. Retorna também a lista de blocos que falharam após todas as
+    tentativas (vazia quando a matriz está completa); rodar de novo com o
+    mesmo checkpoint consulta só esses blocos.
+    """
+    coordenadas = [(float(lat), float(lng)) for lat, lng in coordenadas]
+    n = len(coordenadas)
+    lado = tamanho_bloco(provedor)
+    if linhas is not None:
+        linhas = sorted(int(i) for i in linhas)
+    blocos = dividir_blocos(n, lado, simetrica, linhas)
+
+    distancias = np.full((n, n), np.nan)
+    tempos = np.full((n, n), np.nan)
+
+    def concluir(linhas, colunas, bloco_d, bloco_t):
+        _preencher(distancias, tempos, linhas, colunas, bloco_d, bloco_t, simetrica)
+
+    checkpoint = Checkpoint(
+        caminho_checkpoint, _impressao(coordenadas, lado, simetrica, linhas)
+    )
+    falhas = _executar_blocos(
+        coordenadas,
+        provedor,
+        blocos,
+        checkpoint,
+        concluir,
+        trabalhadores,
+        por_segundo,
+        tentativas,
+        espera_inicial,
+        {"bares": n, "bloco": lado, "linhas": n if linhas is None else len(linhas)},
+    )
+
+    np.fill_diagonal(distancias, 0.0)
+    np.fill_diagonal(tempos, 0.0)
+    return distancias, tempos, falhas
+
+
+def blocos_vizinhos(
+    coordenadas, k, lado, simetrica=True, aleatorios=ARESTAS_CALIBRACAO, semente=0
+):
+    """Blocos ((origem,), destinos) com os `k` bares mais próximos de cada um.
+
+    Os vizinhos são os mais próximos em linha reta (`IndiceEspacial`), mais
+    `aleatorios` bares sorteados para calibrar a estimativa dos pares
+    ausentes, em fatias de até `lado` destinos. Com `simetrica`, um par de
+    vizinhos mútuos é consultado uma vez só (a partir do menor índice).
+    """
+    n = len(coordenadas)
+    lat, lng = zip(*coordenadas, strict=True) if coordenadas else ((), ())
+    indice = IndiceEspacial(lat, lng)
+    vizinhos = []
+    for i, (la, ln) in enumerate(coordenadas):
+        # k + 1: o próprio bar está entre os mais próximos
+        proximos, _ = indice.vizinhos(la, ln, k + 1)
+        vizinhos.append([int(j) for j in proximos if j != i][:k])
+    conjuntos = [set(v) for v in vizinhos]
+    sorteio = np.random.default_rng(semente)
+    blocos = []
+    for i, proximos in enumerate(vizinhos):
+        if simetrica:
+            proximos = [j for j in proximos if not (j < i and i in conjuntos[j])]
+        sorteados = {int(j) for j in sorteio.integers(0, n, aleatorios)}
+        proximos += sorted(sorteados - conjuntos[i] - {i})
+        blocos += [((i,), destinos) for destinos in _fatiar(proximos, lado)]
+    return blocos
+
+
+def construir_grafo(
+    coordenadas,
+    provedor,
+    k=20,
+    caminho_checkpoint=None,
+    trabalhadores=8,
+    por_segundo=10.0,
+    tentativas=4,
+    espera_inicial=1.0,
+    simetrica=True,
+    aleatorios=ARESTAS_CALIBRACAO,
+):
+    """Constrói o `GrafoEsparso` dos `k` vizinhos mais próximos de cada bar.
+
+    Consulta O(n·k) pares em vez de O(n²), com o mesmo pool, limite de
+    taxa, novas tentativas e checkpoint de `construir_matrizes`. Pares sem
+    rota ficam fora do grafo (passam a ser estimados). Retorna
+    (grafo, falhas).
+    """
+    coordenadas = [(float(lat), float(lng)) for lat, lng in coordenadas]
+    n = len(coordenadas)
+    lado = max(1, min(provedor.max_destinos, provedor.max_elementos))
+    blocos = blocos_vizinhos(coordenadas, k, lado, simetrica, aleatorios)
+
+    origens, destinos, distancias, tempos = [], [], [], []
+
+    def concluir(linhas, colunas, bloco_d, bloco_t):
+        for a, i in enumerate(linhas):
+            origens.extend([i] * len(colunas))
+            destinos.extend(colunas)
+            distancias.extend(bloco_d[a])
+            tempos.extend(bloco_t[a])
+
+    checkpoint = Checkpoint(
+        caminho_checkpoint,
+        _impressao(coordenadas, lado, simetrica, None, vizinhos=[k, aleatorios]),
+    )
+    falhas = _executar_blocos(
+        coordenadas,
+        provedor,
+        blocos,
+        checkpoint,
+        concluir,
+        trabalhadores,
+        por_segundo,
+        tentativas,
+        espera_inicial,
+        {"bares": n, "bloco": lado, "vizinhos": k},
+    )
+    grafo = GrafoEsparso.de_arestas(
+        n,
+        origens,
+        destinos,
+        np.array(distancias, dtype=np.float64),
+        np.array(tempos, dtype=np.float64),
+        k,
+        simetrica,
+    )
+    return grafo, falhas
+
+
+def atualizar_matrizes(df, caminho, provedor, **opcoes):
+    """Atualiza as matrizes salvas em `caminho` para os bares de `df`.
+
+    Usa o manifesto para casar linhas por id: pares entre bares que já
+    existiam são copiados, bares removidos saem e só as linhas/colunas dos
+    bares novos são consultadas (O(n·k) chamadas em vez de O(n²)). Sem
+    matriz ou manifesto anterior, constrói tudo.
+
+    Retorna (distancias, tempos, falhas, resumo) na ordem de `df`.
+    """
+    ids = ids_bares(df)
+    coordenadas = coordenadas_bares(df)
+    manifesto = carregar_manifesto(caminho) if os.path.exists(caminho) else None
+    if manifesto is None:
+        logger.warning(
+            "Sem matriz ou manifesto anterior, construindo do zero",
+            extra={"caminho": caminho},
+        )
+        distancias, tempos, falhas = construir_matrizes(coordenadas, provedor, **opcoes)
+        return distancias, tempos, falhas, {"novos": len(ids), "removidos": 0}
+
+    posicao = {id_: i for i, id_ in enumerate(manifesto["ids"])}
+    mantidos = [k for k, id_ in enumerate(ids) if id_ in posicao]
+    novos = [k for k, id_ in enumerate(ids) if id_ not in posicao]
+    resumo = {
+        "mantidos": len(mantidos),
+        "novos": len(novos),
+        "removidos": len(posicao) - len(mantidos),
+    }
+    logger.info("Atualizando matrizes", extra=resumo)
+
+    distancias, tempos, falhas = construir_matrizes(
+        coordenadas, provedor, linhas=novos, **opcoes
+    )
+    antigas_d, antigas_t = carregar_matrizes(caminho)
+    origem = np.ix_(
+        [posicao[ids[k]] for k in mantidos], [posicao[ids[k]] for k in mantidos]
+    )
+    destino = np.ix_(mantidos, mantidos)
+    distancias[destino] = np.asarray(antigas_d, dtype=np.float64)[origem]
+    tempos[destino] = np.asarray(antigas_t, dtype=np.float64)[origem]
+    np.fill_diagonal(distancias, 0.0)
+    np.fill_diagonal(tempos, 0.0)
+    return distancias, tempos, falhas, resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bares", default="data/bares.csv")
+    parser.add_argument("--saida", default="data/distancias.pkl")
+    parser.add_argument(
+        "--checkpoint", help="arquivo JSONL de progresso (padrão: <saida>.parcial)"
+    )
+    parser.add_argument(
+        "--provedor", choices=["google", "haversine", "osrm"], default="google"
+    )
+    parser.add_argument("--osrm-arquivo", help="resposta salva do /table do OSRM")
+    parser.add_argument("--trabalhadores", type=int, default=8)
+    parser.add_argument("--taxa", type=float, default=10.0, help="chamadas/segundo")
+    parser.add_argument("--tentativas", type=int, default=4)
+    parser.add_argument(
+        "--atualizar",
+        action="store_true",
+        help="consulta só os bares novos em relação à matriz/manifesto em --saida",
+    )
+    parser.add_argument(
+        "--vizinhos",
+        type=int,
+        metavar="K",
+        help="grafo esparso com os K vizinhos mais próximos de cada bar (.npz)",
+    )
+    args = parser.parse_args()
+    if args.vizinhos is not None and args.atualizar:
+        parser.error("--atualizar não se aplica ao grafo esparso (--vizinhos)")
+
+    try:
+        from .registro import configurar_logs
+    except ImportError:
+        from registro import configurar_logs
+    configurar_logs(formato="texto")
+
+    if args.provedor == "google":
+        provedor = ProvedorGoogle(os.environ["GOOGLE_MAPS_API_KEY"])
+    elif args.provedor == "osrm":
+        provedor = ProvedorOSRM(args.osrm_arquivo)
+    else:
+        provedor = ProvedorHaversine()
+
+    inicio = time.perf_counter()
+    bares = carregar_bares(args.bares)
+    opcoes = {
+        "caminho_checkpoint": args.checkpoint or f"{args.saida}.parcial",
+        "trabalhadores": args.trabalhadores,
+        "por_segundo": args.taxa,
+        "tentativas": args.tentativas,
+    }
+    if args.vizinhos is not None:
+        grafo, falhas = construir_grafo(
+            coordenadas_bares(bares), provedor, args.vizinhos, **opcoes
+        )
+        if falhas:
+            logger.error(
+                "Blocos sem resposta; rode de novo para retomar",
+                extra={"falhas": len(falhas)},
+            )
+            raise SystemExit(1)
+        grafo.salvar(args.saida, ids=ids_bares(bares), provedor=args.provedor)
+        logger.info(
+            "Grafo salvo",
+            extra={
+                "saida": args.saida,
+                **grafo.resumo(),
+                "segundos": round(time.perf_counter() - inicio, 1),
+            },
+        )
+        return
+    if args.atualizar:
+        distancias, tempos, falhas, _ = atualizar_matrizes(
+            bares, args.saida, provedor, **opcoes
+        )
+    else:
+        distancias, tempos, falhas = construir_matrizes(
+            coordenadas_bares(bares), provedor, **opcoes
+        )
+    if falhas:
+        logger.error(
+            "Blocos sem resposta; rode de novo para retomar",
+            extra={"falhas": len(falhas)},
+        )
+        raise SystemExit(1)
+
+    salvar_matrizes(
+        args.saida, distancias, tempos, ids=ids_bares(bares), provedor=args.provedor
+    )
+    logger.info(
+        "Matrizes salvas",
+        extra={
+            "saida": args.saida,
+            "sem_rota": int(np.isnan(tempos).sum()),
+            "segundos": round(time.perf_counter() - inicio, 1),
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import json
+import os
+import pickle
+import re
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+def normalizar_bares(df):
+    """Normaliza o DataFrame no formato do `bares.csv` (in-place e retorna).
+
+    - renomeia "Avaliação" para "Nota", se existir
+    - converte "Nota" ("4,4") para float
+    """
+    if "Avaliação" in df.columns:
+        df.rename(columns={"Avaliação": "Nota"}, inplace=True)
+
+    if "Nota" in df.columns:
+        df["Nota"] = df["Nota"].astype(str).str.replace(",", ".").astype(float)
+
+    return df
+
+
+def normalizar_nome(nome):
+    """Normaliza nome para comparação, substituindo caracteres Unicode similares"""
+    return (
+        nome.replace("\u2019", "'")  # ' → '
+        .replace("\u2018", "'")  # ' → '
+        .replace("\u201c", '"')  # " → "
+        .replace("\u201d", '"')  # " → "
+        .replace("\u00e9", "e")  # é → e (opcional)
+        .replace("\u00e1", "a")  # á → a (opcional)
+        .strip()
+    )
+
+
+def converter_coordenada(valor, padrao, tipo="lat"):
+    """Converte coordenada em vários formatos para decimal e valida a faixa.
+
+    Trata números inteiros grandes (ex.: -19937000 -> -19.937000), strings com
+    vírgula como separador decimal, pontos como separador de milhar, e outros casos.
+    """
+
+    def validar(v):
+        try:
+            v = float(v)
+        except Exception:
+            return False
+        if tipo == "lat":
+            return -90.0 <= v <= 90.0
+        return -180.0 <= v <= 180.0
+
+    if valor is None:
+        return padrao
+
+    # 1) Números já (int/float)
+    try:
+        if isinstance(valor, (int, float)):
+            v = float(valor)
+            if abs(v) > 180:
+                v = v / 1e6
+            if validar(v):
+                return v
+            v2 = float(valor) / 1e6
+            if validar(v2):
+                return v2
+    except Exception:
+        pass
+
+    s = str(valor).strip()
+    if s == "":
+        return padrao
+
+    s_clean = re.sub(r"[^0-9,\.\-]", "", s)
+
+    try:
+        if "." in s_clean and "," in s_clean:
+            if s_clean.rfind(",") > s_clean.rfind("."):
+                s_try = s_clean.replace(".", "").replace(",", ".")
+                v = float(s_try)
+                if validar(v):
+                    return v
+            else:
+                s_try = s_clean.replace(",", "")
+                v = float(s_try)
+                if validar(v):
+                    return v
+
+        if s_clean.count(".") > 1:
+            s_digits = re.sub(r"[^0-9\-]", "", s_clean)
+            if s_digits.startswith("-"):
+                sign = -1
+                s_digits = s_digits[1:]
+            else:
+                sign = 1
+            if len(s_digits) >= 6:
+                v = sign * (int(s_digits) / 1e6)
+                if validar(v):
+                    return v
+
+        s_simple = s_clean.replace(" ", "").replace(",", ".")
+        if s_simple.count(".") > 1:
+            parts = s_simple.split(".")
+            s_simple = "".join(parts[:-1]) + "." + parts[-1]
+
+        v = float(s_simple)
+        if validar(v):
+            return v
+
+        if abs(v) > 180:
+            v2 = v / 1e6
+            if validar(v2):
+                return v2
+    except Exception:
+        pass
+
+    try:
+        s_digits = re.sub(r"[^0-9\-]", "", s)
+        if s_digits == "":
+            return padrao
+        sign = -1 if s_digits.startswith("-") else 1
+        if sign == -1:
+            s_digits = s_digits[1:]
+        if len(s_digits) >= 6:
+            v = sign * (int(s_digits) / 1e6)
+            if validar(v):
+                return v
+    except Exception:
+        pass
+
+    return padrao
+
+
+def carregar_bares(caminho="data/bares.csv"):
+    return normalizar_bares(pd.read_csv(caminho))
+
+
+def id_bar(nome):
+    """Id estável a partir do nome (ex.: "Alexandre’s Bar" → "alexandre-s-bar")."""
+    texto = unicodedata.normalize("NFKD", normalizar_nome(nome))
+    texto = texto.encode("ascii", "ignore").decode().lower()
+    return re.sub(r"[^a-z0-9]+", "-", texto).strip("-")
+
+
+def ids_bares(df):
+    """Ids estáveis dos bares, na ordem do DataFrame.
+
+    Usa a coluna "id" se existir (para fixar o id de um bar renomeado); senão
+    deriva do nome, com sufixo -2, -3... para nomes repetidos.
+    """
+    if "id" in df.columns:
+        return df["id"].astype(str).tolist()
+    ids, vistos = [], {}
+    for nome in df["Nome do Buteco"]:
+        base = id_bar(nome)
+        vistos[base] = vistos.get(base, 0) + 1
+        ids.append(base if vistos[base] == 1 else f"{base}-{vistos[base]}")
+    return ids
+
+
+def caminho_manifesto(caminho):
+    """Manifesto das matrizes: data/distancias.pkl → data/distancias.manifesto.json."""
+    return os.path.splitext(caminho)[0] + ".manifesto.json"
+
+
+def carregar_manifesto(caminho):
+    """Manifesto das matrizes em `caminho` (None se não houver)."""
+    try:
+        with open(caminho_manifesto(caminho), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def carregar_matrizes(caminho="data/distancias.pkl", bares=None):
+    """Retorna (distancias, tempos) do pickle gerado pelo utils/google_api.py.
+
+    Com `bares`, as matrizes são reordenadas pelo manifesto para seguir a
+    ordem do DataFrame (linha i = bar i); um bar sem linha na matriz é erro,
+    em vez de desalinhar silenciosamente. Sem manifesto vale a posição.
+    """
+    with open(caminho, "rb") as f:
+        distancias, tempos = pickle.load(f)
+    if bares is None:
+        return distancias, tempos
+
+    manifesto = carregar_manifesto(caminho)
+    if manifesto is None:
+        if len(distancias) != len(bares):
+            raise ValueError(
+                f"Matriz com {len(distancias)} bares e sem manifesto para "
+                f"{len(bares)} bares; rode utils.construtor_matriz --atualizar"
+            )
+        return distancias, tempos
+
+    if len(manifesto["ids"]) != len(distancias):
+        raise ValueError(f"Manifesto de {caminho} não corresponde à matriz")
+    posicao = {id_: i for i, id_ in enumerate(manifesto["ids"])}
+    ids = ids_bares(bares)
+    faltando = [id_ for id_ in ids if id_ not in posicao]
+    if faltando:
+        raise ValueError(
+            f"Bares sem linha na matriz (rode utils.construtor_matriz "
+            f"--atualizar): {faltando}"
+        )
+    ordem = [posicao[id_] for id_ in ids]
+    if ordem == list(range(len(distancias))):
+        return distancias, tempos
+    indices = np.ix_(ordem, ordem)
+    return (
+        np.asarray(distancias, dtype=np.float64)[indices].tolist(),
+        np.asarray(tempos, dtype=np.float64)[indices].tolist(),
+    )
+
+
+def salvar_matrizes(caminho, distancias, tempos, ids=None, provedor=None):
+    """Grava (distancias, tempos) no formato de `carregar_matrizes`.
+
+    Pares sem rota (NaN) viram 0, como no script original. Com `ids`, grava
+    também o manifesto (id do bar de cada linha). A escrita vai para arquivos
+    temporários trocados atomicamente.
+    """
+    matrizes = tuple(
+        np.nan_to_num(np.asarray(m, dtype=np.float64), nan=0.0).tolist()
+        for m in (distancias, tempos)
+    )
+    arquivos = []
+    with open(f"{caminho}.tmp", "wb") as f:
+        pickle.dump(matrizes, f)
+    arquivos.append((f"{caminho}.tmp", caminho))
+    if ids is not None:
+        if len(ids) != len(matrizes[0]):
+            raise ValueError("Quantidade de ids diferente do tamanho da matriz")
+        manifesto = {
+            "ids": list(ids),
+            "provedor": provedor,
+            "atualizado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        destino = caminho_manifesto(caminho)
+        with open(f"{destino}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=1)
+        arquivos.append((f"{destino}.tmp", destino))
+    for temporario, destino in arquivos:
+        os.replace(temporario, destino)
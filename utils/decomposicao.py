@@ -0,0 +1,594 @@
+"""
+Roteiros de vários dias decompostos em um grupo de bares por dia.
+
+Sem decomposição, o tabu search ordena todos os candidatos em uma única
+sequência e `formatar_resposta` a corta em dias pela janela diária. Aqui:
+
+ - os candidatos são agrupados por k-medoides sobre os tempos
+   (simetrizados), com um grupo por dia e capacidade de bares por dia
+   estimada pela janela diária (`capacidade_diaria`); o grupo do primeiro dia
+   tem o ponto de partida como medoide fixo. Com mais candidatos do que
+   vagas, ficam de fora os de pior `alpha × tempo − beta × nota` até o
+   medoide mais próximo;
+ - cada dia é um subproblema pequeno (solver exato até `limiar_exato` bares,
+   senão tabu search), resolvido sobre a submatriz estática dos seus bares,
+   em paralelo se houver `executor` (`pool_dias`, processos que duram entre
+   requisições, como em utils/processos.py),
+   já com `PENALIDADE_EXCESSO` por chegada depois do fim do dia;
+ - a costura move bares de um dia para outro enquanto a soma dos custos cai,
+   avaliando cada dia com `avaliar_rota` nos tempos reais (por horário, se
+   houver) e com `PENALIDADE_EXCESSO` por bar que chega depois do fim do dia.
+
+Bares com dia marcado (`dias_fixos`) vão para o grupo do seu dia e a costura
+não os move; obrigatórios sem vaga no seu grupo entram no grupo de medoide
+mais próximo que ainda tenha vaga. Um grupo que passe da capacidade perde os
+não restritos de pior custo. No dia, os dois tipos ficam restritos às
+posições que cabem na janela (utils/restricoes.py).
+
+Os 2-opt de cada dia percorrem O((n/d)²) movimentos em vez de O(n²), e os d
+subproblemas são independentes.
+"""
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+from itertools import pairwise
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .avalia_rota import CacheHorarios, avaliar_rota
+    from .matrizes_compactas import submatriz
+    from .programacao_dinamica import resolver_exato
+    from .restricoes import RestricaoInvalida, Restricoes
+    from .tabu_search import tabu_search
+except Exception:
+    from avalia_rota import CacheHorarios, avaliar_rota
+    from matrizes_compactas import submatriz
+    from programacao_dinamica import resolver_exato
+    from restricoes import RestricaoInvalida, Restricoes
+    from tabu_search import tabu_search
+
+PENALIDADE_EXCESSO = 1000.0  # por bar com chegada depois do fim do dia
+MAX_PASSADAS_COSTURA = 5
+DIAS_VIZINHOS_COSTURA = 2  # dias candidatos a receber cada bar na costura
+INTERVALO_PARAR = 0.05  # segundos entre consultas a `parar` com o pool
+
+_pool = None  # (pid, trabalhadores, executor)
+
+
+def _aquecer():
+    """Tarefa vazia: importa este módulo (e o solver) no processo do pool."""
+
+
+def pool_dias(trabalhadores):
+    """Pool de processos para os dias, um por processo e reaproveitado.
+
+    Criar um pool spawn a cada requisição custa mais que resolver os dias em
+    série; este sobe os processos na primeira chamada (o gunicorn.conf.py
+    chama no `post_fork`) e é recriado em um filho do fork. Com
+    `trabalhadores <= 1` não há pool.
+    """
+    global _pool
+    if trabalhadores <= 1:
+        return None
+    if _pool is not None and _pool[:2] == (os.getpid(), trabalhadores):
+        return _pool[2]
+    if _pool is not None and _pool[0] == os.getpid():
+        _pool[2].shutdown(wait=False, cancel_futures=True)
+    # spawn: os processos não herdam threads/locks do servidor
+    contexto = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(trabalhadores, mp_context=contexto)
+    wait([executor.submit(_aquecer) for _ in range(trabalhadores)])
+    _pool = (os.getpid(), trabalhadores, executor)
+    return executor
+
+
+def _minutos(valor):
+    return valor.total_seconds() / 60.0 if isinstance(valor, timedelta) else valor
+
+
+def janelas_diarias(data_inicio, data_fim, hora_inicio, hora_fim):
+    """(início, fim) de cada dia do período; `hora_fim` antes de `hora_inicio`
+    termina no dia seguinte."""
+    janelas = []
+    for k in range((data_fim - data_inicio).days + 1):
+        dia = data_inicio + timedelta(days=k)
+        inicio = datetime.combine(dia, hora_inicio)
+        fim = datetime.combine(dia, hora_fim)
+        if fim <= inicio:
+            fim += timedelta(days=1)
+        janelas.append((inicio, fim))
+    return janelas
+
+
+def capacidade_diaria(distancias, janela_min, visita_min, vizinhos=1):
+    """Bares que cabem em uma janela de `janela_min` minutos.
+
+    Cada bar custa a visita mais um deslocamento típico: a mediana do tempo
+    médio de cada candidato até os `vizinhos` mais próximos (os dias agrupam
+    bares vizinhos). Com `vizinhos` > 1 a estimativa é mais conservadora, para
+    quando passar da capacidade deixa um bar obrigatório de fora.
+    """
+    if len(distancias) < 2:
+        return 1
+    proximos = np.where(np.eye(len(distancias), dtype=bool), np.inf, distancias)
+    k = min(vizinhos, len(distancias) - 1)
+    mais_proximos = np.partition(proximos, k - 1, axis=1)[:, :k]
+    deslocamento = float(np.median(mais_proximos.mean(axis=1)))
+    return max(1, int(janela_min // (visita_min + deslocamento)))
+
+
+def agrupar_k_medoides(distancias, capacidades, custos_bar=None, max_iter=20):
+    """Agrupa os pontos de `distancias` (matriz simétrica) em len(capacidades)
+    grupos de no máximo `capacidades[g]` pontos.
+
+    O ponto 0 é o medoide fixo do grupo 0; os outros medoides começam pelo
+    ponto mais distante dos já escolhidos. A atribuição é gulosa pelo custo
+    `distancia até o medoide + custos_bar[ponto]` respeitando as
+    capacidades; pontos sem vaga ficam de fora.
+
+    Returns:
+        tuple: (grupos, medoides), listas de índices; grupos[0] começa em 0
+    """
+    n = len(distancias)
+    k = min(len(capacidades), n)
+    capacidades = list(capacidades[:k])
+    if custos_bar is None:
+        custos_bar = np.zeros(n)
+    medoides = [0]
+    for _ in range(1, k):
+        mais_perto = distancias[:, medoides].min(axis=1)
+        mais_perto[medoides] = -np.inf
+        medoides.append(int(np.argmax(mais_perto)))
+
+    grupos = None
+    for _ in range(max_iter):
+        grupos = _atribuir(distancias, medoides, capacidades, custos_bar)
+        novos = [0] + [
+            int(g[np.argmin(distancias[np.ix_(g, g)].sum(axis=1))]) if len(g) else m
+            for g, m in zip(map(np.asarray, grupos[1:]), medoides[1:], strict=True)
+        ]
+        if novos == medoides:
+            break
+        medoides = novos
+    return grupos, medoides
+
+
+def _atribuir(distancias, medoides, capacidades, custos_bar):
+    k = len(medoides)
+    custos = distancias[:, medoides] + np.asarray(custos_bar)[:, None]
+    grupos = [[] for _ in range(k)]
+    for g, m in enumerate(medoides):
+        grupos[g].append(m)
+    vagas = [c - 1 for c in capacidades]
+    atribuidos = set(medoides)
+    for posicao in np.argsort(custos, axis=None, kind="stable"):
+        ponto, g = divmod(int(posicao), k)
+        if ponto in atribuidos or vagas[g] <= 0:
+            continue
+        grupos[g].append(ponto)
+        atribuidos.add(ponto)
+        vagas[g] -= 1
+    return grupos
+
+
+def ordenar_dias(distancias, medoides):
+    """Ordem dos grupos: o do ponto de partida e, depois, sempre o de medoide
+    mais próximo do anterior."""
+    ordem = [0]
+    restantes = set(range(1, len(medoides)))
+    while restantes:
+        anterior = medoides[ordem[-1]]
+        proximo = min(restantes, key=lambda g: distancias[anterior, medoides[g]])
+        ordem.append(proximo)
+        restantes.remove(proximo)
+    return ordem
+
+
+def _resolver_dia(tarefa):
+    """Resolve um dia (subinstância com índices locais, âncora na posição 0).
+
+    Como em `custo_dia`, cada chegada depois de `hora_final` custa
+    `PENALIDADE_EXCESSO`. Função de módulo para rodar em outro processo.
+    """
+    (tempos, bares, hora_inicial, hora_final, visita, alpha, beta, limiar, faixas) = (
+        tarefa
+    )
+    rota = list(range(len(tempos)))
+    if not rota:  # dia que perdeu todos os bares para os de dia marcado
+        return rota, 0
+    restricoes = Restricoes(faixas) if faixas else None
+    if len(rota) <= limiar and not restricoes:
+        rota, _, _ = resolver_exato(
+            rota,
+            tempos,
+            bares,
+            hora_inicial,
+            hora_final,
+            visita,
+            alpha,
+            beta,
+            penalidade_fim=PENALIDADE_EXCESSO,
+        )
+        return rota, 0
+    rota, _, historico = tabu_search(
+        rota,
+        tempos,
+        bares,
+        hora_inicial,
+        hora_final,
+        visita,
+        alpha=alpha,
+        beta=beta,
+        tabu_tam=10,
+        max_iter=100,
+        max_iter_sem_melhoria=30,
+        verbose=False,
+        restricoes=restricoes,
+        penalidade_fim=PENALIDADE_EXCESSO,
+    )
+    return rota, len(historico.get("iteracao", []))
+
+
+def chegadas_apos_fim(rota, tempos, janela, tempo_visita, visita_inicial=True):
+    """Bares de `rota` com chegada depois do fim da `janela` (que
+    `formatar_resposta` deixa de fora).
+
+    O relógio segue `formatar_resposta`: a visita ao primeiro bar conta (sem
+    `visita_inicial`, o dia sai de um ponto informado por coordenadas).
+    """
+    inicio, fim = janela
+    tempo_em = getattr(tempos, "tempo_em", None)
+    visita = _minutos(tempo_visita)
+    hora = inicio + timedelta(minutes=visita if visita_inicial else 0.0)
+    atrasados = 0
+    for origem, destino in pairwise(rota):
+        if tempo_em is None:
+            t = float(tempos[origem][destino])
+        else:
+            minuto = hora.hour * 60 + hora.minute + hora.second / 60.0
+            t = tempo_em(origem, destino, minuto)
+        hora += timedelta(minutes=t)
+        if hora > fim:
+            atrasados += 1
+        hora += timedelta(minutes=visita)
+    return atrasados
+
+
+def custo_dia(
+    rota,
+    tempos,
+    bares,
+    janela,
+    tempo_visita,
+    alpha,
+    beta,
+    cache=None,
+    visita_inicial=True,
+):
+    """`avaliar_rota` do dia mais `PENALIDADE_EXCESSO` por chegada após o fim
+    (`chegadas_apos_fim`)."""
+    if not rota:
+        return 0.0
+    inicio, fim = janela
+    custo = avaliar_rota(
+        rota, tempos, bares, inicio, fim, tempo_visita, alpha, beta, cache=cache
+    )
+    atrasados = chegadas_apos_fim(rota, tempos, janela, tempo_visita, visita_inicial)
+    return custo + PENALIDADE_EXCESSO * atrasados
+
+
+def costurar_dias(
+    dias,
+    tempos,
+    bares,
+    janelas,
+    tempo_visita,
+    alpha,
+    beta,
+    ancora_sem_visita=False,
+    travados=(),
+    restritos=(),
+    ultimas=None,
+):
+    """Move bares entre dias (melhor posição no outro dia) enquanto a soma
+    dos custos cai. A âncora de cada dia (posição 0) e os bares em
+    `travados` ficam no lugar, e cada bar só é testado nos
+    `DIAS_VIZINHOS_COSTURA` dias com o bar mais perto dele.
+
+    Os bares em `restritos` não passam da posição `ultimas[dia]`, e nenhum
+    dia ganha chegadas depois do fim da janela (`formatar_resposta` as
+    descartaria): inserções assim não são testadas.
+
+    Returns:
+        tuple: (dias, custos por dia, movimentos aplicados)
+    """
+    cache = CacheHorarios(bares)
+
+    def custo(d, rota):
+        return custo_dia(
+            rota,
+            tempos,
+            bares,
+            janelas[d],
+            tempo_visita,
+            alpha,
+            beta,
+            cache,
+            visita_inicial=not (d == 0 and ancora_sem_visita),
+        )
+
+    def atrasados(d, rota):
+        return chegadas_apos_fim(
+            rota,
+            tempos,
+            janelas[d],
+            tempo_visita,
+            visita_inicial=not (d == 0 and ancora_sem_visita),
+        )
+
+    dias = [list(rota) for rota in dias]
+    custos = [custo(d, rota) for d, rota in enumerate(dias)]
+    excessos = [atrasados(d, rota) for d, rota in enumerate(dias)]
+    todos = [i for rota in dias for i in rota]
+    posicao = {i: k for k, i in enumerate(todos)}
+    sub = submatriz(tempos, todos)
+
+    def dias_vizinhos(bar, a):
+        linha = sub[posicao[bar]]
+        perto = {
+            b: min(linha[posicao[i]] for i in rota)
+            for b, rota in enumerate(dias)
+            if b != a and rota
+        }
+        return sorted(perto, key=perto.get)[:DIAS_VIZINHOS_COSTURA]
+
+    def cabe(b, rota):
+        if ultimas is not None and any(
+            k > ultimas[b] for k, bar in enumerate(rota) if bar in restritos
+        ):
+            return False
+        return atrasados(b, rota) <= excessos[b]
+
+    movimentos = 0
+    for _ in range(MAX_PASSADAS_COSTURA):
+        melhorou = False
+        for a in range(len(dias)):
+            p = 1
+            while p < len(dias[a]):
+                if dias[a][p] in travados:
+                    p += 1
+                    continue
+                sem_bar = dias[a][:p] + dias[a][p + 1 :]
+                custo_a = custo(a, sem_bar)
+                melhor = None
+                for b in dias_vizinhos(dias[a][p], a):
+                    for q in range(1, len(dias[b]) + 1):
+                        com_bar = dias[b][:q] + [dias[a][p]] + dias[b][q:]
+                        if not cabe(b, com_bar):
+                            continue
+                        custo_b = custo(b, com_bar)
+                        delta = custo_a + custo_b - custos[a] - custos[b]
+                        if delta < -1e-9 and (melhor is None or delta < melhor[0]):
+                            melhor = (delta, b, com_bar, custo_a, custo_b)
+                if melhor is None:
+                    p += 1
+                    continue
+                _, b, com_bar, custo_a, custo_b = melhor
+                dias[a], dias[b] = sem_bar, com_bar
+                custos[a], custos[b] = custo_a, custo_b
+                excessos[a], excessos[b] = atrasados(a, sem_bar), atrasados(b, com_bar)
+                movimentos += 1
+                melhorou = True
+        if not melhorou:
+            break
+    return dias, custos, movimentos
+
+
+def _encaixar_restritos(grupos, medoides, fixos, soltos, distancias, vagas, ancora):
+    """Grupos com os bares de dia marcado (`fixos`, {bar: dia}) no seu dia e
+    os obrigatórios `soltos` em um dia com vaga para restritos.
+
+    Cada dia aceita `vagas` restritos; o primeiro, um a menos se o ponto de
+    partida for um bar (ele ocupa a posição 0). O obrigatório fica no grupo do
+    k-medoides se houver vaga, senão vai para o medoide mais próximo com vaga.
+
+    Raises:
+        RestricaoInvalida: se os restritos não couberem nas vagas
+    """
+    grupos = [[q for q in grupo if q not in fixos] for grupo in grupos]
+    medoides = list(medoides)
+    for p, dia in sorted(fixos.items()):
+        while len(grupos) <= dia:
+            grupos.append([])
+            medoides.append(p)
+        grupos[dia].append(p)
+    # o medoide que saiu para outro dia é trocado pelo do que sobrou
+    for d in range(1, len(grupos)):
+        if grupos[d] and medoides[d] not in grupos[d]:
+            grupo = np.asarray(grupos[d], dtype=np.intp)
+            soma = distancias[np.ix_(grupo, grupo)].sum(axis=1)
+            medoides[d] = int(grupo[np.argmin(soma)])
+    folga = [
+        vagas - (d == 0 and not ancora) - sum(q in fixos for q in grupo)
+        for d, grupo in enumerate(grupos)
+    ]
+    if min(folga) < 0:
+        raise RestricaoInvalida(
+            "Mais bares com dia marcado do que paradas estimadas no dia"
+        )
+    for p in soltos:
+        atual = next((d for d, grupo in enumerate(grupos) if p in grupo), None)
+        if atual is not None and folga[atual] > 0:
+            folga[atual] -= 1
+            continue
+        if atual is not None:
+            grupos[atual].remove(p)
+        com_vaga = [d for d, f in enumerate(folga) if f > 0]
+        if not com_vaga:
+            raise RestricaoInvalida(
+                "Mais bares obrigatórios do que paradas estimadas no período"
+            )
+        d = min(com_vaga, key=lambda d: distancias[medoides[d], p])
+        grupos[d].append(p)
+        folga[d] -= 1
+    return grupos, medoides
+
+
+def resolver_por_dias(
+    rota_inicial,
+    tempos,
+    bares,
+    janelas,
+    tempo_visita,
+    alpha=1.0,
+    beta=20.0,
+    ancora_sem_visita=False,
+    limiar_exato=10,
+    executor=None,
+    parar=None,
+    dias_fixos=None,
+    obrigatorios=(),
+):
+    """Roteiro de `len(janelas)` dias: agrupa, resolve cada dia e costura.
+
+    `rota_inicial[0]` é o ponto de partida (início do primeiro dia); com
+    `ancora_sem_visita` (ponto informado por coordenadas) ele não ocupa vaga.
+    `dias_fixos` ({bar: índice do dia}) e `obrigatorios` usam os índices de
+    `rota_inicial`.
+
+    Returns:
+        dict: dias (rota de cada dia), custo total, iterações do tabu search,
+        movimentos da costura e bares que ficaram de fora
+
+    Raises:
+        RestricaoInvalida: mais bares restritos do que as vagas estimadas
+    """
+    indices = np.asarray(rota_inicial, dtype=np.intp)
+    sub = submatriz(tempos, indices)
+    simetrica = (sub + sub.T) / 2
+    visita = _minutos(tempo_visita)
+    janela_min = (janelas[0][1] - janelas[0][0]).total_seconds() / 60.0
+    capacidade = capacidade_diaria(simetrica, janela_min, visita)
+    capacidades = [capacidade + (1 if ancora_sem_visita else 0)] + [capacidade] * (
+        len(janelas) - 1
+    )
+
+    notas = np.zeros(len(indices))
+    if "Nota" in bares.columns:
+        notas = pd.to_numeric(bares["Nota"].iloc[indices], errors="coerce")
+        notas = np.nan_to_num(notas.to_numpy(dtype=np.float64), nan=0.0)
+    grupos, medoides = agrupar_k_medoides(
+        alpha * simetrica, capacidades, custos_bar=-beta * notas
+    )
+    ordem = ordenar_dias(simetrica, medoides)
+    grupos = [grupos[g] for g in ordem]
+    medoides = [medoides[g] for g in ordem]
+
+    # posições que cabem no dia, para os bares restritos (estimativa
+    # conservadora: nenhum deve ficar depois do fim da janela)
+    vagas = capacidade_diaria(simetrica, janela_min, visita, vizinhos=3)
+    local = {int(bar): p for p, bar in enumerate(indices)}
+    fixos = {local[bar]: dia for bar, dia in (dias_fixos or {}).items()}
+    soltos = sorted({local[bar] for bar in obrigatorios} - set(fixos))
+    restritos = set(fixos) | set(soltos)
+    grupos, medoides = _encaixar_restritos(
+        grupos, medoides, fixos, soltos, simetrica, vagas, ancora_sem_visita
+    )
+
+    # acima da capacidade: saem os não restritos de pior custo até o medoide
+    for d, grupo in enumerate(grupos):
+        excesso = len(grupo) - (capacidades[d] if d < len(capacidades) else capacidade)
+        if excesso <= 0:
+            continue
+        livres = [q for q in grupo if q not in restritos and q != 0]
+        livres.sort(key=lambda q: alpha * simetrica[medoides[d], q] - beta * notas[q])
+        saem = set(livres[-excesso:])
+        grupos[d] = [q for q in grupo if q not in saem]
+
+    # âncora de cada dia seguinte: o bar do grupo mais perto do medoide do
+    # dia anterior (onde o dia anterior tende a terminar)
+    tarefas = []
+    locais_por_dia = []
+    ultimas = []
+    for d, grupo in enumerate(grupos):
+        if d > 0 and grupo:
+            ancora = min(grupo, key=lambda p: simetrica[medoides[d - 1], p])
+            grupo = [ancora] + [p for p in grupo if p != ancora]
+        locais_por_dia.append(grupo)
+        posicoes = [k for k, p in enumerate(grupo) if k > 0 and p in restritos]
+        ultima = max(
+            min(vagas + (d == 0 and ancora_sem_visita), len(grupo)) - 1, len(posicoes)
+        )
+        faixas = {k: (1, ultima) for k in posicoes}
+        ultimas.append(ultima)
+        globais = indices[grupo]
+        # avaliar_rota não conta a visita ao primeiro bar, e `custo_dia` conta:
+        # o prazo do solver é o fim do dia menos essa visita
+        visita_inicial = 0.0 if d == 0 and ancora_sem_visita else visita
+        tarefas.append(
+            (
+                submatriz(tempos, globais).tolist(),
+                bares.iloc[globais].reset_index(drop=True),
+                janelas[d][0],
+                janelas[d][1] - timedelta(minutes=visita_inicial),
+                tempo_visita,
+                alpha,
+                beta,
+                limiar_exato,
+                faixas,
+            )
+        )
+
+    # com `parar`, os dias ainda não resolvidos ficam na ordem do grupo
+    parado = (lambda: False) if parar is None else parar
+    if executor is not None and len(tarefas) > 1:
+        futuros = [executor.submit(_resolver_dia, tarefa) for tarefa in tarefas]
+        pendentes = set(futuros)
+        while pendentes and not parado():
+            _, pendentes = wait(pendentes, timeout=INTERVALO_PARAR)
+        for futuro in pendentes:
+            futuro.cancel()
+        resolvidos = [
+            futuro.result()
+            if futuro not in pendentes
+            else (list(range(len(tarefa[0]))), 0)
+            for futuro, tarefa in zip(futuros, tarefas, strict=True)
+        ]
+    else:
+        resolvidos = []
+        for tarefa in tarefas:
+            if parado():
+                resolvidos.append((list(range(len(tarefa[0]))), 0))
+                continue
+            resolvidos.append(_resolver_dia(tarefa))
+
+    dias = [
+        indices[np.asarray(grupo, dtype=np.intp)[rota]].tolist()
+        for grupo, (rota, _) in zip(locais_por_dia, resolvidos, strict=True)
+    ]
+    dias, custos, movimentos = costurar_dias(
+        dias,
+        tempos,
+        bares,
+        janelas,
+        tempo_visita,
+        alpha,
+        beta,
+        ancora_sem_visita,
+        travados={int(indices[p]) for p in fixos},
+        restritos={int(indices[p]) for p in restritos},
+        ultimas=ultimas,
+    )
+    atribuidos = {p for grupo in grupos for p in grupo}
+    return {
+        "dias": dias,
+        "custo": float(math.fsum(custos)),
+        "iteracoes": sum(iteracoes for _, iteracoes in resolvidos),
+        "movimentos": movimentos,
+        "fora": [int(indices[p]) for p in range(len(indices)) if p not in atribuidos],
+    }
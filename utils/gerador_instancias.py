@@ -0,0 +1,166 @@
+"""
+Gerador de instâncias sintéticas no formato de `data/bares.csv`.
+
+Produz bares com coordenadas (agrupadas em bairros ao redor de um centro),
+nota e horários de abertura/fechamento por dia da semana exatamente no
+esquema do CSV real, além de matrizes de distância (km) e tempo (min)
+coerentes entre si:
+
+ - distância = haversine × fator de desvio das ruas
+ - tempo = distância / velocidade(d), com velocidade crescendo com a distância
+   (trechos curtos são mais lentos), calibrada contra data/distancias.pkl
+
+Uso:
+    python -m utils.gerador_instancias --n 500 --semente 1 --saida data/sintetico_500
+"""
+
+import argparse
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+DIAS = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+COLUNAS = ["Nome do Buteco", "Endereço", "Latitude", "Longitude", "Nota"] + [
+    f"{dia} ({tipo})" for dia in DIAS for tipo in ("Abertura", "Fechamento")
+]
+
+# Centro de Belo Horizonte e dispersão dos bares reais (graus)
+CENTRO = (-19.917, -43.945)
+DISPERSAO = (0.047, 0.036)
+
+FATOR_DESVIO = 1.42  # mediana distância de rota / haversine nos dados reais
+VELOCIDADE_MIN = 12.0  # km/h em trechos muito curtos
+VELOCIDADE_MAX = 38.0  # km/h em trechos longos
+DISTANCIA_CARACTERISTICA = 6.0  # km
+
+BAIRROS = ["Centro", "Savassi", "Santa Tereza", "Prado", "Floresta", "Sion", "Pampulha"]
+RUAS = ["Rua da Bahia", "Avenida Amazonas", "Rua Pium-í", "Rua Sapucaí", "Rua Mármore"]
+
+# (abertura, fechamento) mais comuns nos dados reais
+HORARIOS_SEMANA = [
+    ("17:00:00", "00:00:00"),
+    ("18:00:00", "00:00:00"),
+    ("11:00:00", "23:00:00"),
+    ("17:00:00", "23:00:00"),
+    ("16:00:00", "23:30:00"),
+]
+HORARIOS_DOMINGO = [("12:00:00", "22:00:00"), ("11:00:00", "18:00:00")]
+
+
+def haversine(lat, lng):
+    """Matriz n x n de distâncias em linha reta (km) entre coordenadas decimais."""
+    lat_r = np.radians(np.asarray(lat, dtype=np.float64))
+    lng_r = np.radians(np.asarray(lng, dtype=np.float64))
+    dlat = lat_r[:, None] - lat_r[None, :]
+    dlng = lng_r[:, None] - lng_r[None, :]
+    a = (
+        np.sin(dlat / 2) ** 2
+        + np.cos(lat_r[:, None]) * np.cos(lat_r[None, :]) * np.sin(dlng / 2) ** 2
+    )
+    return 2 * 6371.0 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def velocidade_media(distancia_km):
+    """Velocidade média (km/h) esperada para um trajeto de `distancia_km`."""
+    return VELOCIDADE_MAX - (VELOCIDADE_MAX - VELOCIDADE_MIN) * np.exp(
+        -np.asarray(distancia_km) / DISTANCIA_CARACTERISTICA
+    )
+
+
+def gerar_matrizes(lat, lng, fator_desvio=FATOR_DESVIO):
+    """Retorna (distancias_km, tempos_min) como np.ndarray simétricos."""
+    distancias = haversine(lat, lng) * fator_desvio
+    tempos = np.zeros_like(distancias)
+    fora_diagonal = distancias > 0
+    tempos[fora_diagonal] = (
+        distancias[fora_diagonal] / velocidade_media(distancias[fora_diagonal]) * 60.0
+    )
+    return distancias, tempos
+
+
+def gerar_bares(n, semente=0, num_bairros=8):
+    """DataFrame com `n` bares no esquema exato de `data/bares.csv`."""
+    rng = np.random.default_rng(semente)
+
+    # bares agrupados em bairros
+    centros = rng.normal(CENTRO, DISPERSAO, size=(num_bairros, 2))
+    bairro = rng.integers(0, num_bairros, n)
+    coords = centros[bairro] + rng.normal(0, 0.012, size=(n, 2))
+    lat, lng = coords[:, 0], coords[:, 1]
+
+    dados = {
+        "Nome do Buteco": [f"Buteco Sintético {i:04d}" for i in range(n)],
+        "Endereço": [
+            f"{RUAS[rng.integers(len(RUAS))]}, {rng.integers(1, 3000)} | "
+            f"{BAIRROS[b % len(BAIRROS)]}, Belo Horizonte - MG"
+            for b in bairro
+        ],
+        # o CSV guarda graus × 1e6 como inteiro e a nota com vírgula decimal
+        "Latitude": np.round(lat * 1e6).astype(np.int64),
+        "Longitude": np.round(lng * 1e6).astype(np.int64),
+        "Nota": [
+            f"{v:.1f}".replace(".", ",") if pd.notna(v) else np.nan
+            for v in np.where(
+                rng.random(n) < 0.25, np.nan, np.round(rng.uniform(3.5, 5.0, n), 1)
+            )
+        ],
+    }
+
+    semana = rng.integers(0, len(HORARIOS_SEMANA), n)
+    domingo = rng.integers(0, len(HORARIOS_DOMINGO), n)
+    fecha_segunda = rng.random(n) < 0.45
+    fecha_domingo = rng.random(n) < 0.25
+    for dia in DIAS:
+        abertura, fechamento = [], []
+        for i in range(n):
+            if (dia == "Seg" and fecha_segunda[i]) or (
+                dia == "Dom" and fecha_domingo[i]
+            ):
+                ab, fc = None, None
+            elif dia == "Dom":
+                ab, fc = HORARIOS_DOMINGO[domingo[i]]
+            else:
+                ab, fc = HORARIOS_SEMANA[semana[i]]
+            if dia == "Sáb" and ab is not None:
+                # no CSV real o sábado vem sem segundos
+                ab, fc = ab[:5], fc[:5]
+            abertura.append(ab)
+            fechamento.append(fc)
+        dados[f"{dia} (Abertura)"] = abertura
+        dados[f"{dia} (Fechamento)"] = fechamento
+
+    return pd.DataFrame(dados, columns=COLUNAS)
+
+
+def gerar_instancia(n, semente=0):
+    """Retorna (df_bruto, distancias, tempos) com matrizes coerentes com o df."""
+    df = gerar_bares(n, semente)
+    distancias, tempos = gerar_matrizes(df["Latitude"] / 1e6, df["Longitude"] / 1e6)
+    return df, distancias, tempos
+
+
+def salvar_instancia(diretorio, df, distancias, tempos):
+    """Grava `bares.csv` e `distancias.pkl` (listas, como nos dados reais)."""
+    os.makedirs(diretorio, exist_ok=True)
+    caminho_csv = os.path.join(diretorio, "bares.csv")
+    caminho_pkl = os.path.join(diretorio, "distancias.pkl")
+    df.to_csv(caminho_csv, index=False)
+    with open(caminho_pkl, "wb") as f:
+        pickle.dump((np.asarray(distancias).tolist(), np.asarray(tempos).tolist()), f)
+    return caminho_csv, caminho_pkl
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera instância sintética de bares")
+    parser.add_argument("--n", type=int, required=True, help="número de bares")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", required=True, help="diretório de saída")
+    args = parser.parse_args()
+
+    df, distancias, tempos = gerar_instancia(args.n, args.semente)
+    caminho_csv, caminho_pkl = salvar_instancia(args.saida, df, distancias, tempos)
+    print(f"✅ {args.n} bares gerados (semente {args.semente})")
+    print(f"   {caminho_csv}")
+    print(f"   {caminho_pkl}")
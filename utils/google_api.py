@@ -1,68 +1,40 @@
-import googlemaps
 import pandas as pd
 import pickle
 import os
 from dotenv import load_dotenv
 
-load_dotenv()
+from construtor_matriz import ProvedorGoogle, construir_matrizes, coordenadas_bares
+from dados import ids_bares, salvar_matrizes
 
-def converter_coordenada(coord_str):
-    if isinstance(coord_str, str):
-        return float(coord_str.replace('.', '')) / 1000000
-    return float(coord_str)
+load_dotenv()
 
 def obter_matriz_distancia(df, api_key, cache_path="../data/matriz_tempo_minutos.pkl"):
+    """Matrizes (distancias, tempos) via Distance Matrix API, com cache.
+
+    A consulta é feita em blocos paralelos e retomáveis por
+    `construtor_matriz.construir_matrizes` (progresso em `<cache_path>.parcial`).
+    """
     os.makedirs(os.path.dirname(cache_path), exist_ok=True)
     
     if os.path.exists(cache_path):
         with open(cache_path, "rb") as f:
             return pickle.load(f)
 
-    gmaps = googlemaps.Client(key=api_key)
-    n = len(df)
-    distancias = [[0]*n for _ in range(n)]
-    tempos = [[0]*n for _ in range(n)]
+    distancias, tempos, falhas = construir_matrizes(
+        coordenadas_bares(df),
+        ProvedorGoogle(api_key),
+        caminho_checkpoint=f"{cache_path}.parcial",
+    )
+    if falhas:
+        raise RuntimeError(f"{len(falhas)} blocos sem resposta; rode de novo para retomar")
 
-    for i in range(n):
-        for j in range(i+1, n):
-            lat_i = converter_coordenada(df.loc[i,"Latitude"])
-            lon_i = converter_coordenada(df.loc[i,"Longitude"])
-            lat_j = converter_coordenada(df.loc[j,"Latitude"])
-            lon_j = converter_coordenada(df.loc[j,"Longitude"])
-            
-            print(f"Processando {i} -> {j}: ({lat_i}, {lon_i}) -> ({lat_j}, {lon_j})")
-            
-            res = gmaps.distance_matrix(
-                origins=[(lat_i, lon_i)],
-                destinations=[(lat_j, lon_j)],
-                mode="driving"
-            )
-            
-            print(f"Resposta da API: {res}")
-            
-            if res["status"] != "OK":
-                print(f"Erro na API: {res['status']}")
-                continue
-                
-            element = res["rows"][0]["elements"][0]
-            
-            if element["status"] != "OK":
-                print(f"Erro no elemento: {element['status']}")
-                if "error_message" in element:
-                    print(f"Mensagem de erro: {element['error_message']}")
-                continue
-            
-            if "distance" not in element or "duration" not in element:
-                print(f"Resposta incompleta: {element}")
-                continue
-                
-            distancias[i][j] = distancias[j][i] = element["distance"]["value"] / 1000
-            tempos[i][j] = tempos[j][i] = element["duration"]["value"] / 60
-
-    with open(cache_path, "wb") as f:
-        pickle.dump((distancias, tempos), f)
-
-    return distancias, tempos
+    # manifesto com o id de cada linha: o alinhamento com os bares não
+    # depende da ordem do CSV
+    salvar_matrizes(
+        cache_path, distancias, tempos, ids=ids_bares(df), provedor="google"
+    )
+    with open(cache_path, "rb") as f:
+        return pickle.load(f)
 
 def salvar_matriz_csv(df, cache_path="../data/matriz_tempo_minutos.pkl", output_path="../data/matriz_distancias.csv"):
     if not os.path.exists(cache_path):
@@ -0,0 +1,385 @@
+"""
+Grafo esparso de distâncias/tempos: só os k vizinhos mais próximos de cada bar.
+
+As matrizes densas crescem O(n²) em memória e em consultas ao provedor: com
+10.000 bares são 100 milhões de pares, 800 MB por matriz em float64.
+`GrafoEsparso` guarda em CSR só as arestas de cada bar para os seus k
+vizinhos (O(n·k)):
+
+ - `inicio` (n + 1 posições), `colunas` (destinos de cada linha, em ordem
+   crescente) e, por aresta, distância (km) e tempo (min) em float32;
+ - os vizinhos são os mais próximos em linha reta, consultados no provedor
+   por `construtor_matriz.construir_grafo` (com `simetrica`, cada aresta vale
+   nos dois sentidos);
+ - cada bar tem também `ARESTAS_CALIBRACAO` arestas para bares sorteados:
+   só com vizinhos o ajuste da estimativa vê apenas trechos curtos, mais
+   lentos por km, e superestima os longos (numa instância sintética de 1.500
+   bares, erro médio de 19 min contra 2 min com as arestas sorteadas);
+ - os pares fora do grafo são estimados pela distância em linha reta × um
+   fator ajustado nas próprias arestas (`origem_virtual.EstimadorDeslocamento`).
+
+`MatrizEsparsa` é a visão de uma das grandezas com a interface de
+`MatrizCompacta` (`valor`, `tempo_em`, `submatriz`, `deltas_2opt`), então
+`avaliar_rota`, tabu search, limites e solver exato funcionam sem mudança.
+As rotas de um dia ligam bares próximos, quase sempre arestas do grafo; a
+estimativa cobre os saltos longos, que o solver tende a evitar de qualquer
+forma. Como parte dos pares é estimada, o ótimo do solver exato não é
+marcado como comprovado.
+
+O grafo fica em `data/grafo_esparso.npz`, com o manifesto ao lado (ids dos
+bares e k). Para gerar a partir do provedor, ou converter as matrizes densas
+e ver o erro da estimativa nos pares que ficaram de fora:
+
+    python -m utils.construtor_matriz --provedor osrm --vizinhos 20 \\
+        --saida data/grafo_esparso.npz
+    python -m utils.grafo_esparso --vizinhos 20 --saida data/grafo_esparso.npz
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+try:
+    from .dados import (
+        caminho_manifesto,
+        carregar_bares,
+        carregar_manifesto,
+        carregar_matrizes,
+        ids_bares,
+    )
+    from .matrizes_compactas import deltas_2opt_submatriz
+except Exception:
+    from dados import (
+        caminho_manifesto,
+        carregar_bares,
+        carregar_manifesto,
+        carregar_matrizes,
+        ids_bares,
+    )
+    from matrizes_compactas import deltas_2opt_submatriz
+
+ARESTAS_CALIBRACAO = 2  # arestas sorteadas por bar, além dos k vizinhos
+
+
+class GrafoEsparso:
+    """Arestas de cada bar para os seus vizinhos, em CSR."""
+
+    def __init__(self, inicio, colunas, distancias, tempos, k=None):
+        self.inicio = np.ascontiguousarray(inicio, dtype=np.int64)
+        self.colunas = np.ascontiguousarray(colunas, dtype=np.int32)
+        self.distancias = np.ascontiguousarray(distancias, dtype=np.float32)
+        self.tempos = np.ascontiguousarray(tempos, dtype=np.float32)
+        self.n = len(self.inicio) - 1
+        self.k = k
+        arestas = int(self.inicio[-1])
+        for nome, valores in (
+            ("colunas", self.colunas),
+            ("distancias", self.distancias),
+            ("tempos", self.tempos),
+        ):
+            if len(valores) != arestas:
+                raise ValueError(
+                    f"{nome} com {len(valores)} posições, esperado {arestas}"
+                )
+
+    @classmethod
+    def de_arestas(
+        cls, n, origens, destinos, distancias, tempos, k=None, simetrica=False
+    ):
+        """Monta o CSR a partir de arestas soltas.
+
+        Arestas repetidas ficam com a primeira ocorrência; laços e pares sem
+        rota (NaN) são descartados, e esses pares passam a ser estimados.
+        Com `simetrica`, cada aresta vale também no sentido contrário.
+        """
+        origens = np.asarray(origens, dtype=np.int64)
+        destinos = np.asarray(destinos, dtype=np.int64)
+        distancias = np.asarray(distancias, dtype=np.float64)
+        tempos = np.asarray(tempos, dtype=np.float64)
+        if simetrica:
+            origens, destinos = (
+                np.concatenate([origens, destinos]),
+                np.concatenate([destinos, origens]),
+            )
+            distancias = np.concatenate([distancias, distancias])
+            tempos = np.concatenate([tempos, tempos])
+        validas = (origens != destinos) & ~np.isnan(distancias) & ~np.isnan(tempos)
+        origens, destinos = origens[validas], destinos[validas]
+        distancias, tempos = distancias[validas], tempos[validas]
+
+        # ordem estável: entre repetidas, a primeira vem antes
+        ordem = np.lexsort((destinos, origens))
+        origens, destinos = origens[ordem], destinos[ordem]
+        primeiras = np.ones(len(ordem), dtype=bool)
+        primeiras[1:] = (origens[1:] != origens[:-1]) | (destinos[1:] != destinos[:-1])
+        ordem = ordem[primeiras]
+        origens, destinos = origens[primeiras], destinos[primeiras]
+
+        inicio = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(origens, minlength=n), out=inicio[1:])
+        return cls(inicio, destinos, distancias[ordem], tempos[ordem], k)
+
+    @classmethod
+    def de_densa(cls, distancias, tempos, k, aleatorios=ARESTAS_CALIBRACAO, semente=0):
+        """Só as arestas de cada bar para os `k` de menor tempo (mais
+        `aleatorios` sorteadas) nas matrizes densas."""
+        tempos = np.asarray(tempos, dtype=np.float64)
+        distancias = np.asarray(distancias, dtype=np.float64)
+        n = len(tempos)
+        k = min(k, n - 1)
+        if k <= 0:
+            return cls.de_arestas(n, [], [], [], [], k)
+        # o próprio bar (tempo 0) entra nos k + 1 e sai em `de_arestas`
+        chave = np.where(np.eye(n, dtype=bool), -np.inf, tempos)
+        vizinhos = np.argpartition(chave, k, axis=1)[:, : k + 1]
+        sorteados = np.random.default_rng(semente).integers(0, n, (n, aleatorios))
+        origens = np.repeat(np.arange(n), k + 1 + aleatorios)
+        destinos = np.hstack([vizinhos, sorteados]).ravel()
+        return cls.de_arestas(
+            n,
+            origens,
+            destinos,
+            distancias[origens, destinos],
+            tempos[origens, destinos],
+            k,
+        )
+
+    @classmethod
+    def carregar(cls, caminho, bares=None):
+        """Lê o `.npz`, reordenado pelo manifesto como em
+        `dados.carregar_matrizes` (um bar sem linha no grafo é erro)."""
+        with np.load(caminho) as arquivo:
+            grafo = cls(
+                arquivo["inicio"],
+                arquivo["colunas"],
+                arquivo["distancias"],
+                arquivo["tempos"],
+            )
+        manifesto = carregar_manifesto(caminho) or {}
+        grafo.k = manifesto.get("k")
+        if bares is None:
+            return grafo
+
+        ids_manifesto = manifesto.get("ids")
+        if ids_manifesto is None:
+            if grafo.n != len(bares):
+                raise ValueError(
+                    f"Grafo com {grafo.n} bares e sem manifesto para {len(bares)} bares"
+                )
+            return grafo
+        if len(ids_manifesto) != grafo.n:
+            raise ValueError(f"Manifesto de {caminho} não corresponde ao grafo")
+        posicao = {id_: i for i, id_ in enumerate(ids_manifesto)}
+        ids = ids_bares(bares)
+        faltando = [id_ for id_ in ids if id_ not in posicao]
+        if faltando:
+            raise ValueError(f"Bares sem linha no grafo: {faltando}")
+        ordem = [posicao[id_] for id_ in ids]
+        if ordem == list(range(grafo.n)):
+            return grafo
+
+        # posição nova de cada linha antiga (-1: bar que saiu)
+        nova = np.full(grafo.n, -1, dtype=np.int64)
+        nova[ordem] = np.arange(len(ordem))
+        origens, destinos, distancias, tempos = grafo.arestas()
+        origens, destinos = nova[origens], nova[destinos]
+        mantidas = (origens >= 0) & (destinos >= 0)
+        return cls.de_arestas(
+            len(ordem),
+            origens[mantidas],
+            destinos[mantidas],
+            distancias[mantidas],
+            tempos[mantidas],
+            grafo.k,
+        )
+
+    def salvar(self, caminho, ids=None, provedor=None):
+        """Grava o `.npz` e o manifesto (ids, k, provedor)."""
+        with open(f"{caminho}.tmp", "wb") as f:
+            np.savez(
+                f,
+                inicio=self.inicio,
+                colunas=self.colunas,
+                distancias=self.distancias,
+                tempos=self.tempos,
+            )
+        manifesto = {
+            "ids": list(ids) if ids is not None else None,
+            "k": self.k,
+            "provedor": provedor,
+            "atualizado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        destino = caminho_manifesto(caminho)
+        with open(f"{destino}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=1)
+        os.replace(f"{caminho}.tmp", caminho)
+        os.replace(f"{destino}.tmp", destino)
+
+    # --- leitura ---
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def nbytes(self):
+        return int(
+            self.inicio.nbytes
+            + self.colunas.nbytes
+            + self.distancias.nbytes
+            + self.tempos.nbytes
+        )
+
+    def arestas(self):
+        """(origens, destinos, distancias, tempos) de todas as arestas."""
+        origens = np.repeat(np.arange(self.n), np.diff(self.inicio))
+        return origens, self.colunas, self.distancias, self.tempos
+
+    def matrizes(self, estimador):
+        """(distancias, tempos) como `MatrizEsparsa`, com os pares ausentes
+        estimados por `estimador` (`EstimadorDeslocamento`)."""
+        return (
+            MatrizEsparsa(
+                self.inicio,
+                self.colunas,
+                self.distancias,
+                estimador,
+                estimador.fator_distancia,
+            ),
+            MatrizEsparsa(
+                self.inicio, self.colunas, self.tempos, estimador, estimador.fator_tempo
+            ),
+        )
+
+    def resumo(self):
+        arestas = int(self.inicio[-1])
+        return {
+            "k": self.k,
+            "arestas": arestas,
+            "densidade": round(arestas / max(self.n * (self.n - 1), 1), 6),
+        }
+
+
+class MatrizEsparsa:
+    """Uma grandeza do grafo como matriz n × n; fora do grafo, a estimativa.
+
+    `inicio` e `colunas` são os arrays do `GrafoEsparso` (compartilhados
+    entre distâncias e tempos); `fator` converte km em linha reta na
+    grandeza (`estimador.fator_tempo` ou `fator_distancia`).
+    """
+
+    def __init__(self, inicio, colunas, valores, estimador, fator):
+        self.inicio = inicio
+        self.colunas = colunas
+        self.valores = valores
+        self.estimador = estimador
+        self.fator = fator
+        self.n = len(inicio) - 1
+
+    def __len__(self):
+        return self.n
+
+    def __array__(self, dtype=None, copy=None):
+        # densa O(n²): só para instâncias pequenas
+        m = self.submatriz(np.arange(self.n))
+        return m if dtype is None else m.astype(dtype)
+
+    @property
+    def nbytes(self):
+        return int(self.valores.nbytes)
+
+    def estimar(self, origens, destinos):
+        """Estimativa de todos os pares (os argumentos fazem broadcast)."""
+        return self.estimador.retas(origens, destinos) * self.fator
+
+    def valor(self, origem, destino):
+        a, b = int(self.inicio[origem]), int(self.inicio[origem + 1])
+        pos = a + int(np.searchsorted(self.colunas[a:b], destino))
+        if pos < b and self.colunas[pos] == destino:
+            return float(self.valores[pos])
+        return float(self.estimar(origem, destino))
+
+    def tempo_em(self, origem, destino, minuto):
+        """Mesma interface de `TemposPorHorario`; aqui o horário não importa."""
+        return self.valor(origem, destino)
+
+    def submatriz(self, indices):
+        """Estimativa de todos os pares, sobrescrita pelas arestas do grafo.
+
+        Custa O(m² + m·k) para m índices, sem depender de n.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        m = len(indices)
+        sub = self.estimar(indices[:, None], indices[None, :])
+        if m == 0:
+            return sub
+        # todas as arestas das linhas pedidas, em um só array
+        inicios = self.inicio[indices]
+        tamanhos = self.inicio[indices + 1] - inicios
+        linhas = np.repeat(np.arange(m), tamanhos)
+        arestas = np.arange(int(tamanhos.sum())) + np.repeat(
+            inicios - (np.cumsum(tamanhos) - tamanhos), tamanhos
+        )
+        # quais destinos estão entre os índices (e em que posição)
+        ordem = np.argsort(indices, kind="stable")
+        ordenados = indices[ordem]
+        colunas = self.colunas[arestas]
+        pos = np.minimum(np.searchsorted(ordenados, colunas), m - 1)
+        achadas = ordenados[pos] == colunas
+        sub[linhas[achadas], ordem[pos[achadas]]] = self.valores[arestas[achadas]]
+        return sub
+
+    def deltas_2opt(self, rota, hora_inicial=None, tempo_visita=None):
+        return deltas_2opt_submatriz(self.submatriz(rota))
+
+
+def main():
+    try:
+        from .indice_espacial import IndiceEspacial
+        from .origem_virtual import EstimadorDeslocamento
+    except ImportError:
+        from indice_espacial import IndiceEspacial
+        from origem_virtual import EstimadorDeslocamento
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bares", default="data/bares.csv")
+    parser.add_argument("--matrizes", default="data/distancias.pkl")
+    parser.add_argument("--vizinhos", type=int, default=20, help="k")
+    parser.add_argument("--saida", help="grava o grafo (.npz) e o manifesto")
+    args = parser.parse_args()
+
+    bares = carregar_bares(args.bares)
+    distancias, tempos = carregar_matrizes(args.matrizes, bares)
+    distancias = np.nan_to_num(np.asarray(distancias, dtype=np.float64), nan=0.0)
+    tempos = np.nan_to_num(np.asarray(tempos, dtype=np.float64), nan=0.0)
+    grafo = GrafoEsparso.de_densa(distancias, tempos, args.vizinhos)
+    estimador = EstimadorDeslocamento.calibrar_pares(
+        IndiceEspacial.de_bares(bares), grafo.n, *grafo.arestas()
+    )
+    _, tempos_esparsos = grafo.matrizes(estimador)
+
+    n = grafo.n
+    fora = ~np.eye(n, dtype=bool)
+    origens, destinos, _, _ = grafo.arestas()
+    fora[origens, destinos] = False
+    erro = np.abs(np.asarray(tempos_esparsos) - tempos)[fora]
+    resumo = grafo.resumo()
+    print(
+        f"{n} bares, k = {grafo.k}: {resumo['arestas']} arestas "
+        f"({resumo['densidade']:.1%} dos pares), {grafo.nbytes / 1024:.0f} KB "
+        f"(densas em float64: {2 * tempos.nbytes / 1024:.0f} KB)"
+    )
+    print(
+        f"estimativa: {estimador.fator_tempo:.2f} min/km em linha reta; "
+        f"erro nos pares fora do grafo: médio {erro.mean():.2f} min, "
+        f"máx {erro.max(initial=0.0):.2f} min"
+    )
+    if args.saida:
+        grafo.salvar(args.saida, ids=ids_bares(bares), provedor="matrizes")
+        print(f"grafo salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Índice espacial dos bares para consultas geográficas.
+
+As coordenadas (graus) são projetadas em km num plano equirretangular
+centrado nos próprios bares, o que em uma cidade do tamanho de BH erra bem
+menos que o arredondamento das coordenadas. Os pontos ficam em uma grade
+uniforme (células de `celula_km`), então uma consulta por raio só mede a
+distância dos bares das células que o círculo toca:
+
+ - `raio(lat, lng, km)`: bares a até `km` em linha reta, do mais perto ao
+   mais longe;
+ - `vizinhos(lat, lng, k)`: os `k` mais próximos (raio crescente até juntar
+   `k`).
+
+As distâncias são em linha reta, não pela rua; servem para responder "bares
+perto de mim" e para reduzir os candidatos antes do solver, não como tempo
+de deslocamento.
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from .dados import converter_coordenada
+except Exception:
+    from dados import converter_coordenada
+
+RAIO_TERRA_KM = 6371.0
+
+
+class IndiceEspacial:
+    """Grade uniforme sobre as coordenadas projetadas dos bares."""
+
+    def __init__(self, lat, lng, indices=None, celula_km=1.0):
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        if indices is None:
+            indices = np.arange(len(lat))
+        self.indices = np.asarray(indices, dtype=np.intp)
+        self.celula_km = celula_km
+        self.lat0 = float(lat.mean()) if len(lat) else 0.0
+        self.lng0 = float(lng.mean()) if len(lng) else 0.0
+        self._escala_x = (
+            math.radians(1) * RAIO_TERRA_KM * math.cos(math.radians(self.lat0))
+        )
+        self._escala_y = math.radians(1) * RAIO_TERRA_KM
+        self.pontos = self.projetar(lat, lng)
+        self._coordenadas = {
+            int(i): (float(la), float(ln))
+            for i, la, ln in zip(self.indices, lat, lng, strict=True)
+        }
+
+        celulas = np.floor(self.pontos / celula_km).astype(np.int64)
+        self._celulas = {}
+        for posicao, celula in enumerate(map(tuple, celulas.tolist())):
+            self._celulas.setdefault(celula, []).append(posicao)
+        self._celulas = {
+            c: np.asarray(p, dtype=np.intp) for c, p in self._celulas.items()
+        }
+        # raio que cobre todos os pontos a partir de qualquer um deles
+        if len(self.pontos):
+            extensao = self.pontos.max(axis=0) - self.pontos.min(axis=0)
+            self._diametro = float(np.hypot(*extensao))
+        else:
+            self._diametro = 0.0
+
+    @classmethod
+    def de_bares(cls, bares, celula_km=1.0):
+        """Índice das colunas Latitude/Longitude; bares sem coordenada ficam de fora."""
+        lat, lng, indices = [], [], []
+        for posicao, (_, bar) in enumerate(bares.iterrows()):
+            la = converter_coordenada(bar.get("Latitude"), None, tipo="lat")
+            ln = converter_coordenada(bar.get("Longitude"), None, tipo="lng")
+            if la is None or ln is None:
+                continue
+            lat.append(la)
+            lng.append(ln)
+            indices.append(posicao)
+        return cls(lat, lng, indices, celula_km)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def coordenadas(self, indice):
+        """(lat, lng) do bar `indice`, ou None se ele não tem coordenada."""
+        return self._coordenadas.get(int(indice))
+
+    def projetar(self, lat, lng):
+        """(lat, lng) em graus → (x, y) em km no plano do índice."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        return np.stack(
+            [(lng - self.lng0) * self._escala_x, (lat - self.lat0) * self._escala_y],
+            axis=-1,
+        )
+
+    def raio(self, lat, lng, km):
+        """Bares a até `km` de (lat, lng).
+
+        Returns:
+            tuple: (indices, distancias_km), do mais próximo ao mais distante
+        """
+        centro = self.projetar(lat, lng)
+        inicio = np.floor((centro - km) / self.celula_km).astype(np.int64)
+        fim = np.floor((centro + km) / self.celula_km).astype(np.int64)
+
+        if np.prod(fim - inicio + 1) <= len(self._celulas):
+            candidatos = [
+                self._celulas[(cx, cy)]
+                for cx in range(inicio[0], fim[0] + 1)
+                for cy in range(inicio[1], fim[1] + 1)
+                if (cx, cy) in self._celulas
+            ]
+        else:
+            # raio grande: mais barato percorrer só as células ocupadas
+            candidatos = [
+                posicoes
+                for (cx, cy), posicoes in self._celulas.items()
+                if inicio[0] <= cx <= fim[0] and inicio[1] <= cy <= fim[1]
+            ]
+        if not candidatos:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        posicoes = np.concatenate(candidatos)
+        distancias = np.hypot(*(self.pontos[posicoes] - centro).T)
+        dentro = distancias <= km
+        posicoes, distancias = posicoes[dentro], distancias[dentro]
+        ordem = np.argsort(distancias, kind="stable")
+        return self.indices[posicoes[ordem]], distancias[ordem]
+
+    def vizinhos(self, lat, lng, k):
+        """Os `k` bares mais próximos de (lat, lng): (indices, distancias_km)."""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        centro = self.projetar(lat, lng)
+        # distância do ponto ao bar mais distante possível
+        alcance = self._diametro + float(np.hypot(*(centro - self.pontos[0])))
+        km = self.celula_km
+        while True:
+            indices, distancias = self.raio(lat, lng, km)
+            if len(indices) >= k or km >= alcance:
+                return indices[:k], distancias[:k]
+            km *= 2
@@ -0,0 +1,88 @@
+"""
+Instrumentação leve dos caminhos críticos do otimizador.
+
+`Perfil` acumula tempo por fase (ex.: solução inicial, geração de vizinhos,
+avaliação, atualização) e contadores (movimentos avaliados, avaliações
+completas x deltas, acertos na lista tabu, aspirações). Quem chama decide o
+destino: o resumo vai para o `historico` do tabu search e, se houver
+`emitir`, é entregue a um callback (ex.: registro de métricas).
+
+Sem perfil, os solvers usam `PERFIL_DESATIVADO`, cujos métodos não fazem nada,
+então o custo quando desligado é só uma chamada vazia por fase.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+class Perfil:
+    """Timers por fase e contadores de uma execução."""
+
+    ativo = True
+
+    def __init__(self, emitir=None):
+        self.tempos = defaultdict(float)
+        self.chamadas = defaultdict(int)
+        self.contadores = defaultdict(int)
+        self.emitir = emitir
+
+    @contextmanager
+    def fase(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tempos[nome] += time.perf_counter() - inicio
+            self.chamadas[nome] += 1
+
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] += quantidade
+
+    def resumo(self):
+        return {
+            "tempos": dict(self.tempos),
+            "chamadas": dict(self.chamadas),
+            "contadores": dict(self.contadores),
+        }
+
+    def finalizar(self):
+        """Entrega o resumo ao callback `emitir` (se houver) e o retorna."""
+        resumo = self.resumo()
+        if self.emitir is not None:
+            self.emitir(resumo)
+        return resumo
+
+    def __str__(self):
+        linhas = []
+        total = sum(self.tempos.values()) or 1.0
+        for nome, segundos in sorted(self.tempos.items(), key=lambda x: -x[1]):
+            linhas.append(
+                f"{nome:20s} {segundos * 1000:10.2f} ms  {segundos / total:6.1%}"
+                f"  ({self.chamadas[nome]} chamadas)"
+            )
+        for nome, valor in sorted(self.contadores.items()):
+            linhas.append(f"{nome:20s} {valor:10d}")
+        return "\n".join(linhas)
+
+
+class _PerfilNulo:
+    """Perfil desligado: mesma interface, sem custo."""
+
+    ativo = False
+    _contexto = nullcontext()
+
+    def fase(self, nome):
+        return self._contexto
+
+    def contar(self, nome, quantidade=1):
+        pass
+
+    def resumo(self):
+        return None
+
+    def finalizar(self):
+        return None
+
+
+PERFIL_DESATIVADO = _PerfilNulo()
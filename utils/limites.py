@@ -0,0 +1,180 @@
+"""
+Limites inferiores para avaliar a qualidade das rotas.
+
+ - limite_agm: custo da AGM, limite inferior para qualquer caminho hamiltoniano
+   (todo caminho é uma árvore geradora);
+ - limite_held_karp: 1-árvore com nó fictício e ascensão por subgradiente
+   (Held-Karp), adaptada para caminho aberto com bar inicial fixo;
+ - limite_inferior_custo: converte o limite de deslocamento para a escala do
+   custo de `avaliar_rota` (visitas e notas são constantes para um conjunto
+   fixo de bares) e, com `hora_inicial`, soma a menor penalidade de horário
+   possível (`programacao_dinamica.penalidade_minima`), que costuma dominar
+   o custo;
+ - calcular_gap: distância relativa entre uma solução e o limite, sobre a
+   parte do custo que depende da ordem (`custo_constante` fica de fora).
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .agm import prim_denso
+    from .matrizes_compactas import submatriz
+    from .programacao_dinamica import penalidade_minima
+except Exception:
+    from agm import prim_denso
+    from matrizes_compactas import submatriz
+    from programacao_dinamica import penalidade_minima
+
+
+def limite_agm(matriz):
+    """Custo da AGM da matriz simetrizada pelo menor sentido de cada par."""
+    m = np.asarray(matriz, dtype=np.float64)
+    _, _, custo = prim_denso(np.minimum(m, m.T))
+    return custo
+
+
+def _uma_arvore(m, pi, inicio):
+    """1-árvore com nó fictício ligado a `inicio` e ao melhor outro extremo.
+
+    Retorna (custo nos pesos ajustados por pi, graus de cada vértice real).
+    """
+    n = len(m)
+    ajustada = m + pi[:, None] + pi[None, :]
+    arestas, _, custo = prim_denso(ajustada)
+    graus = np.bincount(arestas.ravel(), minlength=n)
+
+    # arestas do nó fictício custam 0 + pi[v]; uma delas é forçada em `inicio`
+    outros = pi.copy()
+    outros[inicio] = np.inf
+    fim = int(np.argmin(outros))
+    custo += pi[inicio] + pi[fim]
+    graus[inicio] += 1
+    graus[fim] += 1
+    return custo, graus
+
+
+def limite_held_karp(
+    matriz,
+    inicio=0,
+    limite_superior=None,
+    max_iter=100,
+    passo_inicial=2.0,
+    paciencia=10,
+):
+    """Limite de Held-Karp para o caminho aberto que começa em `inicio`.
+
+    Args:
+        matriz: matriz n x n de tempos/distâncias
+        inicio: índice do bar inicial (extremo fixo do caminho)
+        limite_superior: custo de um caminho conhecido; usado no passo de
+            Polyak e como critério de parada (default: AGM × 2)
+        max_iter: número máximo de iterações do subgradiente
+        passo_inicial: fator λ do passo, reduzido à metade a cada `paciencia`
+            iterações sem melhora
+
+    Returns:
+        float: melhor limite inferior encontrado
+    """
+    m = np.asarray(matriz, dtype=np.float64)
+    m = np.minimum(m, m.T)
+    n = len(m)
+    if n <= 1:
+        return 0.0
+    if n == 2:
+        return float(m[0, 1])
+
+    pi = np.zeros(n)
+    melhor = -np.inf
+    if limite_superior is None:
+        limite_superior = 2.0 * limite_agm(m)
+    lam = passo_inicial
+    sem_melhora = 0
+
+    for _ in range(max_iter):
+        custo, graus = _uma_arvore(m, pi, inicio)
+        limite = custo - 2.0 * pi.sum()
+        if limite > melhor + 1e-9:
+            melhor = limite
+            sem_melhora = 0
+        else:
+            sem_melhora += 1
+            if sem_melhora >= paciencia:
+                lam /= 2.0
+                sem_melhora = 0
+
+        subgradiente = graus - 2
+        norma = float(subgradiente @ subgradiente)
+        if norma == 0:
+            # 1-árvore é um caminho hamiltoniano: limite é ótimo
+            break
+        if melhor >= limite_superior - 1e-9 or lam < 1e-6:
+            break
+        passo = lam * (limite_superior - limite) / norma
+        pi += passo * subgradiente
+
+    return float(min(melhor, limite_superior))
+
+
+def limite_inferior_custo(
+    rota,
+    tempos,
+    bares,
+    tempo_visita,
+    alpha=1.0,
+    beta=20.0,
+    hora_inicial=None,
+    **kwargs,
+):
+    """Limite inferior do custo de `avaliar_rota` para os bares de `rota`.
+
+    O primeiro bar de `rota` é tratado como início fixo. Sem `hora_inicial`
+    as penalidades de horário entram como 0. Parâmetros extras são repassados
+    para `limite_held_karp`.
+    """
+    rota = np.asarray(rota, dtype=np.intp)
+    if len(rota) == 0:
+        return float("inf")
+
+    sub = submatriz(tempos, rota)
+    deslocamento = limite_held_karp(sub, inicio=0, **kwargs)
+
+    penalidade = 0.0
+    if hora_inicial is not None:
+        penalidade = penalidade_minima(rota, tempos, bares, hora_inicial, tempo_visita)
+
+    constante = custo_constante(rota, bares, tempo_visita, alpha, beta)
+    return alpha * deslocamento + penalidade + constante
+
+
+def custo_constante(rota, bares, tempo_visita, alpha=1.0, beta=20.0):
+    """Parte do custo de `avaliar_rota` que não depende da ordem dos bares
+    de `rota` (o primeiro é o início): visitas e notas."""
+    rota = np.asarray(rota, dtype=np.intp)
+    visita_min = (
+        tempo_visita.total_seconds() / 60.0
+        if hasattr(tempo_visita, "total_seconds")
+        else float(tempo_visita)
+    )
+    total_visitas = visita_min * max(len(rota) - 1, 0)
+
+    soma_notas = 0.0
+    if "Nota" in bares.columns:
+        notas = pd.to_numeric(bares["Nota"], errors="coerce").to_numpy(dtype=np.float64)
+        soma_notas = float(np.nansum(notas[rota[1:]]))
+    return alpha * total_visitas - beta * soma_notas
+
+
+def calcular_gap(custo, limite, constante=0.0):
+    """Gap relativo (custo - limite) / |custo - constante|, nunca negativo.
+
+    Com `constante` de `custo_constante`, o denominador é a parte do custo
+    que depende da ordem (deslocamento e penalidades): o gap fica entre 0 e
+    1 e é a fração dela que ainda pode estar sobrando. Só com o custo no
+    denominador (`constante=0`), as notas, que entram negativas, deixam o
+    custo perto de zero e o gap passa de 1 nas instâncias reais.
+    """
+    base = custo - constante
+    if limite is None or not np.isfinite(limite) or base == 0:
+        return None
+    return max(0.0, (custo - limite) / abs(base))
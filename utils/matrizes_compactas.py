@@ -0,0 +1,168 @@
+"""
+Matrizes de distância/tempo compactas (float32 ou uint16 quantizado).
+
+Em float64 as matrizes ocupam 8 bytes por par, e as linhas em listas Python
+que o laço do tabu indexa custam ~32 bytes por par (um objeto float cada).
+Para milhares de bares isso passa de centenas de MB por worker e não cabe
+em cache. `MatrizCompacta` guarda a matriz em:
+
+ - float32: 4 bytes por par, erro relativo ~6e-8;
+ - uint16: 2 bytes por par, em unidades fixas (`ESCALAS`: décimos de minuto
+   para tempos, dezenas de metros para distâncias), erro de até meia unidade.
+
+O laço do tabu não indexa par a par: `deltas_2opt` extrai a submatriz da
+rota atual com indexação NumPy e calcula o delta de todos os movimentos de
+uma vez. `submatriz` e `valor` convertem só o que é lido para float64.
+
+Para ver o erro de cada precisão em relação ao pickle de origem:
+
+    python -m utils.matrizes_compactas
+"""
+
+import argparse
+
+import numpy as np
+
+try:
+    from .dados import carregar_matrizes
+except Exception:
+    from dados import carregar_matrizes
+
+PRECISOES = ("float64", "float32", "uint16")
+# unidades por minuto (tempos) e por km (distâncias) no formato uint16
+ESCALAS = {"tempos": 10, "distancias": 100}
+
+
+def submatriz(matriz, indices):
+    """`matriz[indices][:, indices]` em float64, sem converter a matriz inteira."""
+    extrair = getattr(matriz, "submatriz", None)
+    if extrair is not None:
+        return extrair(indices)
+    return np.asarray(matriz, dtype=np.float64)[np.ix_(indices, indices)]
+
+
+def deltas_2opt_submatriz(sub):
+    """Delta de deslocamento de todos os movimentos 2-opt `(i, j)`.
+
+    `sub` é a submatriz float64 da rota (`sub[a][b]` = tempo da posição a
+    para a posição b). Mesma convenção de
+    `tabu_search.avaliar_movimento_parcial`; retorna listas (`deltas[i][j]`),
+    que o laço do tabu indexa mais rápido.
+    """
+    n = len(sub)
+    if n < 3:
+        return [[0.0] * n for _ in range(n)]
+    removidas = np.diagonal(sub, offset=1)
+    # (rota[i], rota[j]) no lugar de (rota[i], rota[i+1])
+    deltas = sub[:-1] - removidas[:, None]
+    # (rota[i+1], rota[j+1]) no lugar de (rota[j], rota[j+1]), j < n - 1
+    deltas[:, :-1] += sub[1:, 1:] - removidas[None, :]
+    return deltas.tolist()
+
+
+class MatrizCompacta:
+    """Matriz n × n em float32 ou uint16 com leitura em float64."""
+
+    def __init__(self, dados, escala=1):
+        self.dados = np.ascontiguousarray(dados)
+        if self.dados.ndim != 2 or self.dados.shape[0] != self.dados.shape[1]:
+            raise ValueError(f"Matriz com forma {self.dados.shape}, esperado (n, n)")
+        self.n = self.dados.shape[0]
+        self.escala = escala
+
+    @classmethod
+    def compactar(cls, matriz, precisao, escala=1):
+        """Converte uma matriz em minutos/km para `precisao` ("float32"/"uint16").
+
+        Em uint16, `escala` é o número de unidades por minuto/km; valores que
+        não cabem em 16 bits são erro (use float32).
+        """
+        m = np.nan_to_num(np.asarray(matriz, dtype=np.float64), nan=0.0)
+        if precisao == "float32":
+            return cls(m.astype(np.float32))
+        if precisao != "uint16":
+            raise ValueError(f"Precisão desconhecida: {precisao}")
+        quantizada = np.rint(m * escala)
+        limite = np.iinfo(np.uint16).max
+        if quantizada.min() < 0 or quantizada.max() > limite:
+            raise ValueError(
+                f"Valores fora de [0, {limite / escala:g}] não cabem em uint16 "
+                f"com escala {escala}; use float32"
+            )
+        return cls(quantizada.astype(np.uint16), escala)
+
+    # --- leitura ---
+
+    def __len__(self):
+        return self.n
+
+    def __array__(self, dtype=None, copy=None):
+        m = self.dados.astype(np.float64)
+        if self.escala != 1:
+            m /= self.escala
+        return m if dtype is None else m.astype(dtype)
+
+    @property
+    def nbytes(self):
+        return int(self.dados.nbytes)
+
+    def valor(self, origem, destino):
+        return float(self.dados[origem, destino]) / self.escala
+
+    def tempo_em(self, origem, destino, minuto):
+        """Mesma interface de `TemposPorHorario`; aqui o horário não importa."""
+        return self.valor(origem, destino)
+
+    def submatriz(self, indices):
+        indices = np.asarray(indices, dtype=np.intp)
+        sub = self.dados[np.ix_(indices, indices)].astype(np.float64)
+        if self.escala != 1:
+            sub /= self.escala
+        return sub
+
+    def deltas_2opt(self, rota, hora_inicial=None, tempo_visita=None):
+        return deltas_2opt_submatriz(self.submatriz(rota))
+
+    # --- erro em relação à matriz original ---
+
+    def erro(self, original):
+        """Erro absoluto e relativo de cada par em relação a `original`."""
+        original = np.nan_to_num(np.asarray(original, dtype=np.float64), nan=0.0)
+        diferenca = np.abs(np.asarray(self) - original)
+        positivos = original > 0
+        relativo = diferenca[positivos] / original[positivos]
+        return {
+            "erro_max": float(diferenca.max(initial=0.0)),
+            "erro_medio": float(diferenca.mean()) if diferenca.size else 0.0,
+            "erro_relativo_max": float(relativo.max(initial=0.0)),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matrizes", default="data/distancias.pkl")
+    args = parser.parse_args()
+
+    distancias, tempos = carregar_matrizes(args.matrizes)
+    for nome, original in (("distancias", distancias), ("tempos", tempos)):
+        original = np.asarray(original, dtype=np.float64)
+        unidade = "km" if nome == "distancias" else "min"
+        kb = original.nbytes / 1024
+        print(f"{nome} ({len(original)} × {len(original)}, float64: {kb:.0f} KB)")
+        for precisao in PRECISOES[1:]:
+            try:
+                compacta = MatrizCompacta.compactar(original, precisao, ESCALAS[nome])
+            except ValueError as e:
+                print(f"  {precisao:8s} {e}")
+                continue
+            erro = compacta.erro(original)
+            print(
+                f"  {precisao:8s} {compacta.nbytes / 1024:7.0f} KB  "
+                f"erro máx {erro['erro_max']:.4f} {unidade}  "
+                f"médio {erro['erro_medio']:.4f} {unidade}  "
+                f"relativo máx {erro['erro_relativo_max']:.2e}"
+            )
+
+
+if __name__ == "__main__":
+    main()
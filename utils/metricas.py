@@ -0,0 +1,250 @@
+"""
+Registro de métricas no formato texto do Prometheus.
+
+Implementação mínima (contador, medidor e histograma com rótulos) para não
+depender do prometheus_client. As atualizações só seguram um lock pelo tempo
+de somar um número, então não bloqueiam as threads de requisição; valores
+caros (memória do processo, razões de cache) são calculados por funções
+chamadas apenas quando `/metrics` é lido.
+
+Cada processo tem o próprio registro. Com vários workers do gunicorn, cada
+leitura de `/metrics` cai em um deles; `Registro.rotulos_fixos` (o
+gunicorn.conf.py põe `worker=<pid>`) separa as séries de cada worker, e o
+total sai de uma soma no Prometheus (ex.: `sum without (worker) (...)`).
+"""
+
+import math
+import os
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS_ITERACOES = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _formatar_valor(valor):
+    if valor == math.inf:
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatar_rotulos(nomes, valores, extra=()):
+    pares = list(zip(nomes, valores)) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def _chave(self, rotulos):
+        if set(rotulos) != set(self.rotulos):
+            raise ValueError(
+                f"{self.nome}: rótulos esperados {self.rotulos}, recebidos {tuple(rotulos)}"
+            )
+        return tuple(str(rotulos[r]) for r in self.rotulos)
+
+    def _linhas(self, fixos=()):
+        raise NotImplementedError
+
+    def exportar(self, fixos=()):
+        """Texto da métrica; `fixos` são pares (rótulo, valor) de toda série."""
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        linhas.extend(self._linhas(fixos))
+        return "\n".join(linhas)
+
+
+class Contador(_Metrica):
+    """Valor que só cresce (ex.: total de requisições)."""
+
+    tipo = "counter"
+
+    def inc(self, quantidade=1.0, **rotulos):
+        if quantidade < 0:
+            raise ValueError("Contador não pode diminuir")
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + quantidade
+
+    def valor(self, **rotulos):
+        return self._valores.get(self._chave(rotulos), 0.0)
+
+    def _linhas(self, fixos=()):
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [
+            f"{self.nome}{_formatar_rotulos(self.rotulos, chave, fixos)} "
+            f"{_formatar_valor(v)}"
+            for chave, v in itens
+        ]
+
+
+class Medidor(_Metrica):
+    """Valor que sobe e desce (ex.: otimizações em andamento).
+
+    Com `funcao`, o valor é lido na hora da exportação (sem rótulos).
+    """
+
+    tipo = "gauge"
+
+    def __init__(self, nome, ajuda, rotulos=(), funcao=None):
+        super().__init__(nome, ajuda, rotulos)
+        self.funcao = funcao
+
+    def set(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = float(valor)
+
+    def inc(self, quantidade=1.0, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + quantidade
+
+    def dec(self, quantidade=1.0, **rotulos):
+        self.inc(-quantidade, **rotulos)
+
+    def valor(self, **rotulos):
+        if self.funcao is not None:
+            return float(self.funcao())
+        return self._valores.get(self._chave(rotulos), 0.0)
+
+    def _linhas(self, fixos=()):
+        if self.funcao is not None:
+            try:
+                valor = float(self.funcao())
+            except Exception:
+                return []
+            if math.isnan(valor):
+                return []
+            return [
+                f"{self.nome}{_formatar_rotulos((), (), fixos)} {_formatar_valor(valor)}"
+            ]
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [
+            f"{self.nome}{_formatar_rotulos(self.rotulos, chave, fixos)} "
+            f"{_formatar_valor(v)}"
+            for chave, v in itens
+        ]
+
+
+class Histograma(_Metrica):
+    """Distribuição em buckets cumulativos, com soma e contagem."""
+
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            estado = self._valores.get(chave)
+            if estado is None:
+                estado = self._valores[chave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    estado[0][i] += 1
+                    break
+            estado[1] += valor
+            estado[2] += 1
+
+    def contagem(self, **rotulos):
+        estado = self._valores.get(self._chave(rotulos))
+        return estado[2] if estado else 0
+
+    def _linhas(self, fixos=()):
+        with self._lock:
+            itens = sorted(
+                (chave, (list(e[0]), e[1], e[2])) for chave, e in self._valores.items()
+            )
+        linhas = []
+        for chave, (contagens, soma, total) in itens:
+            acumulado = 0
+            for limite, c in zip(self.buckets, contagens):
+                acumulado += c
+                rotulos = _formatar_rotulos(
+                    self.rotulos, chave, [*fixos, ("le", _formatar_valor(limite))]
+                )
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave, fixos)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_valor(soma)}")
+            linhas.append(f"{self.nome}_count{rotulos} {total}")
+        return linhas
+
+
+class Registro:
+    """Conjunto de métricas exportado em `/metrics`."""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+        # rótulos de todas as séries (ex.: {"worker": "1234"})
+        self.rotulos_fixos = {}
+
+    def _registrar(self, metrica):
+        with self._lock:
+            existente = self._metricas.get(metrica.nome)
+            if existente is not None:
+                if type(existente) is not type(metrica):
+                    raise ValueError(f"Métrica {metrica.nome} já registrada")
+                return existente
+            self._metricas[metrica.nome] = metrica
+            return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def medidor(self, nome, ajuda, rotulos=(), funcao=None):
+        return self._registrar(Medidor(nome, ajuda, rotulos, funcao))
+
+    def histograma(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA):
+        return self._registrar(Histograma(nome, ajuda, rotulos, buckets))
+
+    def exportar(self):
+        with self._lock:
+            metricas = list(self._metricas.values())
+        fixos = tuple(self.rotulos_fixos.items())
+        return "\n".join(m.exportar(fixos) for m in metricas) + "\n"
+
+
+def memoria_residente_bytes():
+    """RSS atual do processo (Linux); cai para o pico do getrusage."""
+    try:
+        with open(f"/proc/{os.getpid()}/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return memoria_pico_bytes()
+
+
+def memoria_pico_bytes():
+    if resource is None:
+        return math.nan
+    # ru_maxrss é em KiB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if os.uname().sysname == "Darwin" else pico * 1024
+
+
+REGISTRO = Registro()
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
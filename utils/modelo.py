@@ -0,0 +1,215 @@
+"""
+Modelo compilado: bares e matrizes prontos para servir requisições.
+
+Carregado uma única vez no processo mestre (gunicorn com `preload_app`)
+antes do fork, para que os workers compartilhem as páginas copy-on-write:
+
+ - as matrizes viram arrays NumPy contíguos (um bloco de memória que o
+   contador de referências do Python não toca), usados pelo código vetorizado;
+ - as linhas em listas Python também são montadas aqui, porque o laço do
+   tabu search indexa elemento a elemento e é mais rápido com listas;
+ - os nomes normalizados para a busca do bar inicial são pré-calculados, em
+   vez de copiar o DataFrame a cada requisição;
+ - os tempos por horário (opcionais) ficam mapeados do `.npy`;
+ - com `precisao="float32"` ou `"uint16"` as matrizes ficam compactas
+   (utils/matrizes_compactas.py), sem as listas, e o erro em relação às
+   matrizes de origem fica em `erro_precisao`;
+ - o índice espacial das coordenadas (utils/indice_espacial.py) também é
+   montado uma vez aqui, junto com o estimador de deslocamento para partidas
+   de um ponto qualquer (utils/origem_virtual.py);
+ - os ids estáveis dos bares, que o `routeToken` usa em vez de índices
+   (utils/reotimizacao.py);
+ - com um grafo esparso (utils/grafo_esparso.py) não há matrizes densas: só
+   as arestas dos k vizinhos de cada bar, e o estimador (ajustado nessas
+   arestas) cobre os outros pares.
+"""
+
+import os
+import time
+
+import numpy as np
+
+try:
+    from .avalia_rota import avaliar_rota
+    from .dados import carregar_bares, carregar_matrizes, ids_bares, normalizar_nome
+    from .grafo_esparso import GrafoEsparso
+    from .indice_espacial import IndiceEspacial
+    from .origem_virtual import EstimadorDeslocamento
+    from .matrizes_compactas import ESCALAS, PRECISOES, MatrizCompacta
+    from .tempos_dependentes import TemposPorHorario, minuto_do_dia
+except Exception:
+    from avalia_rota import avaliar_rota
+    from dados import carregar_bares, carregar_matrizes, ids_bares, normalizar_nome
+    from grafo_esparso import GrafoEsparso
+    from indice_espacial import IndiceEspacial
+    from origem_virtual import EstimadorDeslocamento
+    from matrizes_compactas import ESCALAS, PRECISOES, MatrizCompacta
+    from tempos_dependentes import TemposPorHorario, minuto_do_dia
+
+
+class Modelo:
+    """Dados imutáveis compartilhados por todas as requisições de um processo."""
+
+    def __init__(
+        self,
+        bares,
+        distancias,
+        tempos,
+        tempos_por_horario=None,
+        precisao="float64",
+        grafo=None,
+    ):
+        if precisao not in PRECISOES:
+            raise ValueError(f"Precisão {precisao!r}, esperado uma de {PRECISOES}")
+        n = len(bares)
+        self.bares = bares
+        self.grafo = grafo
+        self.indice = IndiceEspacial.de_bares(bares)
+        if grafo is not None:
+            self._usar_grafo(grafo)
+        else:
+            self._usar_matrizes(distancias, tempos, precisao)
+        if tempos_por_horario is not None and tempos_por_horario.n != n:
+            raise ValueError(
+                f"Tempos por horário com {tempos_por_horario.n} bares, esperado {n}"
+            )
+        self.tempos_por_horario = tempos_por_horario
+        self.nomes_normalizados = bares["Nome do Buteco"].map(normalizar_nome)
+        # ids estáveis (os do manifesto), para o routeToken da reotimização
+        self.ids = ids_bares(bares)
+        self.posicoes_ids = {id_: i for i, id_ in enumerate(self.ids)}
+        self.carregado_em = time.time()
+        self.pronto = False
+
+    def _usar_matrizes(self, distancias, tempos, precisao):
+        n = len(self.bares)
+        self.precisao = precisao
+        distancias = np.ascontiguousarray(distancias, dtype=np.float64)
+        tempos = np.ascontiguousarray(tempos, dtype=np.float64)
+        for nome, matriz in (("distancias", distancias), ("tempos", tempos)):
+            if matriz.shape != (n, n):
+                raise ValueError(
+                    f"Matriz de {nome} com forma {matriz.shape}, esperado ({n}, {n})"
+                )
+        self.erro_precisao = None
+        if precisao == "float64":
+            self.distancias = distancias
+            self.tempos = tempos
+            self.distancias_linhas = distancias.tolist()
+            self.tempos_linhas = tempos.tolist()
+        else:
+            # sem listas: o tabu usa os deltas vetorizados da matriz compacta
+            self.distancias = MatrizCompacta.compactar(
+                distancias, precisao, ESCALAS["distancias"]
+            )
+            self.tempos = MatrizCompacta.compactar(tempos, precisao, ESCALAS["tempos"])
+            self.distancias_linhas = self.tempos_linhas = None
+            self.erro_precisao = {
+                "distancias": self.distancias.erro(distancias),
+                "tempos": self.tempos.erro(tempos),
+            }
+        self.estimador = EstimadorDeslocamento.calibrar(self.indice, distancias, tempos)
+
+    def _usar_grafo(self, grafo):
+        n = len(self.bares)
+        if grafo.n != n:
+            raise ValueError(f"Grafo esparso com {grafo.n} bares, esperado {n}")
+        # float32 por aresta; os pares fora do grafo vêm do estimador
+        self.precisao = "esparso"
+        self.erro_precisao = None
+        self.estimador = EstimadorDeslocamento.calibrar_pares(
+            self.indice, n, *grafo.arestas()
+        )
+        self.distancias, self.tempos = grafo.matrizes(self.estimador)
+        self.distancias_linhas = self.tempos_linhas = None
+
+    def aquecer(self, hora_inicial=None, tempo_visita=None):
+        """Avalia uma rota curta para carregar caches e imports antes do fork."""
+        from datetime import datetime, timedelta
+
+        hora_inicial = hora_inicial or datetime(2025, 11, 25, 16, 0)
+        tempo_visita = tempo_visita or timedelta(hours=1)
+        rota = list(range(min(5, len(self.bares))))
+        avaliar_rota(
+            rota,
+            self.tempos_busca,
+            self.bares,
+            hora_inicial,
+            hora_inicial + timedelta(hours=7),
+            tempo_visita,
+        )
+        self.pronto = True
+        return self
+
+    @property
+    def tempos_busca(self):
+        """Tempos usados pelos solvers: por horário se houver, senão estáticos."""
+        if self.tempos_por_horario is not None:
+            return self.tempos_por_horario
+        if self.tempos_linhas is None:
+            return self.tempos
+        return self.tempos_linhas
+
+    def tempo_viagem(self, origem, destino, partida):
+        """Minutos de `origem` a `destino` saindo no datetime `partida`."""
+        if self.tempos_por_horario is not None:
+            return self.tempos_por_horario.tempo_em(
+                origem, destino, minuto_do_dia(partida)
+            )
+        if self.tempos_linhas is None:
+            return self.tempos.valor(origem, destino)
+        return self.tempos_linhas[origem][destino]
+
+    def distancia(self, origem, destino):
+        """Quilômetros de `origem` a `destino`."""
+        if self.distancias_linhas is None:
+            return self.distancias.valor(origem, destino)
+        return self.distancias_linhas[origem][destino]
+
+    def resumo(self):
+        if self.grafo is not None:
+            bytes_matrizes = self.grafo.nbytes
+        else:
+            bytes_matrizes = self.distancias.nbytes + self.tempos.nbytes
+        if self.tempos_por_horario is not None:
+            bytes_matrizes += self.tempos_por_horario.nbytes
+        resumo = {
+            "bares": len(self.bares),
+            "bytes_matrizes": int(bytes_matrizes),
+            "precisao": self.precisao,
+            "tempos_por_horario": self.tempos_por_horario is not None,
+            "carregado_em": self.carregado_em,
+            "pronto": self.pronto,
+        }
+        resumo["estimador_origem"] = self.estimador.resumo()
+        if self.erro_precisao is not None:
+            resumo["erro_precisao"] = self.erro_precisao
+        if self.grafo is not None:
+            resumo["grafo_esparso"] = self.grafo.resumo()
+        return resumo
+
+
+def carregar_modelo(
+    caminho_bares="data/bares.csv",
+    caminho_matrizes="data/distancias.pkl",
+    caminho_tempos_horario="data/tempos_por_horario.npy",
+    precisao="float64",
+    caminho_grafo="data/grafo_esparso.npz",
+):
+    """Lê os arquivos de dados e monta o `Modelo` (ainda não aquecido).
+
+    Os tempos por horário são opcionais: sem o arquivo, valem os estáticos.
+    `precisao` ("float64", "float32" ou "uint16") é a das matrizes em memória.
+    Se existir o grafo esparso em `caminho_grafo`, ele substitui as matrizes
+    densas (que nem são lidas).
+    """
+    bares = carregar_bares(caminho_bares)
+    grafo = distancias = tempos = None
+    if caminho_grafo and os.path.exists(caminho_grafo):
+        grafo = GrafoEsparso.carregar(caminho_grafo, bares)
+    else:
+        distancias, tempos = carregar_matrizes(caminho_matrizes, bares)
+    tempos_por_horario = None
+    if caminho_tempos_horario and os.path.exists(caminho_tempos_horario):
+        tempos_por_horario = TemposPorHorario.carregar(caminho_tempos_horario, bares)
+    return Modelo(bares, distancias, tempos, tempos_por_horario, precisao, grafo)
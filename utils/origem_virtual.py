@@ -0,0 +1,212 @@
+"""
+Partida de um ponto qualquer (ex.: o hotel) em vez de um bar.
+
+O ponto entra como um nó virtual de índice n (depois do último bar), só
+durante a requisição: o `Modelo` compartilhado não muda nem é reconstruído.
+
+ - `EstimadorDeslocamento`: tempo/distância do ponto até cada bar pela
+   distância em linha reta × um fator ajustado (mínimos quadrados) contra as
+   matrizes do próprio modelo, então não há chamada a API externa (o grafo
+   esparso, utils/grafo_esparso.py, usa o mesmo estimador para os pares
+   que não guarda);
+ - `TemposComOrigem`: os tempos do modelo mais a linha/coluna do nó virtual,
+   com a mesma interface que os solvers usam (`tempo_em`, `submatriz`,
+   `deltas_2opt` e, com tempos por horário, `tempos_em`);
+ - `ModeloComOrigem`: visão do modelo com o nó virtual, usada por
+   `servico.otimizar` e `servico.formatar_resposta`.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .matrizes_compactas import deltas_2opt_submatriz, submatriz
+    from .tempos_dependentes import deltas_2opt_por_horario, minuto_do_dia
+except Exception:
+    from matrizes_compactas import deltas_2opt_submatriz, submatriz
+    from tempos_dependentes import deltas_2opt_por_horario, minuto_do_dia
+
+NOME_ORIGEM = "Ponto de partida"
+DISTANCIA_MINIMA_KM = 0.2  # pares muito próximos distorcem o ajuste
+AMOSTRA_CALIBRACAO = 500  # bares usados no ajuste (O(amostra²) pares)
+
+
+class EstimadorDeslocamento:
+    """Minutos e km por km em linha reta, ajustados nas matrizes do modelo."""
+
+    def __init__(self, indice, n, fator_tempo, fator_distancia, erro_medio_min=None):
+        self.indice = indice
+        self.n = n
+        self.fator_tempo = fator_tempo
+        self.fator_distancia = fator_distancia
+        self.erro_medio_min = erro_medio_min
+        # posição projetada de cada bar (NaN para os sem coordenada)
+        self._pontos = np.full((n, 2), np.nan)
+        self._pontos[indice.indices] = indice.pontos
+        self._km_maximo = (
+            float(np.hypot(*np.ptp(indice.pontos, axis=0))) if len(indice) else 0.0
+        )
+
+    @classmethod
+    def calibrar(cls, indice, distancias, tempos):
+        """Ajusta `tempo ≈ fator × km_em_linha_reta` entre os bares do índice."""
+        n = len(tempos)
+        amostra = np.arange(len(indice))
+        if len(amostra) > AMOSTRA_CALIBRACAO:
+            amostra = np.random.default_rng(0).choice(
+                amostra, AMOSTRA_CALIBRACAO, replace=False
+            )
+        pos = indice.indices[amostra]
+        pontos = indice.pontos[amostra]
+        diferenca = pontos[:, None, :] - pontos[None, :, :]
+        retas = np.hypot(diferenca[..., 0], diferenca[..., 1])
+        t = np.asarray(tempos, dtype=np.float64)[np.ix_(pos, pos)]
+        d = np.asarray(distancias, dtype=np.float64)[np.ix_(pos, pos)]
+        return cls._ajustar(indice, n, retas, d, t)
+
+    @classmethod
+    def calibrar_pares(cls, indice, n, origens, destinos, distancias, tempos):
+        """Como `calibrar`, só com os pares conhecidos (arestas de um grafo esparso)."""
+        retas = cls(indice, n, 1.0, 1.0).retas(origens, destinos)
+        return cls._ajustar(
+            indice,
+            n,
+            retas,
+            np.asarray(distancias, dtype=np.float64),
+            np.asarray(tempos, dtype=np.float64),
+        )
+
+    @classmethod
+    def _ajustar(cls, indice, n, retas, d, t):
+        validos = np.isfinite(retas) & (retas > DISTANCIA_MINIMA_KM) & (t > 0) & (d > 0)
+        if not validos.any():
+            raise ValueError("Sem pares de bares para calibrar o estimador")
+        x = retas[validos]
+        fator_tempo = float(x @ t[validos] / (x @ x))
+        fator_distancia = float(x @ d[validos] / (x @ x))
+        erro = float(np.abs(fator_tempo * x - t[validos]).mean())
+        return cls(indice, n, fator_tempo, fator_distancia, erro)
+
+    def retas(self, origens, destinos):
+        """Km em linha reta entre bares (os argumentos fazem broadcast).
+
+        Um bar sem coordenada fica à maior distância entre os bares
+        (conservador); de um bar para ele mesmo, 0.
+        """
+        origens = np.asarray(origens, dtype=np.intp)
+        destinos = np.asarray(destinos, dtype=np.intp)
+        diferenca = self._pontos[origens] - self._pontos[destinos]
+        km = np.hypot(diferenca[..., 0], diferenca[..., 1])
+        km = np.where(np.isnan(km), self._km_maximo, km)
+        return np.where(origens == destinos, 0.0, km)
+
+    def estimar(self, lat, lng):
+        """(km, minutos) do ponto até cada bar, em arrays de tamanho n.
+
+        Bares sem coordenada recebem a maior estimativa (conservador).
+        """
+        reta = np.hypot(*(self.indice.pontos - self.indice.projetar(lat, lng)).T)
+        km = np.full(self.n, reta.max(initial=0.0))
+        km[self.indice.indices] = reta
+        return km * self.fator_distancia, km * self.fator_tempo
+
+    def resumo(self):
+        return {
+            "fator_tempo_min_por_km": round(self.fator_tempo, 4),
+            "fator_distancia": round(self.fator_distancia, 4),
+            "erro_medio_min": round(self.erro_medio_min, 2)
+            if self.erro_medio_min is not None
+            else None,
+        }
+
+
+class TemposComOrigem:
+    """Tempos do modelo com o nó virtual `n` (a mesma estimativa nos dois sentidos)."""
+
+    def __init__(self, base, tempos_origem):
+        self.base = base
+        self.n = len(tempos_origem)
+        self.virtual = self.n
+        # com 0 no fim para indexar com o próprio nó virtual
+        self._origem = np.append(np.asarray(tempos_origem, dtype=np.float64), 0.0)
+        self._origem_lista = self._origem.tolist()
+        self._tempo_base = getattr(base, "tempo_em", None)
+        self._por_horario = hasattr(base, "tempos_em")
+
+    def __len__(self):
+        return self.n + 1
+
+    def tempo_em(self, origem, destino, minuto):
+        if origem == self.virtual:
+            return self._origem_lista[destino]
+        if destino == self.virtual:
+            return self._origem_lista[origem]
+        if self._tempo_base is not None:
+            return self._tempo_base(origem, destino, minuto)
+        return float(self.base[origem][destino])
+
+    def tempos_em(self, origens, destinos, minutos):
+        """Versão vetorizada (só com tempos por horário na base)."""
+        origens, destinos, minutos = np.broadcast_arrays(origens, destinos, minutos)
+        virtual_o = origens == self.virtual
+        virtual_d = destinos == self.virtual
+        resultado = self.base.tempos_em(
+            np.where(virtual_o, 0, origens), np.where(virtual_d, 0, destinos), minutos
+        )
+        resultado = np.where(virtual_o, self._origem[destinos], resultado)
+        return np.where(virtual_d, self._origem[origens], resultado)
+
+    def submatriz(self, indices):
+        indices = np.asarray(indices, dtype=np.intp)
+        reais = indices != self.virtual
+        sub = np.empty((len(indices), len(indices)))
+        sub[np.ix_(reais, reais)] = submatriz(self.base, indices[reais])
+        sub[~reais, :] = self._origem[indices]
+        sub[:, ~reais] = self._origem[indices][:, None]
+        return sub
+
+    def __array__(self, dtype=None, copy=None):
+        m = self.submatriz(np.arange(self.n + 1))
+        return m if dtype is None else m.astype(dtype)
+
+    def deltas_2opt(self, rota, hora_inicial, tempo_visita):
+        if self._por_horario:
+            return deltas_2opt_por_horario(self, rota, hora_inicial, tempo_visita)
+        return deltas_2opt_submatriz(self.submatriz(rota))
+
+
+class ModeloComOrigem:
+    """O `Modelo` visto com o ponto de partida como bar virtual de índice n."""
+
+    def __init__(self, modelo, lat, lng):
+        self.modelo = modelo
+        self.virtual = len(modelo.bares)
+        self.lat, self.lng = lat, lng
+        self._km, minutos = modelo.estimador.estimar(lat, lng)
+        self.tempos = TemposComOrigem(modelo.tempos, minutos)
+        # com tempos por horário, só os trechos a partir do ponto são estáticos
+        self.tempos_por_horario = modelo.tempos_por_horario
+        self.grafo = modelo.grafo
+        self.tempos_busca = self.tempos
+        if modelo.tempos_por_horario is not None:
+            self.tempos_busca = TemposComOrigem(modelo.tempos_por_horario, minutos)
+        # colunas ausentes (nota, horários) ficam NaN: sem nota e sem penalidade
+        ponto = {
+            "Nome do Buteco": NOME_ORIGEM,
+            "Latitude": lat,
+            "Longitude": lng,
+            "Endereço": f"{lat:.6f}, {lng:.6f}",
+        }
+        self.bares = pd.concat([modelo.bares, pd.DataFrame([ponto])], ignore_index=True)
+
+    def tempo_viagem(self, origem, destino, partida):
+        if self.virtual in (origem, destino):
+            return self.tempos.tempo_em(origem, destino, minuto_do_dia(partida))
+        return self.modelo.tempo_viagem(origem, destino, partida)
+
+    def distancia(self, origem, destino):
+        if origem == self.virtual:
+            return float(self._km[destino])
+        if destino == self.virtual:
+            return float(self._km[origem])
+        return self.modelo.distancia(origem, destino)
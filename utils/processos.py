@@ -0,0 +1,116 @@
+"""
+Pool de processos para rodar otimizações fora do event loop da API ASGI.
+
+O tabu search é CPU-bound e segura o GIL, então threads não dão paralelismo;
+aqui cada otimização roda em um processo do `ProcessPoolExecutor`, que
+recebe o `Modelo` uma única vez no inicializador.
+
+ - Backpressure: há `trabalhadores + fila` vagas; sem vaga livre, `executar`
+   lança `FilaCheia` na hora (a API responde 429) em vez de enfileirar sem
+   limite.
+ - Cancelamento: cada vaga tem uma flag em memória compartilhada. Se o
+   cliente desconecta, a tarefa é cancelada se ainda estiver na fila, ou a
+   flag é ligada e o tabu search para na próxima iteração (`parar`). A vaga
+   só volta a ficar livre quando o processo termina de fato.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .decomposicao import pool_dias
+    from .servico import TRABALHADORES_DIAS, otimizar
+except Exception:
+    from decomposicao import pool_dias
+    from servico import TRABALHADORES_DIAS, otimizar
+
+_modelo = None
+_cancelados = None
+
+
+class FilaCheia(RuntimeError):
+    """Todas as vagas (em execução + fila) estão ocupadas."""
+
+
+class OtimizacaoCancelada(RuntimeError):
+    """O cliente desconectou antes do fim da otimização."""
+
+
+def _inicializar_trabalhador(modelo, cancelados):
+    global _modelo, _cancelados
+    _modelo = modelo
+    _cancelados = cancelados
+    # pool dos dias do clusterByDay, se houver: sobe junto com o processo
+    pool_dias(TRABALHADORES_DIAS)
+
+
+def _otimizar_no_trabalhador(parametros, vaga):
+    return otimizar(_modelo, parametros, parar=lambda: _cancelados[vaga] != 0)
+
+
+class PoolOtimizacao:
+    """`ProcessPoolExecutor` limitado, com rejeição e cancelamento por vaga."""
+
+    def __init__(self, modelo, trabalhadores=None, fila=None):
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self.fila = self.trabalhadores if fila is None else fila
+        self.capacidade = self.trabalhadores + self.fila
+        # spawn: os processos não herdam threads/locks do servidor (event
+        # loop, ouvinte de logs) como aconteceria com fork
+        contexto = multiprocessing.get_context("spawn")
+        self._cancelados = contexto.RawArray("b", self.capacidade)
+        self._vagas = deque(range(self.capacidade))
+        self._executor = ProcessPoolExecutor(
+            self.trabalhadores,
+            mp_context=contexto,
+            initializer=_inicializar_trabalhador,
+            initargs=(modelo, self._cancelados),
+        )
+
+    @property
+    def pendentes(self):
+        """Otimizações em execução ou na fila."""
+        return self.capacidade - len(self._vagas)
+
+    async def executar(self, parametros, desconectado=None, intervalo=0.1):
+        """Roda `otimizar` em um processo do pool e retorna o resultado.
+
+        `desconectado` é uma corrotina consultada a cada `intervalo` segundos
+        (ex.: `request.is_disconnected`); se retornar True, a otimização é
+        cancelada e `OtimizacaoCancelada` é lançada.
+        """
+        if not self._vagas:
+            raise FilaCheia(f"{self.capacidade} otimizações pendentes")
+        vaga = self._vagas.popleft()
+        self._cancelados[vaga] = 0
+
+        loop = asyncio.get_running_loop()
+        tarefa = self._executor.submit(_otimizar_no_trabalhador, parametros, vaga)
+        tarefa.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._vagas.append, vaga)
+        )
+        futuro = asyncio.wrap_future(tarefa)
+        try:
+            while True:
+                feitos, _ = await asyncio.wait({futuro}, timeout=intervalo)
+                if feitos:
+                    return futuro.result()
+                if desconectado is not None and await desconectado():
+                    self._cancelar(vaga, tarefa)
+                    raise OtimizacaoCancelada("cliente desconectou")
+        except asyncio.CancelledError:
+            self._cancelar(vaga, tarefa)
+            raise
+
+    def _cancelar(self, vaga, tarefa):
+        # na fila: sai sem rodar; em execução: o tabu search vê a flag
+        if not tarefa.cancel():
+            self._cancelados[vaga] = 1
+
+    def encerrar(self):
+        for vaga in range(self.capacidade):
+            self._cancelados[vaga] = 1
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,375 @@
+"""
+Solver exato para roteiros pequenos (Held-Karp + branch and bound).
+
+A função objetivo é a mesma de `avaliar_rota`: tempo ponderado, penalidades
+por chegar fora do horário de funcionamento e recompensa pelas notas. As
+penalidades dependem do horário de chegada, então a DP clássica sobre
+(subconjunto, último bar) deixa de ser exata. O solver combina:
+
+ - Held-Karp vetorizado em NumPy por camada de subconjuntos (bitmask), com o
+   horário acumulado em cada estado, que gera uma solução inicial muito boa;
+ - Held-Karp "de trás para frente" só com deslocamento, que dá o menor tempo
+   para completar qualquer subconjunto a partir de qualquer bar;
+ - branch and bound em largura (todos os prefixos de uma camada em arrays)
+   usando esse limite mais a menor penalidade possível dos bares restantes,
+   o que prova o ótimo.
+
+As penalidades são tabeladas por minuto (avaliar_rota trunca o horário em
+hora:minuto), então cada consulta é só um acesso ao array.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .avalia_rota import CacheHorarios, avaliar_rota
+    from .matrizes_compactas import submatriz
+except Exception:
+    from avalia_rota import CacheHorarios, avaliar_rota
+    from matrizes_compactas import submatriz
+
+TAMANHO_MAXIMO_PADRAO = 12
+LIMIAR_EXATO_PADRAO = 10  # até aqui o ótimo sai em dezenas de ms
+MAX_ESTADOS_PADRAO = 2_000_000
+PENALIDADE_ATRASO = 1000.0
+PENALIDADE_ESPERA_POR_MIN = 2.0
+
+
+def _minutos(valor):
+    return valor.total_seconds() / 60.0 if isinstance(valor, timedelta) else valor
+
+
+def _tabela_penalidades(bares, indices, hora_inicial, horizonte):
+    """Penalidade de cada bar para cada minuto absoluto em [0, horizonte).
+
+    O minuto absoluto é contado a partir da meia-noite do dia de
+    `hora_inicial`, então minuto 1500 é 01:00 do dia seguinte.
+    """
+    minutos = np.arange(horizonte)
+    dia_semana = (hora_inicial.weekday() + minutos // 1440) % 7
+    minuto_dia = minutos % 1440
+
+    tabela = np.zeros((len(indices), horizonte))
+    for linha, idx in enumerate(indices):
+        row = bares.iloc[idx]
+        abertura = np.full(7, np.nan)
+        fechamento = np.full(7, np.nan)
+        for dia, nome in enumerate(CacheHorarios.DIAS):
+            ab = CacheHorarios._parse_horario(row.get(f"{nome} (Abertura)", None))
+            fc = CacheHorarios._parse_horario(row.get(f"{nome} (Fechamento)", None))
+            if ab is not None and fc is not None:
+                abertura[dia], fechamento[dia] = _minutos(ab), _minutos(fc)
+        ab, fc = abertura[dia_semana], fechamento[dia_semana]
+        com_horario = ~np.isnan(ab)
+        cedo = com_horario & (minuto_dia < ab)
+        tarde = com_horario & ~cedo & (minuto_dia > fc)
+        tabela[linha, cedo] = (ab[cedo] - minuto_dia[cedo]) * PENALIDADE_ESPERA_POR_MIN
+        tabela[linha, tarde] = PENALIDADE_ATRASO
+    return tabela
+
+
+def _menor_penalidade_futura(tabela):
+    """Menor penalidade de cada bar a partir de cada minuto (mínimo do sufixo)."""
+    return np.minimum.accumulate(tabela[:, ::-1], axis=1)[:, ::-1]
+
+
+def _horizonte(t, base, visita):
+    """Minutos da tabela de penalidades que cobrem qualquer ordem dos bares."""
+    duracao_maxima = (len(t) - 1) * (visita + t.max())
+    return int(np.ceil(base + duracao_maxima)) + 2
+
+
+def _minuto_base(hora_inicial):
+    return (
+        hora_inicial.hour * 60
+        + hora_inicial.minute
+        + (hora_inicial.second + hora_inicial.microsecond / 1e6) / 60.0
+    )
+
+
+def penalidade_minima(rota, tempos, bares, hora_inicial, tempo_visita):
+    """Menor penalidade de horário que qualquer ordem dos bares de `rota` paga.
+
+    O primeiro bar é o início fixo. É o limite do branch and bound na raiz:
+    o k-ésimo bar visitado não chega antes da soma dos k menores tempos de
+    chegada (+ k visitas), e vale o maior entre "cada bar no horário mais cedo
+    possível" e "cada posição com o bar mais barato para ela".
+    """
+    indices = np.asarray(rota, dtype=np.intp)
+    if len(indices) < 2:
+        return 0.0
+    t = submatriz(tempos, indices)
+    visita = _minutos(tempo_visita)
+    base = _minuto_base(hora_inicial)
+    horizonte = _horizonte(t, base, visita)
+    futura = _menor_penalidade_futura(
+        _tabela_penalidades(bares, indices, hora_inicial, horizonte)
+    )[1:]
+
+    chegada_min = np.where(np.eye(len(t), dtype=bool), np.inf, t).min(axis=0)[1:]
+    cedo = base + np.cumsum(np.sort(chegada_min)) + np.arange(1, len(t)) * visita
+    minutos = np.minimum(cedo.astype(np.int64), horizonte - 1)
+    por_bar = futura[:, minutos[0]].sum()
+    por_posicao = futura[:, minutos].min(axis=0).sum()
+    return float(max(por_bar, por_posicao))
+
+
+def _held_karp_avante(t, ganho, visita, alpha, base, tabela):
+    """Held-Karp com um rótulo (menor custo) por (subconjunto, último bar).
+
+    O bar local 0 é o início fixo; `ganho[k]` é a parte do custo que não
+    depende da ordem (alpha * visita - beta * nota). Retorna a rota local.
+    """
+    m = len(t)
+    r = m - 1
+    total = 1 << r
+    custo = np.full((total, r), np.inf)
+    deslocamento = np.zeros((total, r))
+    anterior = np.full((total, r), -1, dtype=np.int64)
+
+    def penalidade(destino, decorrido):
+        return tabela[destino, np.floor(base + decorrido).astype(np.int64)]
+
+    colunas = np.arange(r)
+    unitarios = 1 << colunas
+    deslocamento[unitarios, colunas] = t[0, 1:]
+    custo[unitarios, colunas] = (
+        alpha * t[0, 1:] + ganho[1:] + penalidade(colunas + 1, t[0, 1:] + visita)
+    )
+
+    contagem = np.array([mask.bit_count() for mask in range(total)])
+    for camada in range(1, r):
+        mascaras = np.flatnonzero(contagem == camada)
+        c_atual = custo[mascaras]
+        d_atual = deslocamento[mascaras]
+        for k in range(r):
+            sem_k = (mascaras >> k) & 1 == 0
+            origem = mascaras[sem_k]
+            d = d_atual[sem_k] + t[1:, k + 1]
+            novo = (
+                c_atual[sem_k]
+                + alpha * t[1:, k + 1]
+                + ganho[k + 1]
+                + penalidade(k + 1, d + (camada + 1) * visita)
+            )
+            melhor = np.argmin(novo, axis=1)
+            linhas = np.arange(len(origem))
+            destino = origem | (1 << k)
+            custo[destino, k] = novo[linhas, melhor]
+            deslocamento[destino, k] = d[linhas, melhor]
+            anterior[destino, k] = melhor
+
+    mask = total - 1
+    ultimo = int(np.argmin(custo[mask]))
+    rota = []
+    while ultimo >= 0:
+        rota.append(ultimo + 1)
+        ultimo, mask = int(anterior[mask, ultimo]), mask & ~(1 << ultimo)
+    rota.append(0)
+    return rota[::-1]
+
+
+def _held_karp_restante(t):
+    """g[mask, j]: menor deslocamento saindo de j e visitando os bares de mask.
+
+    Os bits de `mask` são os bares locais 1..m-1; j pode ser qualquer bar.
+    """
+    m = len(t)
+    r = m - 1
+    total = 1 << r
+    g = np.full((total, m), np.inf)
+    g[0] = 0.0
+    contagem = np.array([mask.bit_count() for mask in range(total)])
+    for camada in range(1, r + 1):
+        mascaras = np.flatnonzero(contagem == camada)
+        melhor = np.full((len(mascaras), m), np.inf)
+        for k in range(r):
+            com_k = (mascaras >> k) & 1 == 1
+            resto = mascaras[com_k] ^ (1 << k)
+            candidato = t[:, k + 1] + g[resto, k + 1][:, None]
+            melhor[com_k] = np.minimum(melhor[com_k], candidato)
+        g[mascaras] = melhor
+    return g
+
+
+def _branch_and_bound(t, ganho, visita, alpha, base, tabela, rota, max_estados):
+    """Branch and bound em largura, vetorizado por camada.
+
+    Cada camada guarda todos os prefixos vivos como arrays (bares restantes,
+    último bar, custo, deslocamento); um prefixo é descartado quando o custo
+    mais o limite inferior do complemento não melhora `rota`. Se uma camada
+    passar de `max_estados`, ficam só os mais promissores e o resultado deixa
+    de ser provado. Retorna (rota, custo, provado).
+    """
+    m = len(t)
+    r = m - 1
+    g = _held_karp_restante(t)
+    horizonte = tabela.shape[1]
+    min_sufixo = _menor_penalidade_futura(tabela)
+    chegada_min = np.where(np.eye(m, dtype=bool), np.inf, t).min(axis=0)
+    bits = np.arange(r)
+
+    def custo_rota(seq):
+        c, decorrido = 0.0, 0.0
+        for pos, (a, b) in enumerate(zip(seq, seq[1:]), start=1):
+            decorrido += t[a, b]
+            c += (
+                alpha * t[a, b]
+                + ganho[b]
+                + tabela[b, int(base + decorrido + pos * visita)]
+            )
+        return c
+
+    def limite(restantes, ultimo, decorrido, visitados, bloco=20_000):
+        """Deslocamento mínimo + menor penalidade possível dos bares restantes.
+
+        A penalidade usa o maior de dois relaxamentos: cada bar no seu horário
+        mais cedo possível, ou cada posição com o bar mais barato para ela.
+        """
+        f = r - visitados
+        if f == 0:
+            return np.zeros(len(restantes))
+        resultado = np.empty(len(restantes))
+        posicoes = (visitados + 1 + np.arange(f)) * visita
+        for i in range(0, len(restantes), bloco):
+            mascaras = restantes[i : i + bloco]
+            bares = np.nonzero((mascaras[:, None] >> bits) & 1)[1].reshape(-1, f) + 1
+            cedo = np.cumsum(np.sort(chegada_min[bares], axis=1), axis=1)
+            cedo += base + decorrido[i : i + bloco, None] + posicoes
+            minutos = np.minimum(cedo.astype(np.int64), horizonte - 1)
+            por_bar = min_sufixo[bares, minutos[:, :1]].sum(axis=1)
+            por_posicao = (
+                min_sufixo[bares[:, :, None], minutos[:, None, :]]
+                .min(axis=1)
+                .sum(axis=1)
+            )
+            resultado[i : i + bloco] = (
+                alpha * g[mascaras, ultimo[i : i + bloco]]
+                + ganho[bares].sum(axis=1)
+                + np.maximum(por_bar, por_posicao)
+            )
+        return resultado
+
+    melhor_rota, melhor_custo = list(rota), custo_rota(rota)
+    provado = True
+
+    restantes = np.array([(1 << r) - 1], dtype=np.int64)
+    ultimo = np.zeros(1, dtype=np.intp)
+    custo = np.zeros(1)
+    decorrido = np.zeros(1)
+    camadas = []  # (pai, último bar) de cada camada para reconstruir a rota
+    for visitados in range(1, r + 1):
+        pai, k = np.nonzero((restantes[:, None] >> bits) & 1)
+        b = k + 1
+        d = decorrido[pai] + t[ultimo[pai], b]
+        minuto = (base + d + visitados * visita).astype(np.int64)
+        c = custo[pai] + alpha * t[ultimo[pai], b] + ganho[b] + tabela[b, minuto]
+        resto = restantes[pai] & ~(1 << k)
+
+        if visitados == r:
+            i = int(np.argmin(c)) if len(c) else -1
+            if i >= 0 and c[i] < melhor_custo - 1e-9:
+                melhor_custo = float(c[i])
+                seq = [int(b[i])]
+                j = int(pai[i])
+                for pais, ultimos in reversed(camadas):
+                    seq.append(int(ultimos[j]))
+                    j = int(pais[j])
+                melhor_rota = [0] + seq[::-1]
+            break
+
+        otimista = c + limite(resto, b, d, visitados)
+        vivos = np.flatnonzero(otimista < melhor_custo - 1e-9)
+        if len(vivos) > max_estados:
+            vivos = vivos[np.argsort(otimista[vivos])[:max_estados]]
+            provado = False
+        if len(vivos) == 0:
+            break
+        camadas.append((pai[vivos], b[vivos]))
+        restantes, ultimo = resto[vivos], b[vivos]
+        custo, decorrido = c[vivos], d[vivos]
+
+    return melhor_rota, melhor_custo, provado
+
+
+def resolver_exato(
+    rota_inicial,
+    tempos,
+    bares,
+    hora_inicial,
+    hora_final,
+    tempo_visita,
+    alpha=1.0,
+    beta=20.0,
+    tamanho_maximo=TAMANHO_MAXIMO_PADRAO,
+    max_estados=MAX_ESTADOS_PADRAO,
+    penalidade_fim=0.0,
+):
+    """Melhor ordem dos bares de `rota_inicial` para a função de `avaliar_rota`.
+
+    O primeiro bar fica fixo. Se alguma camada do branch and bound passar de
+    `max_estados` prefixos, a busca vira um beam e `comprovado=False`.
+    `penalidade_fim` vale como em `avaliar_rota` (chegada depois de
+    `hora_final`, em hora:minuto).
+
+    Returns:
+        tuple: (melhor_rota, custo, comprovado) com custo de avaliar_rota
+    """
+    n = len(rota_inicial)
+    if n > tamanho_maximo:
+        raise ValueError(
+            f"Solver exato limitado a {tamanho_maximo} bares (recebido {n})"
+        )
+    if n <= 2:
+        rota = list(rota_inicial)
+        custo = avaliar_rota(
+            rota,
+            tempos,
+            bares,
+            hora_inicial,
+            hora_final,
+            tempo_visita,
+            alpha,
+            beta,
+            penalidade_fim=penalidade_fim,
+        )
+        return rota, custo, True
+
+    indices = np.asarray(rota_inicial, dtype=np.intp)
+    t = submatriz(tempos, indices)
+    notas = np.zeros(n)
+    if "Nota" in bares.columns:
+        notas = pd.to_numeric(bares["Nota"].iloc[indices], errors="coerce")
+        notas = np.nan_to_num(notas.to_numpy(dtype=np.float64), nan=0.0)
+    visita = _minutos(tempo_visita)
+    ganho = alpha * visita - beta * notas
+
+    base = _minuto_base(hora_inicial)
+    horizonte = _horizonte(t, base, visita)
+    tabela = _tabela_penalidades(bares, indices, hora_inicial, horizonte)
+    if penalidade_fim:
+        # a tabela é pelo minuto de saída (chegada + visita)
+        meia_noite = hora_inicial.replace(hour=0, minute=0, second=0, microsecond=0)
+        fim = (hora_final - meia_noite).total_seconds() / 60.0
+        tabela[:, np.arange(horizonte) > fim + visita] += penalidade_fim
+
+    locais = _held_karp_avante(t, ganho, visita, alpha, base, tabela)
+    locais, _, comprovado = _branch_and_bound(
+        t, ganho, visita, alpha, base, tabela, locais, max_estados
+    )
+
+    rota = indices[locais].tolist()
+    custo = avaliar_rota(
+        rota,
+        tempos,
+        bares,
+        hora_inicial,
+        hora_final,
+        tempo_visita,
+        alpha,
+        beta,
+        penalidade_fim=penalidade_fim,
+    )
+    return rota, custo, comprovado
@@ -0,0 +1,178 @@
+"""
+Logs estruturados da API e do otimizador.
+
+ - níveis do `logging` padrão, com saída em JSON (uma linha por evento) ou
+   texto legível para desenvolvimento;
+ - id da requisição em um ContextVar, anexado a todo registro emitido
+   durante a requisição;
+ - amostragem dos registros abaixo de WARNING, decidida por requisição (ou
+   todos os logs de uma requisição saem, ou nenhum);
+ - escrita em uma thread separada (QueueHandler/QueueListener), para que as
+   threads de requisição não esperem pelo stdout.
+
+Configuração por variáveis de ambiente: LOG_NIVEL (INFO), LOG_FORMATO
+(json | texto) e LOG_AMOSTRAGEM (fração entre 0 e 1, padrão 1).
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import UTC, datetime
+
+ID_REQUISICAO = contextvars.ContextVar("id_requisicao", default=None)
+
+# atributos que todo LogRecord tem; o resto veio em `extra=`
+_CAMPOS_PADRAO = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+_CAMPOS_INTERNOS = {"id_requisicao"}
+
+_ouvinte = None
+_pid_ouvinte = None
+_configuracao = {}
+
+
+def novo_id_requisicao(valor=None):
+    """Define o id da requisição atual (gera um se `valor` for vazio)."""
+    valor = valor or uuid.uuid4().hex[:16]
+    ID_REQUISICAO.set(valor)
+    return valor
+
+
+@contextmanager
+def contexto_requisicao(valor=None):
+    """Bloco com id de requisição próprio (útil fora do Flask)."""
+    token = ID_REQUISICAO.set(valor or uuid.uuid4().hex[:16])
+    try:
+        yield ID_REQUISICAO.get()
+    finally:
+        ID_REQUISICAO.reset(token)
+
+
+class FiltroContexto(logging.Filter):
+    """Copia o id da requisição para o registro na thread que o emitiu."""
+
+    def filter(self, record):
+        if not hasattr(record, "id_requisicao"):
+            record.id_requisicao = ID_REQUISICAO.get()
+        return True
+
+
+class FiltroAmostragem(logging.Filter):
+    """Mantém uma fração `taxa` dos registros abaixo de WARNING.
+
+    A decisão usa o hash do id da requisição, então uma requisição amostrada
+    aparece inteira nos logs; registros fora de requisição são sorteados.
+    """
+
+    def __init__(self, taxa=1.0):
+        super().__init__()
+        self.taxa = taxa
+
+    def filter(self, record):
+        if self.taxa >= 1.0 or record.levelno >= logging.WARNING:
+            return True
+        id_requisicao = getattr(record, "id_requisicao", None)
+        if id_requisicao is None:
+            return random.random() < self.taxa
+        return zlib.crc32(id_requisicao.encode()) % 10_000 < self.taxa * 10_000
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro, com os campos passados em `extra=`."""
+
+    def format(self, record):
+        dados = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(
+                timespec="milliseconds"
+            ),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "id_requisicao", None):
+            dados["id_requisicao"] = record.id_requisicao
+        for chave, valor in vars(record).items():
+            if chave not in _CAMPOS_PADRAO and chave not in _CAMPOS_INTERNOS:
+                dados[chave] = valor
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class FormatadorTexto(logging.Formatter):
+    """Formato legível para desenvolvimento, com os extras em chave=valor."""
+
+    def __init__(self):
+        super().__init__(
+            "%(asctime)s %(levelname)-7s %(name)s [%(id_requisicao)s] %(message)s"
+        )
+
+    def format(self, record):
+        texto = super().format(record)
+        extras = [
+            f"{chave}={valor}"
+            for chave, valor in vars(record).items()
+            if chave not in _CAMPOS_PADRAO and chave not in _CAMPOS_INTERNOS
+        ]
+        return f"{texto} {' '.join(extras)}" if extras else texto
+
+
+def configurar_logs(nivel=None, formato=None, taxa_amostragem=None, fluxo=None):
+    """Configura o logger raiz (idempotente) e retorna o QueueListener.
+
+    A thread do QueueListener não sobrevive a um fork (ex.: gunicorn com
+    `preload_app`): no processo filho a configuração é refeita, com fila e
+    ouvinte novos, na primeira chamada ou logo após o fork.
+    """
+    global _ouvinte, _pid_ouvinte
+    if _ouvinte is not None and _pid_ouvinte == os.getpid():
+        return _ouvinte
+    _configuracao.update(
+        nivel=nivel, formato=formato, taxa_amostragem=taxa_amostragem, fluxo=fluxo
+    )
+
+    nivel = nivel or os.environ.get("LOG_NIVEL", "INFO")
+    formato = formato or os.environ.get("LOG_FORMATO", "json")
+    if taxa_amostragem is None:
+        taxa_amostragem = float(os.environ.get("LOG_AMOSTRAGEM", "1"))
+
+    saida = logging.StreamHandler(fluxo or sys.stdout)
+    saida.setFormatter(FormatadorJSON() if formato == "json" else FormatadorTexto())
+
+    # contexto e amostragem rodam na thread da requisição, a escrita não
+    fila = logging.handlers.QueueHandler(queue.SimpleQueue())
+    fila.addFilter(FiltroContexto())
+    fila.addFilter(FiltroAmostragem(taxa_amostragem))
+
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [fila]
+    raiz.setLevel(nivel.upper() if isinstance(nivel, str) else nivel)
+
+    primeira = _ouvinte is None
+    _ouvinte = logging.handlers.QueueListener(fila.queue, saida)
+    _pid_ouvinte = os.getpid()
+    _ouvinte.start()
+    if primeira:
+        atexit.register(_parar_ouvinte)
+        if hasattr(os, "register_at_fork"):  # só POSIX
+            os.register_at_fork(after_in_child=_reiniciar_apos_fork)
+    return _ouvinte
+
+
+def _parar_ouvinte():
+    if _ouvinte is not None and _pid_ouvinte == os.getpid():
+        _ouvinte.stop()
+
+
+def _reiniciar_apos_fork():
+    """No filho de um fork, troca o ouvinte herdado (sem thread) por um novo."""
+    if _ouvinte is not None:
+        configurar_logs(**_configuracao)
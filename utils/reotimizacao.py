@@ -0,0 +1,261 @@
+"""
+Reotimização a partir da rota anterior (edições interativas no frontend).
+
+Quando o usuário muda um parâmetro (tira um bar, estende o horário), a busca
+não precisa recomeçar do zero:
+
+ - `/api/optimize-route` devolve `routeToken`, a rota encontrada como ids
+   estáveis dos bares (os mesmos do manifesto das matrizes), assinada com
+   HMAC. Sem estado no servidor: vale em qualquer worker ou processo que use
+   a mesma chave (`CHAVE_TOKEN_ROTA`; sem ela, uma chave aleatória por
+   processo, gerada antes do fork do gunicorn);
+ - na requisição seguinte, `reparar_rota` tira da rota anterior os bares que
+   deixaram de ser candidatos e insere os novos na posição mais barata;
+ - `busca_local` melhora a rota reparada com 2-opt: os deltas de todos os
+   movimentos saem de uma vez (`deltas_2opt`, vetorizado), e os melhores são
+   confirmados pelo custo real. São poucas passadas de milissegundos, em vez
+   de materializar as O(n²) rotas vizinhas a cada iteração do tabu.
+
+O custo real vem de `CustoRota`, o mesmo cálculo de `avaliar_rota` (mesma
+aritmética de datetime, mesmo CacheHorarios) sem ler o DataFrame a cada bar:
+só os tempos e as penalidades dependem da ordem dos bares. Em 124 bares,
+~0,3 ms por rota em vez de ~25 ms.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .avalia_rota import CacheHorarios
+    from .construtivas import atalho_agm, vizinho_mais_proximo_lote
+    from .matrizes_compactas import deltas_2opt_submatriz, submatriz
+except Exception:
+    from avalia_rota import CacheHorarios
+    from construtivas import atalho_agm, vizinho_mais_proximo_lote
+    from matrizes_compactas import deltas_2opt_submatriz, submatriz
+
+VERSAO_TOKEN = 1
+TAMANHO_MAXIMO_TOKEN = 64 * 1024
+MAX_PASSADAS = 50
+CANDIDATOS_POR_PASSADA = 20  # movimentos confirmados pelo custo real por passada
+
+_CHAVE = os.environ.get("CHAVE_TOKEN_ROTA", "").encode() or os.urandom(32)
+
+
+class TokenInvalido(ValueError):
+    """Token malformado, com assinatura errada ou de outra versão."""
+
+
+def _b64(dados):
+    return base64.urlsafe_b64encode(dados).rstrip(b"=").decode()
+
+
+def _de_b64(texto):
+    return base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def _assinatura(carga, chave):
+    return hmac.new(chave, carga.encode(), hashlib.sha256).digest()[:16]
+
+
+def codificar_token(ids, chave=None):
+    """Token assinado com a sequência de ids de bares."""
+    carga = _b64(json.dumps({"v": VERSAO_TOKEN, "ids": list(ids)}).encode())
+    return f"{carga}.{_b64(_assinatura(carga, chave or _CHAVE))}"
+
+
+def decodificar_token(token, chave=None):
+    """Ids de bares do token; `TokenInvalido` se não for um token válido."""
+    if not isinstance(token, str) or len(token) > TAMANHO_MAXIMO_TOKEN:
+        raise TokenInvalido("Token ausente ou grande demais")
+    carga, _, assinatura = token.partition(".")
+    try:
+        valida = hmac.compare_digest(
+            _de_b64(assinatura), _assinatura(carga, chave or _CHAVE)
+        )
+        dados = json.loads(_de_b64(carga)) if valida else None
+    except ValueError as e:
+        raise TokenInvalido("Token malformado") from e
+    if dados is None:
+        raise TokenInvalido("Assinatura do token não confere")
+    if dados.get("v") != VERSAO_TOKEN or not isinstance(dados.get("ids"), list):
+        raise TokenInvalido("Versão do token não suportada")
+    return [str(id_) for id_ in dados["ids"]]
+
+
+def reparar_rota(anterior, candidatos, tempos):
+    """Rota com os `candidatos` (o primeiro é o início) na ordem de `anterior`.
+
+    Bares de `anterior` fora dos candidatos saem; candidatos novos entram, um
+    a um, na posição que menos aumenta o deslocamento (ou no fim).
+    """
+    inicio = candidatos[0]
+    restantes = set(candidatos[1:])
+    rota = [inicio] + [b for b in dict.fromkeys(anterior) if b in restantes]
+    novos = [b for b in candidatos[1:] if b not in set(rota)]
+    if not novos:
+        return rota
+
+    indices = np.asarray(list(dict.fromkeys(rota + novos)), dtype=np.intp)
+    posicao = {int(b): k for k, b in enumerate(indices)}
+    sub = submatriz(tempos, indices)
+    local = [posicao[b] for b in rota]
+    for bar in novos:
+        v = posicao[bar]
+        caminho = np.asarray(local)
+        # entre caminho[k] e caminho[k + 1], ou depois do último
+        custos = (
+            sub[caminho[:-1], v] + sub[v, caminho[1:]] - sub[caminho[:-1], caminho[1:]]
+        )
+        custos = np.append(custos, sub[caminho[-1], v])
+        local.insert(int(np.argmin(custos)) + 1, v)
+    return indices[local].tolist()
+
+
+class CustoRota:
+    """`avaliar_rota` com as notas lidas uma vez do DataFrame, num array."""
+
+    def __init__(self, tempos, bares, hora_inicial, tempo_visita, alpha=1.0, beta=20.0):
+        self.tempos = tempos
+        self.tempo_em = getattr(tempos, "tempo_em", None)
+        self.cache = CacheHorarios(bares).preencher()
+        self.hora_inicial = hora_inicial
+        if isinstance(tempo_visita, timedelta):
+            self.visita_min = tempo_visita.total_seconds() / 60.0
+        else:
+            self.visita_min = float(tempo_visita)
+        self.alpha = alpha
+        self.beta = beta
+        notas = np.zeros(len(bares))
+        if "Nota" in bares.columns:
+            notas = pd.to_numeric(bares["Nota"], errors="coerce").to_numpy(float)
+        self.notas = np.nan_to_num(notas, nan=0.0).tolist()
+
+    def __call__(self, rota):
+        return self.percorrer(rota)[0]
+
+    def percorrer(self, rota, estados=None, inicio=0):
+        """Custo de `rota` e o estado ao chegar em cada posição.
+
+        Com `estados` de uma rota que coincide com `rota` até a posição
+        `inicio`, o trecho anterior não é recalculado (um 2-opt `(i, j)` não
+        muda as posições até `i`).
+        """
+        if len(rota) == 0:
+            return float("inf"), []
+        if estados is None:
+            inicio = 0
+            estados = [(0.0, 0.0, 0.0, self.hora_inicial)]
+        novos = estados[: inicio + 1]
+        total_tempo, total_nota, penalidade, hora_atual = novos[-1]
+        visita = timedelta(minutes=self.visita_min)
+        for pos in range(inicio, len(rota) - 1):
+            origem, destino = rota[pos], rota[pos + 1]
+            if self.tempo_em is None:
+                t = float(self.tempos[origem][destino])
+            else:
+                minuto = (
+                    hora_atual.hour * 60 + hora_atual.minute + hora_atual.second / 60.0
+                )
+                t = self.tempo_em(origem, destino, minuto)
+            total_tempo += t
+            total_tempo += self.visita_min
+            hora_atual = hora_atual + timedelta(minutes=t) + visita
+            total_nota += self.notas[destino]
+
+            hor_ab, hor_fc = self.cache.obter(destino, hora_atual.weekday())
+            if hor_ab is not None and hor_fc is not None:
+                desde_meia_noite = timedelta(
+                    hours=hora_atual.hour, minutes=hora_atual.minute
+                )
+                if desde_meia_noite < hor_ab:
+                    penalidade += (
+                        (hor_ab - desde_meia_noite).total_seconds() / 60.0 * 2.0
+                    )
+                elif desde_meia_noite > hor_fc:
+                    penalidade += 1000.0
+            novos.append((total_tempo, total_nota, penalidade, hora_atual))
+        custo = self.alpha * total_tempo + penalidade - self.beta * total_nota
+        return float(custo), novos
+
+
+def busca_local(
+    rota, tempos, custo, max_passadas=MAX_PASSADAS, parar=None, restricoes=None
+):
+    """2-opt por melhor delta, confirmado por `custo` (um `CustoRota`).
+
+    O início fica fixo; com `restricoes`, só movimentos que as respeitam.
+
+    Returns:
+        tuple: (rota, custo, passadas)
+    """
+    deltas_2opt = getattr(tempos, "deltas_2opt", None)
+    rota = list(rota)
+    melhor, estados = custo.percorrer(rota)
+    passadas = 0
+    for passadas in range(1, max_passadas + 1):
+        if len(rota) < 4 or (parar is not None and parar()):
+            break
+        if deltas_2opt is not None:
+            deltas = deltas_2opt(rota, custo.hora_inicial, custo.visita_min)
+        else:
+            deltas = deltas_2opt_submatriz(submatriz(tempos, rota))
+        # só movimentos (i, j) com j >= i + 2, como em gerar_vizinhos_2opt
+        deltas = np.triu(np.asarray(deltas), k=2)
+        if restricoes:
+            deltas[~restricoes.movimentos_2opt(rota)] = 0.0
+        ordem = np.argsort(deltas, axis=None)[:CANDIDATOS_POR_PASSADA]
+        melhorou = False
+        for i, j in zip(*np.unravel_index(ordem, deltas.shape)):
+            if deltas[i, j] >= 0:
+                break
+            nova = rota[: i + 1] + rota[i + 1 : j + 1][::-1] + rota[j + 1 :]
+            custo_nova, estados_nova = custo.percorrer(nova, estados, i)
+            if custo_nova < melhor:
+                rota, melhor, estados, melhorou = nova, custo_nova, estados_nova, True
+                break
+        if not melhorou:
+            break
+    return rota, melhor, passadas
+
+
+def reotimizar(
+    anterior,
+    candidatos,
+    tempos,
+    bares,
+    hora_inicial,
+    tempo_visita,
+    alpha=1.0,
+    beta=20.0,
+    parar=None,
+    restricoes=None,
+):
+    """Rota dos `candidatos` a partir da `anterior`: reparo + busca local.
+
+    Se a edição tirou muitos bares, a ordem antiga pode ser pior que começar
+    do zero; por isso a rota reparada concorre com duas construtivas baratas
+    (vizinho mais próximo e atalho da AGM), como em `gerar_solucao_inicial`.
+
+    Returns:
+        tuple: (rota, custo, passadas), com o mesmo custo de `avaliar_rota`
+    """
+    custo = CustoRota(tempos, bares, hora_inicial, tempo_visita, alpha, beta)
+    reparada = reparar_rota(anterior, candidatos, tempos)
+    indices = np.asarray(candidatos, dtype=np.intp)
+    sub = submatriz(tempos, indices)
+    rotas, _ = vizinho_mais_proximo_lote(sub, [0])
+    candidatas = [reparada, indices[rotas[0]].tolist()]
+    if len(indices) > 2:
+        candidatas.append(indices[atalho_agm(sub, 0)].tolist())
+    if restricoes:
+        candidatas = [restricoes.ajustar(candidata) for candidata in candidatas]
+    rota = min(candidatas, key=custo)
+    return busca_local(rota, tempos, custo, parar=parar, restricoes=restricoes)
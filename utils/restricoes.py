@@ -0,0 +1,216 @@
+"""
+Restrições rígidas da rota: bares fixos numa posição, obrigatórios e com dia
+marcado.
+
+Todas viram uma faixa de posições permitidas por bar (`faixas[bar] = (a, z)`,
+inclusive; a posição 0 é o ponto de partida, que já é fixo):
+
+ - fixo na parada k: `(k, k)`;
+ - obrigatório: `(1, vagas - 1)`, com `vagas` o número estimado de paradas
+   que cabem no período (`capacidade_diaria` × dias); depois disso a rota
+   continua, mas `formatar_resposta` já cortou;
+ - dia marcado: as posições que caem naquele dia pela mesma estimativa.
+
+Os bares excluídos nem entram nos candidatos (`preparar_otimizacao`).
+
+Os geradores de movimento (`gerar_vizinhos_2opt`, `busca_local`) só
+produzem vizinhos que mantêm cada bar restrito dentro da sua faixa, usando a
+máscara de `movimentos_2opt`; a solução inicial passa por `ajustar`. Assim o
+tabu search nunca avalia uma rota inviável, e cada restrição encolhe a
+vizinhança.
+"""
+
+import heapq
+
+import numpy as np
+
+
+class RestricaoInvalida(ValueError):
+    """Restrições que nenhuma rota satisfaz (ex.: dois bares na mesma parada)."""
+
+
+class Restricoes:
+    """Faixa de posições permitidas para cada bar restrito."""
+
+    def __init__(self, faixas=None):
+        self.faixas = {
+            int(bar): (int(a), int(z)) for bar, (a, z) in (faixas or {}).items()
+        }
+
+    def __bool__(self):
+        return bool(self.faixas)
+
+    def __repr__(self):
+        return f"Restricoes({self.faixas!r})"
+
+    @classmethod
+    def montar(cls, n, fixos=None, obrigatorios=(), dias=None, vagas_por_dia=None):
+        """Restrições de uma rota com `n` posições.
+
+        Args:
+            fixos: {bar: posição}
+            obrigatorios: bares que precisam caber no período
+            dias: {bar: índice do dia}
+            vagas_por_dia: paradas estimadas em cada dia (a do primeiro dia
+                inclui o ponto de partida); obrigatória com `obrigatorios` ou
+                `dias`
+
+        Raises:
+            RestricaoInvalida: posições repetidas ou fora da rota, faixas
+                vazias ou mais bares restritos do que posições
+        """
+        fixos = dict(fixos or {})
+        dias = dict(dias or {})
+        faixas = {}
+        for bar, posicao in fixos.items():
+            if not 1 <= posicao < n:
+                raise RestricaoInvalida(
+                    f"Posição {posicao + 1} fora da rota (2 a {n} paradas)"
+                )
+            faixas[bar] = (posicao, posicao)
+        if len(set(fixos.values())) < len(fixos):
+            raise RestricaoInvalida("Dois bares fixos na mesma parada")
+
+        if obrigatorios or dias:
+            limites = np.cumsum(vagas_por_dia)
+            for bar in obrigatorios:
+                a, z = faixas.get(bar, (1, n - 1))
+                faixas[bar] = (a, min(z, int(limites[-1]) - 1))
+            for bar, dia in dias.items():
+                inicio = 1 if dia == 0 else int(limites[dia - 1])
+                a, z = faixas.get(bar, (1, n - 1))
+                faixas[bar] = (max(a, inicio), min(z, int(limites[dia]) - 1))
+
+        restricoes = cls({bar: (a, min(z, n - 1)) for bar, (a, z) in faixas.items()})
+        vazias = [bar for bar, (a, z) in restricoes.faixas.items() if a > z]
+        if vazias:
+            raise RestricaoInvalida(
+                f"{len(vazias)} bar(es) sem posição possível (parada fixa fora do "
+                "dia marcado ou do período)"
+            )
+        return restricoes
+
+    def viavel(self, rota):
+        """Se cada bar restrito de `rota` está dentro da sua faixa."""
+        posicoes = {bar: k for k, bar in enumerate(rota)}
+        return all(
+            bar in posicoes and a <= posicoes[bar] <= z
+            for bar, (a, z) in self.faixas.items()
+        )
+
+    def movimentos_2opt(self, rota):
+        """Máscara (n - 1, n) dos 2-opt `(i, j)` viáveis a partir de `rota`.
+
+        Mesma convenção de `gerar_vizinhos_2opt` e `deltas_2opt_submatriz`:
+        `(i, j)` inverte `rota[i + 1 : j + 1]`, e a posição `q` do trecho
+        vai para `i + 1 + j - q`.
+        """
+        n = len(rota)
+        i = np.arange(n - 1)[:, None]
+        j = np.arange(n)[None, :]
+        viaveis = j >= i + 2
+        for q, bar in enumerate(rota):
+            faixa = self.faixas.get(bar)
+            if faixa is None:
+                continue
+            a, z = faixa
+            nova = i + 1 + j - q
+            no_trecho = (i + 1 <= q) & (q <= j)
+            viaveis &= ~no_trecho | ((a <= nova) & (nova <= z))
+        return viaveis
+
+    def ajustar(self, rota):
+        """`rota` com os bares restritos movidos para dentro das faixas.
+
+        Cada bar restrito vai para a posição livre mais perto da atual dentro
+        da sua faixa (os de faixa mais curta e que terminam antes primeiro); os
+        outros bares mantêm a ordem relativa nas posições que sobram. Com
+        faixas que se cruzam essa escolha gulosa pode travar; aí as posições
+        saem de `_posicoes_edf`, que só falha sem atribuição possível.
+
+        Raises:
+            RestricaoInvalida: se não houver posição para todos os bares
+        """
+        rota = list(rota)
+        if not self.faixas:
+            return rota
+        n = len(rota)
+        posicoes = {bar: k for k, bar in enumerate(rota)}
+        presentes = [bar for bar in self.faixas if bar in posicoes]
+        escolhidas = self._posicoes_gulosas(presentes, posicoes, n)
+        if escolhidas is None:
+            escolhidas = self._posicoes_edf(presentes, posicoes, n)
+        resultado = [None] * n
+        resultado[0] = rota[0]
+        for bar, k in escolhidas.items():
+            resultado[k] = bar
+        restantes = iter(bar for bar in rota[1:] if bar not in self.faixas)
+        return [bar if bar is not None else next(restantes) for bar in resultado]
+
+    def _posicoes_gulosas(self, bares, posicoes, n):
+        """Posição livre mais perto da atual, bar a bar; None se travar."""
+        ocupadas = set()
+        escolhidas = {}
+        ordem = sorted(
+            bares,
+            key=lambda bar: (
+                self.faixas[bar][1] - self.faixas[bar][0],
+                self.faixas[bar][1],
+            ),
+        )
+        for bar in ordem:
+            a, z = self.faixas[bar]
+            livres = [k for k in range(a, min(z, n - 1) + 1) if k not in ocupadas]
+            if not livres:
+                return None
+            desejada = posicoes[bar]
+            k = min(livres, key=lambda k: (abs(k - desejada), k))
+            escolhidas[bar] = k
+            ocupadas.add(k)
+        return escolhidas
+
+    def _posicoes_edf(self, bares, posicoes, n):
+        """Posições pela varredura das paradas: em cada uma entra, dentre os
+        bares cuja faixa já começou, o de fim mais cedo (ótimo para decidir se
+        há atribuição). Depois, pares invertidos em relação à rota trocam de
+        posição quando as duas faixas permitem.
+
+        Raises:
+            RestricaoInvalida: se algum bar não couber na sua faixa
+        """
+        pendentes = sorted(bares, key=lambda bar: self.faixas[bar][0])
+        prontos = []
+        escolhidas = {}
+        proximo = 0
+        for k in range(1, n):
+            while proximo < len(pendentes) and self.faixas[pendentes[proximo]][0] <= k:
+                bar = pendentes[proximo]
+                heapq.heappush(prontos, (self.faixas[bar][1], posicoes[bar], bar))
+                proximo += 1
+            if not prontos:
+                continue
+            z, _, bar = heapq.heappop(prontos)
+            if z < k:
+                break
+            escolhidas[bar] = k
+        if len(escolhidas) < len(bares):
+            raise RestricaoInvalida(
+                "Restrições incompatíveis: não há parada livre para todos os bares"
+            )
+
+        por_posicao = sorted(escolhidas, key=escolhidas.get)
+        trocou = True
+        while trocou:
+            trocou = False
+            for i in range(len(por_posicao) - 1):
+                x, y = por_posicao[i], por_posicao[i + 1]
+                kx, ky = escolhidas[x], escolhidas[y]
+                if (
+                    posicoes[x] > posicoes[y]
+                    and self.faixas[y][0] <= kx
+                    and ky <= self.faixas[x][1]
+                ):
+                    escolhidas[x], escolhidas[y] = ky, kx
+                    por_posicao[i], por_posicao[i + 1] = y, x
+                    trocou = True
+        return escolhidas
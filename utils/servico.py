@@ -0,0 +1,1107 @@
+"""
+Lógica das rotas da API, compartilhada pela versão Flask (api.py) e pela ASGI
+(api_asgi.py).
+
+Uma otimização passa por três etapas:
+
+ - `preparar_otimizacao`: valida o JSON e monta os parâmetros (rápido, roda
+   onde a requisição é atendida);
+ - `otimizar`: limite inferior e solver exato ou tabu search (CPU-bound;
+   parâmetros e resultado são serializáveis, então pode rodar em outro
+   processo);
+ - `formatar_resposta`: horários, distâncias e agrupamento por dia.
+
+Com `routeToken` (devolvido na resposta anterior), `otimizar` parte da rota
+anterior reparada e faz só uma busca local (utils/reotimizacao.py).
+
+`mustVisit`, `avoid`, `pinned` e `fixedDay` são restrições rígidas: os bares
+evitados saem dos candidatos e as outras viram faixas de posição
+(utils/restricoes.py) que os solvers nunca violam.
+
+As métricas também ficam aqui, para as duas APIs exportarem os mesmos nomes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+try:
+    from .dados import converter_coordenada, normalizar_nome
+    from .decomposicao import (
+        capacidade_diaria,
+        janelas_diarias,
+        pool_dias,
+        resolver_por_dias,
+    )
+    from .instrumentacao import Perfil
+    from .limites import calcular_gap, custo_constante, limite_inferior_custo
+    from .matrizes_compactas import submatriz
+    from .metricas import (
+        BUCKETS_ITERACOES,
+        REGISTRO,
+        memoria_pico_bytes,
+        memoria_residente_bytes,
+    )
+    from .origem_virtual import ModeloComOrigem
+    from .programacao_dinamica import (
+        LIMIAR_EXATO_PADRAO,
+        TAMANHO_MAXIMO_PADRAO,
+        resolver_exato,
+    )
+    from .reotimizacao import (
+        TokenInvalido,
+        codificar_token,
+        decodificar_token,
+        reotimizar,
+    )
+    from .restricoes import RestricaoInvalida, Restricoes
+    from .tabu_search import tabu_search
+except Exception:
+    from dados import converter_coordenada, normalizar_nome
+    from decomposicao import (
+        capacidade_diaria,
+        janelas_diarias,
+        pool_dias,
+        resolver_por_dias,
+    )
+    from instrumentacao import Perfil
+    from limites import calcular_gap, custo_constante, limite_inferior_custo
+    from matrizes_compactas import submatriz
+    from metricas import (
+        BUCKETS_ITERACOES,
+        REGISTRO,
+        memoria_pico_bytes,
+        memoria_residente_bytes,
+    )
+    from origem_virtual import ModeloComOrigem
+    from programacao_dinamica import (
+        LIMIAR_EXATO_PADRAO,
+        TAMANHO_MAXIMO_PADRAO,
+        resolver_exato,
+    )
+    from reotimizacao import (
+        TokenInvalido,
+        codificar_token,
+        decodificar_token,
+        reotimizar,
+    )
+    from restricoes import RestricaoInvalida, Restricoes
+    from tabu_search import tabu_search
+
+logger = logging.getLogger("api")
+
+# Rotas com até esse número de bares são resolvidas de forma exata
+LIMIAR_EXATO = int(os.environ.get("LIMIAR_SOLVER_EXATO", LIMIAR_EXATO_PADRAO))
+# Processos para resolver os dias em paralelo com clusterByDay (1: em série,
+# sem disputar CPU com o pool da API ASGI)
+TRABALHADORES_DIAS = int(os.environ.get("TRABALHADORES_DIAS", "1"))
+
+CAMPOS_OBRIGATORIOS = ["startDate", "endDate", "startTime", "endTime", "startPoint"]
+
+CORES_DIAS = [
+    "#FF6B6B",  # Vermelho
+    "#4ECDC4",  # Turquesa
+    "#45B7D1",  # Azul
+    "#FFA07A",  # Salmão
+    "#98D8C8",  # Verde menta
+    "#F7DC6F",  # Amarelo
+    "#BB8FCE",  # Roxo
+    "#85C1E2",  # Azul claro
+]
+
+# Métricas expostas em /metrics (formato Prometheus)
+REQUISICOES = REGISTRO.contador(
+    "api_requisicoes_total",
+    "Requisições HTTP por rota, método e status",
+    ("rota", "metodo", "status"),
+)
+LATENCIA = REGISTRO.histograma(
+    "api_latencia_segundos", "Latência das requisições por rota", ("rota", "metodo")
+)
+EM_ANDAMENTO = REGISTRO.medidor(
+    "api_requisicoes_em_andamento", "Requisições sendo atendidas agora"
+)
+OTIMIZACOES_ATIVAS = REGISTRO.medidor(
+    "otimizador_execucoes_ativas", "Otimizações de rota em andamento"
+)
+DURACAO_OTIMIZADOR = REGISTRO.histograma(
+    "otimizador_duracao_segundos", "Tempo de execução do solver", ("solver",)
+)
+ITERACOES_OTIMIZADOR = REGISTRO.histograma(
+    "otimizador_iteracoes",
+    "Iterações do solver por otimização",
+    ("solver",),
+    buckets=BUCKETS_ITERACOES,
+)
+OTIMIZACOES_COALESCIDAS = REGISTRO.contador(
+    "otimizador_coalescidas_total",
+    "Otimizações atendidas por uma execução idêntica já em andamento",
+)
+FASES_OTIMIZADOR = REGISTRO.contador(
+    "otimizador_fase_segundos_total", "Tempo acumulado por fase do solver", ("fase",)
+)
+EVENTOS_OTIMIZADOR = REGISTRO.contador(
+    "otimizador_eventos_total",
+    "Contadores do solver (movimentos, avaliações, acertos tabu...)",
+    ("evento",),
+)
+# vêm do perfil de cada execução, então contam também o solver rodando no
+# pool de processos (api_asgi)
+CACHE_HORARIOS = {
+    "cache_horarios_acertos": REGISTRO.contador(
+        "cache_horarios_acertos_total",
+        "Consultas ao cache de horários resolvidas sem reler o DataFrame",
+    ),
+    "cache_horarios_faltas": REGISTRO.contador(
+        "cache_horarios_faltas_total",
+        "Consultas ao cache de horários que leram o DataFrame",
+    ),
+}
+REGISTRO.medidor(
+    "cache_horarios_razao_acertos",
+    "Fração das consultas ao cache de horários que foram acertos",
+    funcao=lambda: (
+        CACHE_HORARIOS["cache_horarios_acertos"].valor()
+        / max(1, sum(contador.valor() for contador in CACHE_HORARIOS.values()))
+    ),
+)
+REGISTRO.medidor(
+    "processo_memoria_residente_bytes",
+    "Memória residente do processo",
+    funcao=memoria_residente_bytes,
+)
+REGISTRO.medidor(
+    "processo_memoria_pico_bytes",
+    "Pico de memória residente do processo",
+    funcao=memoria_pico_bytes,
+)
+
+
+class ErroRequisicao(ValueError):
+    """Entrada inválida; `status` é o código HTTP da resposta."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def registrar_perfil(resumo):
+    """Acumula o perfil de uma execução do tabu search nas métricas."""
+    for fase, segundos in resumo["tempos"].items():
+        FASES_OTIMIZADOR.inc(segundos, fase=fase)
+    for evento, valor in resumo["contadores"].items():
+        if evento in CACHE_HORARIOS:
+            CACHE_HORARIOS[evento].inc(valor)
+        else:
+            EVENTOS_OTIMIZADOR.inc(valor, evento=evento)
+
+
+def registrar_execucao(resultado):
+    """Métricas de uma execução de `otimizar` (no processo que serve /metrics)."""
+    DURACAO_OTIMIZADOR.observar(resultado["duracao"], solver=resultado["solver"])
+    ITERACOES_OTIMIZADOR.observar(resultado["iteracoes"], solver=resultado["solver"])
+    if resultado["perfil"]:
+        registrar_perfil(resultado["perfil"])
+
+
+def registrar_progresso(evento):
+    """Progresso do tabu search como log de depuração (sem prints)."""
+    logger.debug("Progresso do tabu search", extra=evento)
+
+
+def listar_bares(modelo):
+    """Lista de bares para `/api/bars`."""
+    bares_list = []
+    for idx, bar in modelo.bares.iterrows():
+        bares_list.append(
+            {
+                "id": int(idx),
+                "name": bar["Nome do Buteco"],
+                "rating": float(bar["Nota"])
+                if "Nota" in bar and pd.notnull(bar["Nota"])
+                else 4.5,
+            }
+        )
+    return bares_list
+
+
+def _numero(valores, campo, padrao=None, tipo=float):
+    """Lê um número de `valores` (query string ou JSON), com erro 400 se inválido."""
+    valor = valores.get(campo)
+    if valor is None or valor == "":
+        return padrao
+    try:
+        return tipo(valor)
+    except (TypeError, ValueError):
+        raise ErroRequisicao(f"Valor inválido para {campo}: {valor!r}") from None
+
+
+def bares_proximos(modelo, parametros):
+    """Bares perto de um ponto para `/api/bars/near`.
+
+    `lat` e `lng` são obrigatórios; com `radius` (km) retorna os bares dentro
+    do raio (no máximo `k`, se informado), senão os `k` mais próximos (10).
+    Distâncias em linha reta, do mais perto ao mais longe.
+    """
+    lat = _numero(parametros, "lat")
+    lng = _numero(parametros, "lng")
+    if lat is None or lng is None:
+        raise ErroRequisicao("Parâmetros obrigatórios: lat e lng")
+    raio_km = _numero(parametros, "radius")
+    k = _numero(parametros, "k", tipo=int)
+    if (raio_km is not None and raio_km < 0) or (k is not None and k < 1):
+        raise ErroRequisicao("radius deve ser >= 0 e k >= 1")
+
+    if raio_km is not None:
+        indices, distancias = modelo.indice.raio(lat, lng, raio_km)
+        if k is not None:
+            indices, distancias = indices[:k], distancias[:k]
+    else:
+        indices, distancias = modelo.indice.vizinhos(lat, lng, k or 10)
+
+    df = modelo.bares
+    resultado = []
+    for indice, distancia in zip(indices.tolist(), distancias.tolist(), strict=True):
+        bar = df.iloc[indice]
+        bar_lat, bar_lng = modelo.indice.coordenadas(indice)
+        resultado.append(
+            {
+                "id": int(indice),
+                "name": bar["Nome do Buteco"],
+                "rating": float(bar["Nota"])
+                if "Nota" in bar and pd.notnull(bar["Nota"])
+                else 4.5,
+                "lat": bar_lat,
+                "lng": bar_lng,
+                "distanceKm": round(distancia, 3),
+            }
+        )
+    return resultado
+
+
+def _podar_candidatos(modelo, df_filtrado, bar_inicial_idx, coordenadas, raio_km, k):
+    """Restringe os candidatos aos bares perto do ponto de partida.
+
+    Usa o índice espacial: só os bares a até `raio_km` de `coordenadas` e/ou
+    os `k` mais próximos (bares sem coordenada ficam de fora).
+    """
+    permitidos = set(df_filtrado.index.tolist()) - {int(bar_inicial_idx)}
+    limite = len(permitidos) if k is None else k
+
+    if raio_km is not None:
+        indices, _ = modelo.indice.raio(*coordenadas, raio_km)
+        escolhidos = [i for i in indices.tolist() if i in permitidos][:limite]
+    else:
+        # busca mais vizinhos até juntar k que passaram nos outros filtros
+        consulta = limite + 1
+        while True:
+            indices, _ = modelo.indice.vizinhos(*coordenadas, consulta)
+            escolhidos = [i for i in indices.tolist() if i in permitidos][:limite]
+            if len(escolhidos) >= limite or consulta >= len(modelo.indice):
+                break
+            consulta *= 2
+
+    logger.debug(
+        "Filtro por distância",
+        extra={
+            "raio_km": raio_km,
+            "k": k,
+            "antes": len(permitidos),
+            "depois": len(escolhidos),
+        },
+    )
+    return df_filtrado.loc[sorted(escolhidos)]
+
+
+def coordenadas_bar(modelo, nome):
+    """Coordenadas e endereço de um bar pelo nome exato."""
+    df = modelo.bares
+    bar = df[df["Nome do Buteco"] == nome]
+
+    if len(bar) == 0:
+        raise ErroRequisicao("Bar não encontrado", 404)
+
+    bar_data = bar.iloc[0]
+    lat = converter_coordenada(bar_data.get("Latitude"), -19.9167, tipo="lat")
+    lng = converter_coordenada(bar_data.get("Longitude"), -43.9345, tipo="lng")
+    return {
+        "name": bar_data["Nome do Buteco"],
+        "lat": lat,
+        "lng": lng,
+        "address": bar_data.get(
+            "Endereço", f"{bar_data['Nome do Buteco']}, Belo Horizonte - MG"
+        ),
+    }
+
+
+def _encontrar_bar(modelo, nome_bar_inicial, descricao="Bar inicial"):
+    df = modelo.bares
+
+    # Normalizar apóstrofos e outros caracteres Unicode
+    nome_bar_inicial_normalizado = normalizar_nome(nome_bar_inicial)
+
+    # Buscar usando os nomes normalizados pré-calculados no modelo
+    nomes_normalizados = modelo.nomes_normalizados
+    mask = nomes_normalizados.str.contains(
+        nome_bar_inicial_normalizado, case=False, na=False, regex=False
+    )
+    bares_encontrados = df[mask]
+
+    if len(bares_encontrados) == 0:
+        # Busca exata com nome normalizado
+        mask_exato = nomes_normalizados == nome_bar_inicial_normalizado
+        bares_encontrados = df[mask_exato]
+
+    if len(bares_encontrados) == 0:
+        logger.warning(
+            f"{descricao} não encontrado",
+            extra={
+                "nome": nome_bar_inicial,
+                "nome_normalizado": nome_bar_inicial_normalizado,
+            },
+        )
+        raise ErroRequisicao(f'{descricao} "{nome_bar_inicial}" não encontrado', 404)
+
+    bar_inicial_idx = bares_encontrados.index[0]
+    logger.debug(
+        f"{descricao} encontrado",
+        extra={
+            "nome": df.iloc[bar_inicial_idx]["Nome do Buteco"],
+            "indice": int(bar_inicial_idx),
+            "candidatos": len(bares_encontrados),
+        },
+    )
+    return bar_inicial_idx
+
+
+def _bar_da_restricao(modelo, nome, campo):
+    """Índice do bar de uma restrição: nome exato (normalizado, sem caixa) ou,
+    sem ele, o único bar cujo nome contém `nome`.
+
+    Diferente de `_encontrar_bar`, não escolhe o primeiro de vários: uma
+    restrição rígida no bar errado passaria despercebida.
+    """
+    nomes = modelo.nomes_normalizados.str.casefold()
+    procurado = normalizar_nome(nome).casefold()
+    encontrados = modelo.bares[nomes == procurado]
+    if len(encontrados) == 0:
+        encontrados = modelo.bares[nomes.str.contains(procurado, na=False, regex=False)]
+    if len(encontrados) == 0:
+        raise ErroRequisicao(f'Bar de {campo} "{nome}" não encontrado', 404)
+    if len(encontrados) > 1:
+        opcoes = encontrados["Nome do Buteco"].tolist()
+        raise ErroRequisicao(
+            f'{campo}: "{nome}" é ambíguo ({len(opcoes)} bares: '
+            + ", ".join(opcoes[:5])
+            + (", ..." if len(opcoes) > 5 else "")
+            + "); use o nome completo"
+        )
+    return int(encontrados.index[0])
+
+
+def _lista(data, campo):
+    valor = data.get(campo) or []
+    if not isinstance(valor, list):
+        raise ErroRequisicao(f"{campo} deve ser uma lista")
+    return valor
+
+
+def _ler_restricoes(modelo, data, bar_inicial_idx, data_inicio, data_fim):
+    """Bares de `mustVisit`, `avoid`, `pinned` e `fixedDay`, já como índices.
+
+    Returns:
+        dict: excluidos (set), obrigatorios (set), fixos ({bar: posição na
+        rota}) e dias ({bar: índice do dia})
+    """
+
+    def bar(nome, campo):
+        if not isinstance(nome, str) or not nome.strip():
+            raise ErroRequisicao(f"{campo}: nome de bar inválido: {nome!r}")
+        indice = _bar_da_restricao(modelo, nome.strip(), campo)
+        if indice == bar_inicial_idx:
+            raise ErroRequisicao(f"{campo}: {nome} é o ponto de partida")
+        return indice
+
+    def item(valor, campo, chave):
+        if not isinstance(valor, dict) or "bar" not in valor or chave not in valor:
+            raise ErroRequisicao(f'{campo} deve ser uma lista de {{"bar", "{chave}"}}')
+        return bar(valor["bar"], campo), valor[chave]
+
+    excluidos = {bar(nome, "avoid") for nome in _lista(data, "avoid")}
+    obrigatorios = {bar(nome, "mustVisit") for nome in _lista(data, "mustVisit")}
+
+    fixos = {}
+    for valor in _lista(data, "pinned"):
+        indice, parada = item(valor, "pinned", "position")
+        if not isinstance(parada, int) or parada < 2:
+            raise ErroRequisicao("pinned: position deve ser um inteiro >= 2")
+        if indice in fixos:
+            raise ErroRequisicao("pinned: o mesmo bar em duas paradas")
+        fixos[indice] = parada - 1  # parada 1 é o ponto de partida
+
+    dias = {}
+    for valor in _lista(data, "fixedDay"):
+        indice, dia = item(valor, "fixedDay", "date")
+        try:
+            dia = datetime.strptime(str(dia), "%Y-%m-%d").date()
+        except ValueError:
+            raise ErroRequisicao(f"fixedDay: data inválida: {dia!r}") from None
+        if not data_inicio <= dia <= data_fim:
+            raise ErroRequisicao("fixedDay: a data deve estar dentro do período")
+        dias[indice] = (dia - data_inicio).days
+
+    conflito = excluidos & (obrigatorios | set(fixos) | set(dias))
+    if conflito:
+        raise ErroRequisicao(
+            "Bar em avoid e também em mustVisit, pinned ou fixedDay: "
+            + ", ".join(
+                modelo.bares.iloc[i]["Nome do Buteco"] for i in sorted(conflito)
+            )
+        )
+    return {
+        "excluidos": excluidos,
+        "obrigatorios": obrigatorios,
+        "fixos": fixos,
+        "dias": dias,
+    }
+
+
+def _vagas_por_dia(modelo, rota, parametros):
+    """Paradas que cabem em cada dia (estimativa conservadora de
+    `capacidade_diaria`, com o deslocamento até os 3 bares mais próximos).
+
+    A do primeiro dia conta o ponto de partida, que só ocupa uma vaga de
+    visita se for um bar.
+    """
+    janelas = janelas_diarias(
+        parametros["data_inicio"],
+        parametros["data_fim"],
+        parametros["hora_inicio"],
+        parametros["hora_fim"],
+    )
+    sub = submatriz(_modelo_da_requisicao(modelo, parametros).tempos, rota)
+    janela_min = (janelas[0][1] - janelas[0][0]).total_seconds() / 60.0
+    visita_min = parametros["tempo_visita"].total_seconds() / 60.0
+    capacidade = capacidade_diaria(
+        (sub + sub.T) / 2, janela_min, visita_min, vizinhos=3
+    )
+    vagas = [capacidade] * len(janelas)
+    if parametros["origem"] is not None:
+        vagas[0] += 1
+    return vagas
+
+
+def _faixas(modelo, rota, parametros, restricoes):
+    """Faixas de posição (`Restricoes.faixas`) como lista serializável."""
+    vagas = None
+    if restricoes["obrigatorios"] or restricoes["dias"]:
+        vagas = _vagas_por_dia(modelo, rota, parametros)
+    try:
+        montadas = Restricoes.montar(
+            len(rota),
+            restricoes["fixos"],
+            restricoes["obrigatorios"],
+            restricoes["dias"],
+            vagas,
+        )
+        montadas.ajustar(rota)
+    except RestricaoInvalida as e:
+        raise ErroRequisicao(str(e)) from None
+    return sorted([bar, a, z] for bar, (a, z) in montadas.faixas.items())
+
+
+def _conferir_vagas(modelo, rota, parametros, restricoes):
+    """Recusa mais bares restritos do que as vagas estimadas, por dia e no
+    período, como em `resolver_por_dias` (sem faixas de posição)."""
+    vagas = _vagas_por_dia(modelo, rota, parametros)
+    vagas[0] -= 1  # a posição do ponto de partida
+    por_dia = Counter(restricoes["dias"].values())
+    if any(por_dia[dia] > vagas[dia] for dia in por_dia):
+        raise ErroRequisicao(
+            "fixedDay: mais bares em um dia do que as paradas estimadas para ele"
+        )
+    if len(restricoes["obrigatorios"] | set(restricoes["dias"])) > sum(vagas):
+        raise ErroRequisicao(
+            "mustVisit e fixedDay: mais bares do que as paradas estimadas no período"
+        )
+
+
+def preparar_otimizacao(modelo, data, limiar_exato=None):
+    """Valida o JSON de `/api/optimize-route` e monta os parâmetros do solver.
+
+    Lança `ErroRequisicao` (400/404) para entradas inválidas.
+    """
+    if not data:
+        raise ErroRequisicao("Nenhum dado recebido")
+
+    # Validar dados de entrada
+    for field in CAMPOS_OBRIGATORIOS:
+        if field not in data:
+            raise ErroRequisicao(f"Campo obrigatório ausente: {field}")
+
+    # Parsear datas e horários
+    data_inicio = datetime.strptime(data["startDate"], "%Y-%m-%d").date()
+    data_fim = datetime.strptime(data["endDate"], "%Y-%m-%d").date()
+    hora_inicio = datetime.strptime(data["startTime"], "%H:%M").time()
+    hora_fim = datetime.strptime(data["endTime"], "%H:%M").time()
+
+    # Validação de datas e horários
+    hoje = datetime.now().date()
+    if data_inicio < hoje:
+        raise ErroRequisicao("A data de início deve ser maior ou igual ao dia atual.")
+    if data_fim < data_inicio:
+        raise ErroRequisicao(
+            "A data de fim deve ser igual ou posterior à data de início."
+        )
+    if data_inicio == data_fim and hora_fim <= hora_inicio:
+        raise ErroRequisicao(
+            "O horário de término deve ser posterior ao horário de início para o mesmo dia."
+        )
+
+    logger.debug(
+        "Período da otimização",
+        extra={
+            "inicio": f"{data_inicio} {hora_inicio}",
+            "fim": f"{data_fim} {hora_fim}",
+        },
+    )
+
+    # Encontrar o bar inicial, ou usar o ponto informado como nó virtual
+    # (índice n, ver utils/origem_virtual.py)
+    origem = None
+    if isinstance(data["startPoint"], dict):
+        lat = _numero(data["startPoint"], "lat")
+        lng = _numero(data["startPoint"], "lng")
+        if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ErroRequisicao("startPoint deve ser o nome de um bar ou {lat, lng}")
+        origem = {"lat": lat, "lng": lng}
+        bar_inicial_idx = len(modelo.bares)
+    else:
+        bar_inicial_idx = _encontrar_bar(modelo, str(data["startPoint"]).strip())
+
+    # Restrições rígidas (bares obrigatórios, evitados, fixos e com dia)
+    restricoes = _ler_restricoes(modelo, data, bar_inicial_idx, data_inicio, data_fim)
+    agrupar_por_dia = bool(data.get("clusterByDay")) and data_fim > data_inicio
+    if agrupar_por_dia and restricoes["fixos"]:
+        raise ErroRequisicao("pinned não é compatível com clusterByDay; use fixedDay")
+
+    # Aplicar filtros (se fornecidos)
+    df_filtrado = modelo.bares
+
+    # Filtro de nota mínima
+    if data.get("minRating"):
+        min_rating = float(data["minRating"])
+        if "Nota" in df_filtrado.columns:
+            antes = len(df_filtrado)
+            df_filtrado = df_filtrado[df_filtrado["Nota"] >= min_rating]
+            logger.debug(
+                "Filtro de nota mínima",
+                extra={
+                    "nota_minima": min_rating,
+                    "antes": antes,
+                    "depois": len(df_filtrado),
+                },
+            )
+
+    # Restringir aos bares próximos do bar inicial (índice espacial): menos
+    # candidatos deixam o solver mais rápido
+    raio_km = _numero(data, "radiusKm")
+    vizinhos = _numero(data, "nearestBars", tipo=int)
+    if (raio_km is not None and raio_km < 0) or (vizinhos is not None and vizinhos < 1):
+        raise ErroRequisicao("radiusKm deve ser >= 0 e nearestBars >= 1")
+    if raio_km is not None or vizinhos is not None:
+        if origem is not None:
+            coordenadas = (origem["lat"], origem["lng"])
+        else:
+            coordenadas = modelo.indice.coordenadas(bar_inicial_idx)
+        if coordenadas is None:
+            raise ErroRequisicao(
+                "Bar inicial sem coordenadas para filtrar por distância"
+            )
+        df_filtrado = _podar_candidatos(
+            modelo, df_filtrado, bar_inicial_idx, coordenadas, raio_km, vizinhos
+        )
+
+    # Criar rota inicial com bar inicial primeiro; os bares restritos entram
+    # mesmo fora dos filtros, e os evitados saem
+    restritos = (
+        restricoes["obrigatorios"] | set(restricoes["fixos"]) | set(restricoes["dias"])
+    )
+    indices_filtrados = sorted(
+        ({int(i) for i in df_filtrado.index} | restritos)
+        - restricoes["excluidos"]
+        - {int(bar_inicial_idx)}
+    )
+    rota_inicial = [int(bar_inicial_idx)] + indices_filtrados
+
+    gap_alvo = _numero(data, "targetGap")
+    if gap_alvo is not None and not 0.0 <= gap_alvo <= 1.0:
+        raise ErroRequisicao("targetGap deve estar entre 0 e 1")
+
+    # o solver exato é O(2^n · n²): o pedido nunca passa do máximo do servidor
+    limiar = _numero(
+        data, "exactThreshold", padrao=limiar_exato or LIMIAR_EXATO, tipo=int
+    )
+    if limiar < 0:
+        raise ErroRequisicao("exactThreshold deve ser >= 0")
+    limiar = min(limiar, TAMANHO_MAXIMO_PADRAO)
+
+    # Rota da resposta anterior: token inválido ou de outra chave volta à
+    # otimização completa em vez de falhar a requisição
+    rota_anterior = None
+    if data.get("routeToken"):
+        try:
+            ids = decodificar_token(data["routeToken"])
+            rota_anterior = [
+                modelo.posicoes_ids[id_] for id_ in ids if id_ in modelo.posicoes_ids
+            ]
+        except TokenInvalido as e:
+            logger.warning("routeToken ignorado", extra={"motivo": str(e)})
+
+    parametros = {
+        "rota_inicial": rota_inicial,
+        "origem": origem,
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "hora_inicio": hora_inicio,
+        "hora_fim": hora_fim,
+        "hora_inicio_geral": datetime.combine(data_inicio, hora_inicio),
+        "hora_fim_geral": datetime.combine(data_fim, hora_fim),
+        "tempo_visita": timedelta(hours=1),
+        "alpha": 1.0,
+        "beta": 25.0,
+        "gap_alvo": gap_alvo,
+        "limiar_exato": limiar,
+        # um grupo de bares por dia (utils/decomposicao.py)
+        "agrupar_por_dia": agrupar_por_dia,
+        "rota_anterior": rota_anterior,
+        "restricoes": None,
+    }
+    if restritos:
+        # decomposição: dia e obrigatoriedade valem por grupo; sequência única:
+        # faixas de posição para os geradores de movimento
+        if agrupar_por_dia:
+            _conferir_vagas(modelo, rota_inicial, parametros, restricoes)
+        parametros["restricoes"] = {
+            "obrigatorios": sorted(restricoes["obrigatorios"]),
+            "dias": sorted([bar, dia] for bar, dia in restricoes["dias"].items()),
+            "faixas": []
+            if agrupar_por_dia
+            else _faixas(modelo, rota_inicial, parametros, restricoes),
+        }
+    return parametros
+
+
+def chave_otimizacao(parametros):
+    """Chave canônica dos parâmetros, para coalescer requisições idênticas.
+
+    Usa os parâmetros já normalizados (bar inicial resolvido, filtros
+    aplicados), então nomes escritos de formas diferentes que levam à mesma
+    rota compartilham a execução.
+    """
+    canonico = json.dumps(parametros, sort_keys=True, default=str)
+    return hashlib.sha256(canonico.encode()).hexdigest()
+
+
+def _modelo_da_requisicao(modelo, parametros):
+    """O modelo, ou a visão com o ponto de partida virtual se houver `origem`."""
+    origem = parametros.get("origem")
+    if origem is None:
+        return modelo
+    return ModeloComOrigem(modelo, origem["lat"], origem["lng"])
+
+
+def otimizar(modelo, parametros, callback_progresso=None, parar=None):
+    """Roda o solver para os parâmetros de `preparar_otimizacao`.
+
+    Retorna um dict serializável com rota, custo, solver, duração, iterações
+    e o resumo do perfil (as métricas ficam para `registrar_execucao`).
+    """
+    modelo = _modelo_da_requisicao(modelo, parametros)
+    rota_inicial = parametros["rota_inicial"]
+    tempo_visita = parametros["tempo_visita"]
+    alpha, beta = parametros["alpha"], parametros["beta"]
+
+    if parametros.get("agrupar_por_dia"):
+        return _otimizar_por_dias(modelo, parametros, parar)
+    restricoes = _restricoes(parametros)
+    if parametros.get("rota_anterior") and (
+        restricoes or len(rota_inicial) > parametros["limiar_exato"]
+    ):
+        return _reotimizar(modelo, parametros, restricoes, parar)
+
+    # Limite inferior (Held-Karp) para medir a qualidade da rota
+    limite_inferior = None
+    try:
+        limite_inferior = limite_inferior_custo(
+            rota_inicial,
+            modelo.tempos,
+            modelo.bares,
+            tempo_visita,
+            alpha,
+            beta,
+            hora_inicial=parametros["hora_inicio_geral"],
+            max_iter=50,
+        )
+    except Exception:
+        logger.warning("Não foi possível calcular o limite inferior", exc_info=True)
+
+    # tempos por horário: o limite acima usa o menor tempo entre os horários
+    # e continua válido, mas o ótimo do solver exato deixa de ser comprovado;
+    # o mesmo com o grafo esparso, em que parte dos pares é estimada
+    tempos = modelo.tempos_busca
+    aproximado = modelo.tempos_por_horario is not None or modelo.grafo is not None
+
+    # o solver exato não conhece as restrições: com elas, sempre tabu search
+    comprovado = False
+    perfil = None
+    exato = len(rota_inicial) <= parametros["limiar_exato"] and not restricoes
+    solver = "exato" if exato else "tabu_search"
+    inicio_solver = time.perf_counter()
+    if solver == "exato":
+        # Poucos bares: Held-Karp + branch and bound dá o ótimo em ms
+        melhor_rota, custo, comprovado = resolver_exato(
+            rota_inicial,
+            tempos,
+            modelo.bares,
+            parametros["hora_inicio_geral"],
+            parametros["hora_fim_geral"],
+            tempo_visita,
+            alpha=alpha,
+            beta=beta,
+        )
+        comprovado = comprovado and not aproximado
+        historico = {"iteracao": []}
+    else:
+        # Executar otimização com parâmetros da configuração rápida otimizada
+        perfil = Perfil()
+        melhor_rota, custo, historico = tabu_search(
+            rota_inicial,
+            tempos,
+            modelo.bares,
+            parametros["hora_inicio_geral"],
+            parametros["hora_fim_geral"],
+            tempo_visita,
+            alpha=alpha,
+            beta=beta,
+            tabu_tam=10,
+            max_iter=100,
+            max_iter_sem_melhoria=30,
+            usar_solucao_inicial_inteligente=True,
+            verbose=False,
+            limite_inferior=limite_inferior,
+            gap_alvo=parametros["gap_alvo"],
+            perfil=perfil,
+            callback_progresso=callback_progresso,
+            parar=parar,
+            restricoes=restricoes,
+        )
+
+    return {
+        "rota": [int(i) for i in melhor_rota],
+        "custo": float(custo),
+        "comprovado": comprovado,
+        "solver": solver,
+        "iteracoes": len(historico.get("iteracao", [])),
+        "duracao": time.perf_counter() - inicio_solver,
+        "limite_inferior": limite_inferior,
+        "perfil": historico.get("perfil") if perfil is not None else None,
+    }
+
+
+def _otimizar_por_dias(modelo, parametros, parar=None):
+    """`otimizar` com um grupo de bares por dia; o resultado traz `dias`.
+
+    Sem limite inferior: o custo é a soma dos dias, não comparável ao de uma
+    sequência única.
+    """
+    inicio_solver = time.perf_counter()
+    restricoes = parametros.get("restricoes") or {"dias": [], "obrigatorios": []}
+    janelas = janelas_diarias(
+        parametros["data_inicio"],
+        parametros["data_fim"],
+        parametros["hora_inicio"],
+        parametros["hora_fim"],
+    )
+    try:
+        decomposicao = resolver_por_dias(
+            parametros["rota_inicial"],
+            modelo.tempos_busca,
+            modelo.bares,
+            janelas,
+            parametros["tempo_visita"],
+            alpha=parametros["alpha"],
+            beta=parametros["beta"],
+            ancora_sem_visita=parametros.get("origem") is not None,
+            limiar_exato=parametros["limiar_exato"],
+            executor=pool_dias(TRABALHADORES_DIAS),
+            parar=parar,
+            dias_fixos=dict(restricoes["dias"]),
+            obrigatorios=restricoes["obrigatorios"],
+        )
+    except RestricaoInvalida as e:
+        raise ErroRequisicao(str(e)) from None
+    logger.debug(
+        "Decomposição por dia",
+        extra={
+            "dias": [len(dia) for dia in decomposicao["dias"]],
+            "movimentos": decomposicao["movimentos"],
+            "fora": len(decomposicao["fora"]),
+        },
+    )
+    return {
+        "rota": [int(i) for dia in decomposicao["dias"] for i in dia],
+        "dias": decomposicao["dias"],
+        "custo": decomposicao["custo"],
+        "comprovado": False,
+        "solver": "decomposicao",
+        "iteracoes": decomposicao["iteracoes"],
+        "duracao": time.perf_counter() - inicio_solver,
+        "limite_inferior": None,
+        "perfil": None,
+    }
+
+
+def _restricoes(parametros):
+    """`Restricoes` da sequência única a partir das faixas de `parametros`."""
+    restricoes = parametros.get("restricoes")
+    if not restricoes or not restricoes["faixas"]:
+        return None
+    return Restricoes({bar: (a, z) for bar, a, z in restricoes["faixas"]})
+
+
+def _reotimizar(modelo, parametros, restricoes=None, parar=None):
+    """`otimizar` a partir da rota do `routeToken`: reparo + busca local.
+
+    Sem limite inferior (o Held-Karp sozinho custa mais que a busca) e sem
+    tabu: a rota anterior já é boa, e uma edição pequena pede ms, não segundos.
+    """
+    inicio_solver = time.perf_counter()
+    melhor_rota, custo, passadas = reotimizar(
+        parametros["rota_anterior"],
+        parametros["rota_inicial"],
+        modelo.tempos_busca,
+        modelo.bares,
+        parametros["hora_inicio_geral"],
+        parametros["tempo_visita"],
+        alpha=parametros["alpha"],
+        beta=parametros["beta"],
+        parar=parar,
+        restricoes=restricoes,
+    )
+    return {
+        "rota": [int(i) for i in melhor_rota],
+        "custo": float(custo),
+        "comprovado": False,
+        "solver": "reotimizacao",
+        "iteracoes": passadas,
+        "duracao": time.perf_counter() - inicio_solver,
+        "limite_inferior": None,
+        "perfil": None,
+    }
+
+
+def formatar_resposta(modelo, parametros, resultado):
+    """Monta o JSON de resposta de `/api/optimize-route` a partir do resultado."""
+    # o token usa os ids do modelo base; o nó virtual (índice n) fica de fora
+    token_rota = codificar_token(
+        [modelo.ids[i] for i in resultado["rota"] if i < len(modelo.ids)]
+    )
+    modelo = _modelo_da_requisicao(modelo, parametros)
+    df = modelo.bares
+    melhor_rota = resultado["rota"]
+    custo = resultado["custo"]
+    tempo_visita = parametros["tempo_visita"]
+    # (início, fim) de cada dia; com endTime <= startTime o fim é na
+    # madrugada seguinte, e a parada fica no dia em que a janela começou
+    janelas = janelas_diarias(
+        parametros["data_inicio"],
+        parametros["data_fim"],
+        parametros["hora_inicio"],
+        parametros["hora_fim"],
+    )
+
+    # Formatar resultado para o frontend
+    bars_result = []
+    visitados = {}  # bar: índice do dia em que foi visitado
+    hora_atual = parametros["hora_inicio_geral"]
+    janela = 0
+    total_duration = 0
+    total_distance_km = 0.0
+
+    # decomposição por dia: cada dia começa no seu horário de início, e o
+    # que não couber na janela fica de fora em vez de passar para o seguinte
+    inicios_dia = {}
+    posicao = 0
+    for k, dia in enumerate(resultado.get("dias") or []):
+        inicios_dia[posicao] = k
+        posicao += len(dia)
+    pular_dia = False
+
+    for i in range(len(melhor_rota)):
+        bar_idx = melhor_rota[i]
+        bar = df.iloc[bar_idx]
+
+        if i in inicios_dia:
+            janela = inicios_dia[i]
+            pular_dia = janela >= len(janelas)
+            if not pular_dia:
+                hora_atual = janelas[janela][0]
+        if pular_dia:
+            continue
+
+        # Chegou depois do fim da janela: na decomposição o resto do dia fica
+        # de fora; na sequência única o bar passa para o próximo dia, e a rota
+        # termina no fim do período
+        if hora_atual > janelas[janela][1]:
+            if inicios_dia:
+                pular_dia = True
+                continue
+            while janela + 1 < len(janelas) and hora_atual > janelas[janela][1]:
+                janela += 1
+            if hora_atual > janelas[janela][1]:
+                break
+        inicio_janela = janelas[janela][0]
+        if hora_atual < inicio_janela:
+            hora_atual = inicio_janela
+
+        # o ponto de partida informado por coordenadas não tem visita
+        visita = tempo_visita
+        if i == 0 and parametros.get("origem") is not None:
+            visita = timedelta(0)
+        hora_saida = hora_atual + visita
+
+        # Calcular tempo até próximo bar (no horário de saída); o último bar
+        # de um dia da decomposição não tem trecho seguinte
+        ultimo_do_dia = i == len(melhor_rota) - 1 or i + 1 in inicios_dia
+        tempo_viagem_minutos = 0
+        if not ultimo_do_dia:
+            prox = melhor_rota[i + 1]
+            tempo_viagem_minutos = modelo.tempo_viagem(bar_idx, prox, hora_saida)
+
+        lat = converter_coordenada(bar.get("Latitude"), -19.9167, tipo="lat")
+        lng = converter_coordenada(bar.get("Longitude"), -43.9345, tipo="lng")
+
+        visitados[bar_idx] = janela
+        bars_result.append(
+            {
+                "id": i + 1,
+                "name": bar["Nome do Buteco"],
+                "address": bar.get(
+                    "Endereço", f"{bar['Nome do Buteco']}, Belo Horizonte - MG"
+                ),
+                "rating": float(bar["Nota"])
+                if "Nota" in bar and pd.notnull(bar["Nota"])
+                else 4.5,
+                "lat": lat,
+                "lng": lng,
+                "arrivalTime": hora_atual.strftime("%H:%M"),
+                "departureTime": hora_saida.strftime("%H:%M"),
+                "day": inicio_janela.strftime("%Y-%m-%d"),
+                "travelTimeToNext": tempo_viagem_minutos,
+            }
+        )
+
+        if not ultimo_do_dia:
+            tempo_viagem = timedelta(minutes=tempo_viagem_minutos)
+            hora_atual += visita + tempo_viagem
+            total_duration += (
+                visita.total_seconds() / 60 + tempo_viagem_minutos
+            )  # visita + tempo de viagem
+            # Somar distância entre pontos a partir da matriz de distâncias carregada
+            try:
+                distancia_km = float(modelo.distancia(bar_idx, prox))
+                total_distance_km += distancia_km
+            except Exception:
+                # Em caso de problema com índice/matriz, ignorar e continuar
+                pass
+
+    # Organizar bares por dia
+    dias_dict = {}
+    for bar in bars_result:
+        dias_dict.setdefault(bar["day"], []).append(bar)
+
+    # Converter para lista de dias com cores
+    dias_visitacao = []
+    for idx, (dia, bares) in enumerate(sorted(dias_dict.items())):
+        dia_obj = datetime.strptime(dia, "%Y-%m-%d").date()
+        dias_visitacao.append(
+            {
+                "date": dia,
+                "displayDate": dia_obj.strftime("%d/%m/%Y"),
+                "dayNumber": idx + 1,
+                "color": CORES_DIAS[idx % len(CORES_DIAS)],
+                "bars": bares,
+            }
+        )
+
+    # Preparar estatísticas
+    stats = {
+        "totalDistance": f"{total_distance_km:.2f} km",
+        "totalDuration": f"{total_duration} min",
+        "numberOfStops": len(bars_result),
+        "numberOfDays": len(dias_visitacao),
+        "cost": round(custo, 2),
+        "provenOptimal": resultado["comprovado"],
+    }
+    # gap sobre deslocamento + penalidades: visitas e notas não dependem da
+    # ordem e, com as notas negativas, deixariam o custo perto de zero
+    constante = custo_constante(
+        parametros["rota_inicial"],
+        df,
+        tempo_visita,
+        parametros["alpha"],
+        parametros["beta"],
+    )
+    gap = calcular_gap(custo, resultado["limite_inferior"], constante)
+    if resultado["comprovado"]:
+        gap = 0.0
+    if gap is not None:
+        stats["gap"] = round(gap, 4)
+
+    # as vagas por dia são estimadas: avisa se um bar restrito não coube ou
+    # se um bar com dia marcado saiu em outra data
+    restricoes = parametros.get("restricoes") or {}
+    dias_marcados = dict(restricoes.get("dias", []))
+    restritos = set(restricoes.get("obrigatorios", [])) | {
+        bar for bar, _, _ in restricoes.get("faixas", [])
+    }
+    restritos |= set(dias_marcados)
+    fora = sorted(
+        bar
+        for bar in restritos
+        if bar not in visitados
+        or dias_marcados.get(bar, visitados[bar]) != visitados[bar]
+    )
+    if fora:
+        stats["unvisitedRequired"] = [df.iloc[i]["Nome do Buteco"] for i in fora]
+        logger.warning("Bares restritos fora do roteiro", extra={"bares": fora})
+
+    logger.info(
+        "Rota otimizada",
+        extra={
+            "solver": resultado["solver"],
+            "candidatos": len(parametros["rota_inicial"]),
+            "custo": round(custo, 2),
+            "comprovado": resultado["comprovado"],
+            "iteracoes": resultado["iteracoes"],
+            "duracao_solver_s": round(resultado["duracao"], 4),
+            "paradas": len(bars_result),
+            "dias": len(dias_visitacao),
+            "duracao_min": round(total_duration, 1),
+            "distancia_km": round(total_distance_km, 2),
+        },
+    )
+    return {
+        "bars": bars_result,  # Lista flat para compatibilidade
+        "days": dias_visitacao,  # Lista organizada por dias
+        "stats": stats,
+        "routeToken": token_rota,
+        "success": True,
+    }
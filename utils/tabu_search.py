@@ -1,41 +1,110 @@
-import random
+import time
 from copy import deepcopy
 
+import numpy as np
+
 try:
     # prefer local package import
-    from .avalia_rota import avaliar_rota
+    from .avalia_rota import CacheHorarios, avaliar_rota, avaliar_rotas
+    from .christofides import christofides_caminho
+    from .construtivas import (
+        atalho_agm,
+        insercao_mais_barata,
+        melhor_vizinho_mais_proximo,
+        vizinho_mais_proximo_lote,
+    )
+    from .instrumentacao import PERFIL_DESATIVADO
+    from .limites import calcular_gap, custo_constante
+    from .matrizes_compactas import submatriz
 except Exception:
-    from avalia_rota import avaliar_rota
+    from avalia_rota import CacheHorarios, avaliar_rota, avaliar_rotas
+    from christofides import christofides_caminho
+    from construtivas import (
+        atalho_agm,
+        insercao_mais_barata,
+        melhor_vizinho_mais_proximo,
+        vizinho_mais_proximo_lote,
+    )
+    from instrumentacao import PERFIL_DESATIVADO
+    from limites import calcular_gap, custo_constante
+    from matrizes_compactas import submatriz
 
 
 def construir_solucao_vizinho_mais_proximo(distancias, inicio=0):
-    n = len(distancias)
-    nao_visitados = set(range(n))
-    rota = [inicio]
-    nao_visitados.remove(inicio)
+    rotas, _ = vizinho_mais_proximo_lote(distancias, [inicio])
+    return rotas[0].tolist()
 
-    atual = inicio
-    while nao_visitados:
-        menor_dist = float("inf")
-        proximo = None
-        for v in nao_visitados:
-            dist = distancias[atual][v]
-            if dist < menor_dist:
-                menor_dist = dist
-                proximo = v
 
-        rota.append(proximo)
-        nao_visitados.remove(proximo)
-        atual = proximo
-
-    return rota
+def gerar_solucao_inicial(
+    rota_inicial,
+    tempos,
+    bares,
+    hora_inicial,
+    hora_final,
+    tempo_visita,
+    alpha=1.0,
+    beta=20.0,
+    restricoes=None,
+    cache=None,
+    penalidade_fim=0.0,
+):
+    """Gera candidatas construtivas ancoradas no bar inicial e retorna a melhor.
+
+    As heurísticas rodam sobre a submatriz de `tempos` restrita aos bares de
+    `rota_inicial` (respeitando filtros já aplicados), sempre começando por
+    `rota_inicial[0]`. A própria `rota_inicial` também concorre. As candidatas
+    são pontuadas em lote com `avaliar_rotas`.
+
+    Com `restricoes` (utils/restricoes.Restricoes), cada candidata é ajustada
+    para respeitá-las antes de ser pontuada.
+
+    Returns:
+        tuple: (melhor_rota, custo, nome_da_heuristica)
+    """
+    bares_rota = np.asarray(rota_inicial, dtype=np.intp)
+    sub = submatriz(tempos, bares_rota)
+
+    construtores = {
+        "vizinho_mais_proximo": lambda: melhor_vizinho_mais_proximo(sub, 0),
+        "atalho_agm": lambda: atalho_agm(sub, 0),
+        "christofides": lambda: christofides_caminho(sub, 0)[0],
+        "insercao_mais_barata": lambda: insercao_mais_barata(sub, 0),
+    }
+
+    nomes = ["rota_inicial"]
+    candidatas = [list(rota_inicial)]
+    if len(bares_rota) > 2:
+        for nome, construir in construtores.items():
+            nomes.append(nome)
+            candidatas.append(bares_rota[construir()].tolist())
+    if restricoes:
+        candidatas = [restricoes.ajustar(candidata) for candidata in candidatas]
+
+    custos = avaliar_rotas(
+        candidatas,
+        tempos,
+        bares,
+        hora_inicial,
+        hora_final,
+        tempo_visita,
+        alpha,
+        beta,
+        cache=cache,
+        penalidade_fim=penalidade_fim,
+    )
+    melhor = int(np.argmin(custos))
+    return candidatas[melhor], float(custos[melhor]), nomes[melhor]
 
 
-def gerar_vizinhos_2opt(rota):
+def gerar_vizinhos_2opt(rota, restricoes=None):
+    """Vizinhos 2-opt `(nova_rota, i, j)`; com `restricoes`, só os viáveis."""
     vizinhos = []
     n = len(rota)
+    viaveis = restricoes.movimentos_2opt(rota).tolist() if restricoes else None
     for i in range(n - 1):
         for j in range(i + 2, n):
+            if viaveis is not None and not viaveis[i][j]:
+                continue
             nova_rota = rota[: i + 1] + rota[i + 1 : j + 1][::-1] + rota[j + 1 :]
             vizinhos.append((nova_rota, i, j))
     return vizinhos
@@ -58,6 +127,36 @@ def avaliar_movimento_parcial(rota, i, j, distancias):
     return custo_adicionado - custo_removido
 
 
+def _melhoria(custo_inicial, custo):
+    """Melhoria percentual em relação ao custo inicial."""
+    return (custo_inicial - custo) / custo_inicial * 100 if custo_inicial else 0.0
+
+
+def imprimir_progresso(evento):
+    """Callback de progresso padrão para uso interativo (verbose=True)."""
+    tipo = evento["evento"]
+    if tipo == "solucao_inicial":
+        origem = f" ({evento['origem']})" if evento.get("origem") else ""
+        print(f"Solução inicial{origem}: {evento['custo']:.2f}")
+    elif tipo == "nova_melhor":
+        print(
+            f"Iteração {evento['iteracao']}: Nova melhor = {evento['custo']:.2f} (melhoria {evento['melhoria']:.1f}%)"
+        )
+    elif tipo == "parada":
+        motivos = {
+            "sem_vizinhos": "Sem vizinhos válidos",
+            "interrompida": "Busca interrompida",
+            "sem_melhoria": f"Sem melhoria por {evento.get('limite')} iterações",
+            "gap_alvo": f"Gap {evento.get('gap', 0):.2%} abaixo do alvo {evento.get('limite', 0):.2%}",
+        }
+        print(f"Iteração {evento['iteracao']}: {motivos[evento['motivo']]}. Parando.")
+    elif tipo == "fim":
+        print("\n✅ Tabu Search concluído!")
+        print(f"   Distância inicial: {evento['custo_inicial']:.2f}")
+        print(f"   Distância final: {evento['custo_final']:.2f}")
+        print(f"   Melhoria: {evento['melhoria']:.1f}%")
+
+
 def tabu_search(
     rota_inicial,
     tempos,
@@ -72,18 +171,69 @@ def tabu_search(
     max_iter_sem_melhoria=30,
     usar_solucao_inicial_inteligente=True,
     verbose=True,
+    limite_inferior=None,
+    gap_alvo=None,
+    perfil=None,
+    callback_progresso=None,
+    parar=None,
+    restricoes=None,
+    penalidade_fim=0.0,
 ):
-    """Melhorada: 2-opt correto, lista tabu de movimentos, solução inicial NN, avaliação incremental."""
+    """Melhorada: 2-opt correto, lista tabu de movimentos, solução inicial construtiva, avaliação incremental.
+
+    Com `limite_inferior` (ver utils/limites.py) e `gap_alvo`, a busca para
+    assim que o gap da melhor solução (sobre a parte do custo que depende da
+    ordem, `calcular_gap`) fica abaixo do alvo.
+
+    `historico["tempo"]` guarda os segundos decorridos desde o início (incluindo
+    a solução inicial) em cada iteração, para curvas de tempo-até-alvo, e
+    `historico["distancia_melhor"]` o melhor custo real (confirmado com
+    `avaliar_rota`) ao fim dela; `distancia_atual` é a estimativa pelo delta.
+
+    Os vizinhos são comparados pelo delta de deslocamento; um candidato a nova
+    melhor solução é confirmado com `avaliar_rota` completo, então o custo
+    retornado é sempre o custo real.
+
+    Com `perfil` (utils/instrumentacao.Perfil) a execução registra tempo por
+    fase e contadores, que vão para `historico["perfil"]`.
+
+    O progresso (solução inicial, novas melhores, parada e fim) é entregue
+    como dict a `callback_progresso`; sem callback, `verbose=True` imprime.
+
+    `parar` é consultado no início de cada iteração; se retornar True a busca
+    termina com a melhor solução encontrada até ali (ex.: cliente desconectou).
+
+    Com tempos por horário (utils/tempos_dependentes.TemposPorHorario), os
+    deltas de cada iteração vêm de `tempos.deltas_2opt`, com as horas de
+    saída da rota atual.
+
+    Com `restricoes` (utils/restricoes.Restricoes: bares fixos, obrigatórios
+    ou com dia marcado), a solução inicial é ajustada para respeitá-las e a
+    vizinhança só gera movimentos viáveis; os descartados são contados em
+    `movimentos_podados`.
+
+    `penalidade_fim` é repassada a `avaliar_rota` (chegadas depois de
+    `hora_final`).
+
+    Um único CacheHorarios serve a execução inteira; seus acertos e faltas
+    vão para o perfil (`cache_horarios_acertos` / `cache_horarios_faltas`).
+    """
+    inicio = time.perf_counter()
+    cache = CacheHorarios(bares)
+    constante = 0.0
+    if gap_alvo is not None:
+        constante = custo_constante(rota_inicial, bares, tempo_visita, alpha, beta)
+    if perfil is None:
+        perfil = PERFIL_DESATIVADO
+    progresso = callback_progresso
+    if progresso is None and verbose:
+        progresso = imprimir_progresso
 
     # Se solicitado, construir solução inicial inteligente
-    if usar_solucao_inicial_inteligente:
-        melhor_inicial = None
-        melhor_dist_inicial = float("inf")
-        pontos = random.sample(range(len(bares)), min(3, len(bares)))
-        for inicio in pontos:
-            rota_teste = construir_solucao_vizinho_mais_proximo(tempos, inicio)
-            dist_teste = avaliar_rota(
-                rota_teste,
+    with perfil.fase("solucao_inicial"):
+        if usar_solucao_inicial_inteligente:
+            melhor_inicial, melhor_dist_inicial, origem = gerar_solucao_inicial(
+                rota_inicial,
                 tempos,
                 bares,
                 hora_inicial,
@@ -91,16 +241,19 @@ def tabu_search(
                 tempo_visita,
                 alpha,
                 beta,
+                restricoes,
+                cache,
+                penalidade_fim,
+            )
+            atual = deepcopy(melhor_inicial)
+        else:
+            atual = (
+                restricoes.ajustar(rota_inicial)
+                if restricoes
+                else deepcopy(rota_inicial)
             )
-            if dist_teste < melhor_dist_inicial:
-                melhor_inicial = rota_teste
-                melhor_dist_inicial = dist_teste
-
-        # Fallback: se nenhuma rota NN foi válida, usar rota_inicial
-        if melhor_inicial is None:
-            melhor_inicial = rota_inicial
             melhor_dist_inicial = avaliar_rota(
-                melhor_inicial,
+                atual,
                 tempos,
                 bares,
                 hora_inicial,
@@ -108,103 +261,180 @@ def tabu_search(
                 tempo_visita,
                 alpha,
                 beta,
+                cache=cache,
+                penalidade_fim=penalidade_fim,
             )
-            if verbose:
-                print(
-                    f"Solução inicial (fallback para rota_inicial): {melhor_dist_inicial:.2f}"
-                )
-        else:
-            if verbose:
-                print(f"Solução inicial (NN): {melhor_dist_inicial:.2f}")
-
-        atual = deepcopy(melhor_inicial)
-    else:
-        atual = deepcopy(rota_inicial)
-        melhor_dist_inicial = avaliar_rota(
-            atual, tempos, bares, hora_inicial, hora_final, tempo_visita, alpha, beta
+            perfil.contar("avaliacoes_completas")
+            origem = None
+
+    if progresso:
+        progresso(
+            {
+                "evento": "solucao_inicial",
+                "custo": melhor_dist_inicial,
+                "origem": origem,
+            }
         )
-        if verbose:
-            print(f"Solução inicial: {melhor_dist_inicial:.2f}")
 
     melhor = deepcopy(atual)
-    melhor_custo = avaliar_rota(
-        melhor, tempos, bares, hora_inicial, hora_final, tempo_visita, alpha, beta
-    )
+    melhor_custo = melhor_dist_inicial
 
     tabu_movimentos = []
-    historico = {"iteracao": [], "distancia_atual": [], "distancia_melhor": []}
+    historico = {
+        "iteracao": [],
+        "distancia_atual": [],
+        "distancia_melhor": [],
+        "tempo": [],
+    }
     iteracoes_sem_melhoria = 0
 
-    distancia_atual = avaliar_rota(
-        atual, tempos, bares, hora_inicial, hora_final, tempo_visita, alpha, beta
-    )
+    distancia_atual = melhor_custo
+    deltas_2opt = getattr(tempos, "deltas_2opt", None)
 
     for iteracao in range(max_iter):
-        vizinhos = gerar_vizinhos_2opt(atual)
+        if parar is not None and parar():
+            if progresso:
+                progresso(
+                    {"evento": "parada", "iteracao": iteracao, "motivo": "interrompida"}
+                )
+            break
+
+        with perfil.fase("vizinhanca"):
+            vizinhos = gerar_vizinhos_2opt(atual, restricoes)
         melhor_vizinho = None
         melhor_dist_vizinho = float("inf")
         melhor_movimento = None
-
-        for nova_rota, i, j in vizinhos:
-            movimento = (i, j)
-            delta = avaliar_movimento_parcial(atual, i, j, tempos)
-            dist = distancia_atual + delta
-            movimento_tabu = movimento in tabu_movimentos
-            criterio_aspiracao = dist < melhor_custo
-            if not movimento_tabu or criterio_aspiracao:
-                if dist < melhor_dist_vizinho:
+        acertos_tabu = 0
+        aspiracoes = 0
+
+        with perfil.fase("avaliacao"):
+            if deltas_2opt is not None:
+                deltas = deltas_2opt(atual, hora_inicial, tempo_visita)
+            for nova_rota, i, j in vizinhos:
+                movimento = (i, j)
+                if deltas_2opt is None:
+                    delta = avaliar_movimento_parcial(atual, i, j, tempos)
+                else:
+                    delta = deltas[i][j]
+                dist = distancia_atual + delta
+                movimento_tabu = movimento in tabu_movimentos
+                criterio_aspiracao = dist < melhor_custo
+                if movimento_tabu:
+                    acertos_tabu += 1
+                    aspiracoes += criterio_aspiracao
+                if (
+                    not movimento_tabu or criterio_aspiracao
+                ) and dist < melhor_dist_vizinho:
                     melhor_vizinho = nova_rota
                     melhor_dist_vizinho = dist
                     melhor_movimento = movimento
+        perfil.contar("movimentos_avaliados", len(vizinhos))
+        perfil.contar("avaliacoes_delta", len(vizinhos))
+        if restricoes:
+            n = len(atual)
+            perfil.contar("movimentos_podados", (n - 1) * (n - 2) // 2 - len(vizinhos))
+        perfil.contar("acertos_tabu", acertos_tabu)
+        perfil.contar("aspiracoes", aspiracoes)
 
         if melhor_vizinho is None:
-            if verbose:
-                print(f"Iteração {iteracao}: Sem vizinhos válidos. Parando.")
+            if progresso:
+                progresso(
+                    {"evento": "parada", "iteracao": iteracao, "motivo": "sem_vizinhos"}
+                )
             break
 
-        atual = melhor_vizinho
-        distancia_atual = melhor_dist_vizinho
-
-        historico["iteracao"].append(iteracao)
-        historico["distancia_atual"].append(melhor_dist_vizinho)
-        historico["distancia_melhor"].append(melhor_custo)
-
-        if melhor_dist_vizinho < melhor_custo:
-            melhor = deepcopy(atual)
-            melhor_custo = melhor_dist_vizinho
-            iteracoes_sem_melhoria = 0
-            if verbose:
-                melhoria = (
-                    (melhor_dist_inicial - melhor_custo) / melhor_dist_inicial * 100
+        with perfil.fase("atualizacao"):
+            atual = melhor_vizinho
+            distancia_atual = melhor_dist_vizinho
+
+            nova_melhor = False
+            if melhor_dist_vizinho < melhor_custo:
+                # o delta só conta deslocamento: confirma com o custo real
+                distancia_atual = avaliar_rota(
+                    atual,
+                    tempos,
+                    bares,
+                    hora_inicial,
+                    hora_final,
+                    tempo_visita,
+                    alpha,
+                    beta,
+                    cache=cache,
+                    penalidade_fim=penalidade_fim,
                 )
-                print(
-                    f"Iteração {iteracao}: Nova melhor = {melhor_custo:.2f} (melhoria {melhoria:.1f}%)"
-                )
-        else:
-            iteracoes_sem_melhoria += 1
-
-        if melhor_movimento:
-            tabu_movimentos.append(melhor_movimento)
-            if len(tabu_movimentos) > tabu_tam:
-                tabu_movimentos.pop(0)
+                perfil.contar("avaliacoes_completas")
+                nova_melhor = distancia_atual < melhor_custo
+
+            if nova_melhor:
+                melhor = deepcopy(atual)
+                melhor_custo = distancia_atual
+                iteracoes_sem_melhoria = 0
+                perfil.contar("novas_melhores")
+                if progresso:
+                    progresso(
+                        {
+                            "evento": "nova_melhor",
+                            "iteracao": iteracao,
+                            "custo": melhor_custo,
+                            "melhoria": _melhoria(melhor_dist_inicial, melhor_custo),
+                        }
+                    )
+            else:
+                iteracoes_sem_melhoria += 1
+
+            historico["iteracao"].append(iteracao)
+            historico["distancia_atual"].append(distancia_atual)
+            historico["distancia_melhor"].append(melhor_custo)
+            historico["tempo"].append(time.perf_counter() - inicio)
+
+            if melhor_movimento:
+                tabu_movimentos.append(melhor_movimento)
+                if len(tabu_movimentos) > tabu_tam:
+                    tabu_movimentos.pop(0)
 
         if iteracoes_sem_melhoria >= max_iter_sem_melhoria:
-            if verbose:
-                print(
-                    f"Iteração {iteracao}: Sem melhoria por {max_iter_sem_melhoria} iterações. Parando."
+            if progresso:
+                progresso(
+                    {
+                        "evento": "parada",
+                        "iteracao": iteracao,
+                        "motivo": "sem_melhoria",
+                        "limite": max_iter_sem_melhoria,
+                    }
                 )
             break
 
-    if verbose:
-        melhoria_final = (
-            (melhor_dist_inicial - melhor_custo) / melhor_dist_inicial * 100
-            if melhor_dist_inicial
-            else 0
+        if gap_alvo is not None:
+            gap = calcular_gap(melhor_custo, limite_inferior, constante)
+            if gap is not None and gap <= gap_alvo:
+                if progresso:
+                    progresso(
+                        {
+                            "evento": "parada",
+                            "iteracao": iteracao,
+                            "motivo": "gap_alvo",
+                            "gap": gap,
+                            "limite": gap_alvo,
+                        }
+                    )
+                break
+
+    if progresso:
+        progresso(
+            {
+                "evento": "fim",
+                "custo_inicial": melhor_dist_inicial,
+                "custo_final": melhor_custo,
+                "melhoria": _melhoria(melhor_dist_inicial, melhor_custo),
+                "iteracoes": len(historico["iteracao"]),
+            }
         )
-        print("\n✅ Tabu Search concluído!")
-        print(f"   Distância inicial: {melhor_dist_inicial:.2f}")
-        print(f"   Distância final: {melhor_custo:.2f}")
-        print(f"   Melhoria: {melhoria_final:.1f}%")
+
+    perfil.contar("iteracoes", len(historico["iteracao"]))
+    perfil.contar("cache_horarios_acertos", cache.acertos)
+    perfil.contar("cache_horarios_faltas", cache.faltas)
+    if perfil.ativo:
+        historico["perfil"] = perfil.finalizar()
 
     return melhor, melhor_custo, historico
 
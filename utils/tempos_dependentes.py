@@ -0,0 +1,288 @@
+"""
+Tempos de deslocamento dependentes do horário de saída.
+
+O trânsito de BH às 18:00 não é o das 23:00. Em vez de uma matriz `tempos`
+estática, `TemposPorHorario` guarda um tensor `(slots, n, n)` (por padrão um
+slot por hora do dia) e interpola linearmente entre o slot da saída e o
+seguinte; depois do último slot volta ao primeiro (meia-noite).
+
+ - Armazenamento compacto: uint16 em décimos de minuto (até ~109 h por
+   trecho), 124 bares × 24 h ≈ 740 KB. O `.npy` é aberto com `mmap_mode="r"`,
+   então os workers compartilham as páginas do arquivo.
+ - `avaliar_rota` usa `tempo_em` na hora de saída de cada trecho.
+ - No tabu search, `deltas_2opt` calcula com indexação NumPy o delta de todos
+   os movimentos 2-opt de uma vez, usando a hora de saída de cada posição na
+   rota atual (aproximação: a reversão muda as horas seguintes, por isso a
+   nova melhor é confirmada com `avaliar_rota`).
+ - Quem trata o objeto como matriz (`np.asarray`, `tempos[i][j]`, limites,
+   construtivas, solver exato) vê `referencia`, o menor tempo entre os slots:
+   os limites inferiores continuam válidos.
+
+O tensor fica em `data/tempos_por_horario.npy`, com o manifesto ao lado
+(`tempos_por_horario.manifesto.json`: ids dos bares, minutos por slot e
+escala), no mesmo esquema de `distancias.pkl`. Sem dados de trânsito por
+horário, `de_fatores` gera um tensor a partir da matriz estática e de um
+fator por hora:
+
+    python -m utils.tempos_dependentes --fatores 0.8,0.8,...,1.0 \\
+        --saida data/tempos_por_horario.npy
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+try:
+    from .dados import (
+        caminho_manifesto,
+        carregar_bares,
+        carregar_manifesto,
+        carregar_matrizes,
+        ids_bares,
+    )
+except Exception:
+    from dados import (
+        caminho_manifesto,
+        carregar_bares,
+        carregar_manifesto,
+        carregar_matrizes,
+        ids_bares,
+    )
+
+ESCALA = 10  # unidades por minuto (décimos de minuto)
+MINUTOS_DIA = 24 * 60
+
+
+def minuto_do_dia(hora):
+    """Minutos desde a meia-noite de um datetime (com fração de segundos)."""
+    return hora.hour * 60 + hora.minute + hora.second / 60.0
+
+
+def _minutos(tempo_visita):
+    if hasattr(tempo_visita, "total_seconds"):
+        return tempo_visita.total_seconds() / 60.0
+    return float(tempo_visita)
+
+
+class TemposPorHorario:
+    """Tensor `(slots, n, n)` de tempos em uint16 (décimos de minuto)."""
+
+    def __init__(self, dados, minutos_por_slot=60, escala=ESCALA):
+        dados = np.asarray(dados)
+        if dados.ndim != 3 or dados.shape[1] != dados.shape[2]:
+            raise ValueError(f"Tensor com forma {dados.shape}, esperado (slots, n, n)")
+        if dados.dtype != np.uint16:
+            raise ValueError(f"Tensor com dtype {dados.dtype}, esperado uint16")
+        if dados.shape[0] * minutos_por_slot != MINUTOS_DIA:
+            raise ValueError(
+                f"{dados.shape[0]} slots de {minutos_por_slot} min não cobrem o dia"
+            )
+        self.dados = dados
+        self.slots, self.n = dados.shape[0], dados.shape[1]
+        self.minutos_por_slot = minutos_por_slot
+        self.escala = escala
+        # visão achatada para o acesso escalar de `tempo_em`
+        self._plano = dados.reshape(-1)
+        self.referencia = dados.min(axis=0).astype(np.float64) / escala
+        self._linhas = self.referencia.tolist()
+        self.caminho = None
+
+    @classmethod
+    def de_fatores(cls, tempos, fatores, escala=ESCALA):
+        """Tensor a partir da matriz estática e de um fator por slot.
+
+        Ex.: 24 fatores horários com 1.6 às 18:00 no pico e 0.8 de madrugada.
+        """
+        tempos = np.asarray(tempos, dtype=np.float64)
+        fatores = np.asarray(fatores, dtype=np.float64)
+        return cls.de_matrizes(tempos[None, :, :] * fatores[:, None, None], escala)
+
+    @classmethod
+    def de_matrizes(cls, matrizes, escala=ESCALA):
+        """Tensor a partir de uma matriz de tempos (minutos) por slot."""
+        matrizes = np.nan_to_num(np.asarray(matrizes, dtype=np.float64), nan=0.0)
+        limite = np.iinfo(np.uint16).max
+        dados = np.clip(np.rint(matrizes * escala), 0, limite).astype(np.uint16)
+        return cls(dados, MINUTOS_DIA // len(dados), escala)
+
+    @classmethod
+    def carregar(cls, caminho, bares=None):
+        """Abre o `.npy` mapeado em memória, reordenado pelo manifesto como
+        em `dados.carregar_matrizes` (um bar sem linha no tensor é erro)."""
+        dados = np.load(caminho, mmap_mode="r")
+        manifesto = carregar_manifesto(caminho) or {}
+        minutos_por_slot = manifesto.get("minutos_por_slot", 60)
+        escala = manifesto.get("escala", ESCALA)
+
+        reordenado = False
+        if bares is not None:
+            ids_manifesto = manifesto.get("ids")
+            if ids_manifesto is None:
+                if dados.shape[1] != len(bares):
+                    raise ValueError(
+                        f"Tensor com {dados.shape[1]} bares e sem manifesto "
+                        f"para {len(bares)} bares"
+                    )
+            else:
+                posicao = {id_: i for i, id_ in enumerate(ids_manifesto)}
+                ids = ids_bares(bares)
+                faltando = [id_ for id_ in ids if id_ not in posicao]
+                if faltando:
+                    raise ValueError(f"Bares sem linha no tensor: {faltando}")
+                ordem = [posicao[id_] for id_ in ids]
+                if ordem != list(range(dados.shape[1])):
+                    dados = np.ascontiguousarray(dados[:, ordem][:, :, ordem])
+                    reordenado = True
+
+        tempos = cls(dados, minutos_por_slot, escala)
+        if not reordenado:
+            tempos.caminho = caminho
+        return tempos
+
+    def salvar(self, caminho, ids=None):
+        """Grava o `.npy` e o manifesto (ids, minutos por slot, escala)."""
+        with open(f"{caminho}.tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(self.dados))
+        manifesto = {
+            "ids": list(ids) if ids is not None else None,
+            "minutos_por_slot": self.minutos_por_slot,
+            "escala": self.escala,
+            "atualizado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        destino = caminho_manifesto(caminho)
+        with open(f"{destino}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=1)
+        os.replace(f"{caminho}.tmp", caminho)
+        os.replace(f"{destino}.tmp", destino)
+
+    def __reduce__(self):
+        # para o pool de processos: reabre o mapeamento em vez de copiar
+        if self.caminho is not None:
+            return (_reabrir, (self.caminho, self.n))
+        return (
+            type(self),
+            (np.asarray(self.dados), self.minutos_por_slot, self.escala),
+        )
+
+    # --- visão estática (menor tempo entre os slots) ---
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return self._linhas[i]
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.referencia
+        return self.referencia.astype(dtype)
+
+    @property
+    def nbytes(self):
+        return int(self.dados.nbytes)
+
+    # --- consultas por horário ---
+
+    def tempo_em(self, origem, destino, minuto):
+        """Minutos de `origem` a `destino` saindo `minuto` minutos após a meia-noite."""
+        posicao = minuto / self.minutos_por_slot
+        k = int(posicao)
+        fracao = posicao - k
+        k %= self.slots
+        base = origem * self.n + destino
+        nn = self.n * self.n
+        a = int(self._plano[k * nn + base])
+        b = int(self._plano[((k + 1) % self.slots) * nn + base])
+        return (a + fracao * (b - a)) / self.escala
+
+    def tempos_em(self, origens, destinos, minutos):
+        """Versão vetorizada de `tempo_em` (os argumentos fazem broadcast)."""
+        posicao = np.asarray(minutos, dtype=np.float64) / self.minutos_por_slot
+        k = np.floor(posicao).astype(np.intp)
+        fracao = posicao - k
+        k %= self.slots
+        a = self.dados[k, origens, destinos].astype(np.float64)
+        b = self.dados[(k + 1) % self.slots, origens, destinos]
+        return (a + fracao * (b - a)) / self.escala
+
+    def partidas(self, rota, hora_inicial, tempo_visita):
+        return partidas(self, rota, hora_inicial, tempo_visita)
+
+    def deltas_2opt(self, rota, hora_inicial, tempo_visita):
+        return deltas_2opt_por_horario(self, rota, hora_inicial, tempo_visita)
+
+
+def partidas(tempos, rota, hora_inicial, tempo_visita):
+    """Minuto do dia em que se sai de cada posição da rota.
+
+    Segue o relógio de `avaliar_rota`: sai do primeiro bar na hora inicial e
+    de cada um dos seguintes após o deslocamento e a visita. `tempos` é
+    qualquer objeto com `tempo_em`.
+    """
+    visita = _minutos(tempo_visita)
+    minuto = minuto_do_dia(hora_inicial)
+    saidas = [minuto]
+    for pos in range(len(rota) - 1):
+        minuto += tempos.tempo_em(rota[pos], rota[pos + 1], minuto) + visita
+        saidas.append(minuto)
+    return np.asarray(saidas)
+
+
+def deltas_2opt_por_horario(tempos, rota, hora_inicial, tempo_visita):
+    """Delta de deslocamento de todos os movimentos 2-opt `(i, j)`.
+
+    Mesma convenção de `tabu_search.avaliar_movimento_parcial`, com cada
+    aresta avaliada na hora de saída da posição de origem na rota atual.
+    `tempos` precisa de `tempo_em` e da versão vetorizada `tempos_em`.
+    Retorna listas (`deltas[i][j]`), que o laço do tabu indexa mais rápido.
+    """
+    r = np.asarray(rota, dtype=np.intp)
+    n = len(r)
+    if n < 3:
+        return [[0.0] * n for _ in range(n)]
+    saidas = partidas(tempos, rota, hora_inicial, tempo_visita)[:-1]
+    removidas = tempos.tempos_em(r[:-1], r[1:], saidas)
+    # (rota[i], rota[j]) saindo em partidas[i]
+    deltas = tempos.tempos_em(r[:-1, None], r[None, :], saidas[:, None])
+    deltas -= removidas[:, None]
+    # (rota[i+1], rota[j+1]) saindo em partidas[j], para j < n - 1
+    deltas[:, :-1] += tempos.tempos_em(r[1:, None], r[None, 1:], saidas[None, :])
+    deltas[:, :-1] -= removidas[None, :]
+    return deltas.tolist()
+
+
+def _reabrir(caminho, n):
+    tempos = TemposPorHorario.carregar(caminho)
+    if tempos.n != n:
+        raise ValueError(f"{caminho} mudou desde o carregamento")
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bares", default="data/bares.csv")
+    parser.add_argument("--matrizes", default="data/distancias.pkl")
+    parser.add_argument("--saida", default="data/tempos_por_horario.npy")
+    parser.add_argument(
+        "--fatores",
+        required=True,
+        help="fatores separados por vírgula, um por slot (24 = por hora)",
+    )
+    args = parser.parse_args()
+
+    bares = carregar_bares(args.bares)
+    _, tempos = carregar_matrizes(args.matrizes, bares)
+    fatores = [float(f) for f in args.fatores.split(",")]
+    tensor = TemposPorHorario.de_fatores(tempos, fatores)
+    tensor.salvar(args.saida, ids=ids_bares(bares))
+    print(
+        f"{args.saida}: {tensor.slots} slots × {tensor.n} bares "
+        f"({tensor.nbytes / 1024:.0f} KB)"
+    )
+
+
+if __name__ == "__main__":
+    main()